@@ -7,7 +7,7 @@
 # --------------------------------------------------------
 from collections import OrderedDict 
 import argparse
-from utilss import sortORFs, sortORFs_by_strand  # or from your_module import sortORFs
+from utilss import sortORFs, sortORFs_by_strand, priority_order, tile_intervals
 
 
 # --------------------------------------------------------
@@ -17,21 +17,23 @@ from utilss import sortORFs, sortORFs_by_strand  # or from your_module import so
 #   - If the StORF type is 'Con-StORF', return score 0 (higher priority)
 #   - Otherwise, return score 1 (regular StORF)
 # Input:
-#   storf: tuple containing ORF information
+#   storf: (position key, data) item of the ORF dictionary
 # Returns:
 #   int: score (0 or 1)
 # --------------------------------------------------------
 
 def storf_type_score(storf):
-    return 0 if storf[1] == 'Con-StORF' else 1
+    return 0 if storf[1][4] == 'Con-StORF' else 1
 
 
 # --------------------------------------------------------
 # Function: tile_filtering
 # Purpose: Filter overlapping ORFs based on length or StORF type priority
 # Logic:
-#   - Sort ORFs by chosen strategy (length or type priority)
+#   - Order ORFs by chosen strategy (length or type priority)
 #   - Remove overlapping or nested ORFs using user-specified overlap threshold
+#     (tile_intervals holds accepted ORFs in max segment trees by start,
+#     so each check is O(log n) rather than a pass over every later ORF)
 #   - Return filtered and re-sorted ORFs
 # Input:
 #   storfs: OrderedDict of ORFs with positions as keys
@@ -42,84 +44,26 @@ def storf_type_score(storf):
 
 def tile_filtering(storfs, options):
     # check which sorting strategy to use, default being 'length'
-    if hasattr(options, 'priority_strategy'):
-        strategy = options.priority_strategy
-    else:
-        strategy = 'length'
-    
+    strategy = getattr(options, 'priority_strategy', 'length')
 
-    # appply sorting strategy 
-    if strategy == 'length':
-        # sort by ORF length (index 3), descending
-        storfs = sorted(storfs.items(), key=lambda s: s[1][3], reverse=True)
-    elif strategy == 'storf_type':
-        # sort by storf type score (con-storf first), then lenght 
-        storfs = sorted(storfs.items(), key=lambda s: (storf_type_score(s), -s[1][3]))
-    else:
-         # Unsupported strategy
-        raise ValueError(f"Unsupported priority strategy: {strategy}")
-    
+    items = list(storfs.items())
+    # Positions are parsed once per ORF rather than once per comparison
+    intervals = [(int(pos.split(',')[0]), int(pos.split(',')[-1])) for pos, _ in items]
+    ordered_by_priority = priority_order([data[3] for _, data in items], [data[4] for _, data in items], strategy)
 
-    # Convert sorted list to list for mutability
-    ordered_by_priority = list(storfs)
-    num_storfs = len(ordered_by_priority)
-    i = 0
-
-    # Strat filtering process
-    while i < num_storfs:
-        pos_x, data_x = ordered_by_priority[i] # get the first ORF
-        start_x = int(pos_x.split(',')[0]) # get start position 
-        stop_x = int(pos_x.split(',')[-1]) # get start position 
-
-        j = i + 1 # start checking the next ORF
-
-        # Check for overlap with subsequent ORFs
-        while j < num_storfs:
-            pos_y, data_y = ordered_by_priority[j] # get the next ORF 
-            start_y = int(pos_y.split(',')[0]) # get start position 
-            stop_y = int(pos_y.split(',')[-1]) # get start position 
-
-            # No overlap
-            if start_y >= stop_x or stop_y <= start_x:
-                j += 1 # continue to next ORF
-
-            # Fully nested ORF 
-            elif start_y >= start_x and stop_y <= stop_x: 
-                ordered_by_priority.pop(j) # remove nested ORf 
-                num_storfs -= 1 # update the number of ORFs
-            else:
-                # Calculate overlap length 
-                overlap_start = max(start_x, start_y) # get the start of the overlap
-                overlap_end = min(stop_x, stop_y) # get the end of the overlap
-                overlap = max(0, overlap_end - overlap_start + 1) # +1 to include both ends 
-
-                # Remove if overlap exceeds threshold
-                if overlap >= options.overlap_nt: 
-                    ordered_by_priority.pop(j) # remove the overlapping stORF
-                    num_storfs -=1 # update the number of ORFs
-                else:
-                    j += 1 # continue to next ORF
-
-        i += 1 # update the index of the first ORf
-        
-        # Convert filtered list to OrderedDict 
-    filtered_storfs = OrderedDict(ordered_by_priority) # convert to OrderedDict 
+    # Greedy filtering in priority order
+    kept = tile_intervals([intervals[i] for i in ordered_by_priority], options.overlap_nt)
+    filtered_storfs = OrderedDict(items[ordered_by_priority[k]] for k in kept) # still in priority order
 
-        # final sorting based on options 
+    # final sorting based on options
     if options.storf_order == 'start_pos': # sort by start position
-        final_filtered_storfs = sortORFs(filtered_storfs) # sort by start position 
-    elif options.storf_order == 'strand': # sort by strand 
-        final_filtered_storfs = OrderedDict() # initialise empty OrderedDict 
-        storf_nums = sorted([item[-1] for item in filtered_storfs.values()]) # get the sorted list of storf numbers
-        for num in storf_nums: # iterate through the sorted list of storf numbers 
-            for key, value in filtered_storfs.items(): # iterate through the filtered storfs 
-                 if value[-1] == num: # check if the storf number matches 
-                    final_filtered_storfs.update({key: value}) # update the final filtered storfs 
-                    break
+        final_filtered_storfs = sortORFs(filtered_storfs)
+    elif options.storf_order == 'strand': # sort by internal storf number
+        final_filtered_storfs = sortORFs_by_strand(filtered_storfs)
     else:
-        final_filtered_storfs = filtered_storfs # keep the order as is 
+        final_filtered_storfs = filtered_storfs # keep the order as is
 
-    return final_filtered_storfs # return the filtered ORfs 
+    return final_filtered_storfs # return the filtered ORfs
 
  
 # -------------------------------------------------------
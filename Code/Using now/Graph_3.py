@@ -9,9 +9,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import matplotlib.ticker as mticker  # for clean y-axis tick formatting
+from storf_columns import StORFColumns
 
 
 longest_file = "C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/Results/Top_n_BLAST/Longest/100_YJPS09WP013-Alignment-HitTable.csv"
+# Optional: StORF-Finder -columnar table (.npz) of the BLASTed StORFs - types are then looked up instead of parsed from Query_ID
+storf_table_file = None
 
 # Define column names based on BLAST output format 6
 columns = [
@@ -46,7 +49,12 @@ def classify_by_metadata(qid):
     return "Unknown"  # If key is missing
 
 # Apply the classification function to the Query_ID column
-long_df["Type"] = long_df["Query_ID"].apply(classify_by_metadata)
+if storf_table_file:
+    storf_table = StORFColumns(storf_table_file)
+    type_by_id = dict(zip(storf_table.storf_ids(), storf_table.storf_type.tolist()))
+    long_df["Type"] = long_df["Query_ID"].str.split(";").str[0].map(type_by_id).fillna("Unknown")
+else:
+    long_df["Type"] = long_df["Query_ID"].apply(classify_by_metadata)
 long_df["Type"] = long_df["Type"].astype(str)  # Ensure type is string
 
 # Set Seaborn plot style
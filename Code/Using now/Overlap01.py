@@ -4,9 +4,13 @@ Created on Fri Mar 21 15:42:14 2025
 
 @author: Anesti
 """
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterator, Optional
+import bisect
+import heapq
 import re
 import csv
+from storf_columns import StORFColumns
+from indexed_fasta import IndexedFasta
 
 # --------------------------------------------------------
 # Function: parse_fasta_positions_and_sequences
@@ -51,6 +55,54 @@ def parse_fasta_positions_and_sequences(fasta_file: str) -> Tuple[Dict[str, List
 
     return positions, sequences
 
+# --------------------------------------------------------
+# Function: index_positions_and_sequences
+# Purpose: Same as parse_fasta_positions_and_sequences without reading
+# the sequences in
+# Logic:
+#   - Positions come from the record names of the FASTA index (.fai,
+#     built on first use) - StORF headers have no spaces, so the name
+#     is the full header
+#   - sequences is an IndexedFasta - a sequence is only read from the
+#     file when it is looked up (e.g. by write_fasta)
+# --------------------------------------------------------
+def index_positions_and_sequences(fasta_file: str) -> Tuple[Dict[str, List[Tuple[str, int, int]]], IndexedFasta]:
+    positions = {}
+    sequences = IndexedFasta(fasta_file)
+    for full_header in sequences:
+        match = re.search(r'^>(\S+?)_(StORF|Con-StORF)_\d+:(\d+)-(\d+)', '>' + full_header)
+        if match:
+            seq_id = match.group(1)
+            start, end = sorted([int(match.group(3)), int(match.group(4))])
+            positions.setdefault(seq_id, []).append((full_header, start, end))
+    return positions, sequences
+
+# --------------------------------------------------------
+# Function: load_positions_and_sequences
+# Purpose: Same as parse_fasta_positions_and_sequences, for either a
+# StORF-Finder FASTA or its -columnar table (.npz)
+# Logic:
+#   - A FASTA is read through its index (index_positions_and_sequences)
+#   - The table already holds the loci, types and sequences, so nothing
+#     is parsed - positions are grouped by UR
+#   - Only StORFs and Con-StORFs get positions (as the header regex)
+# Returns:
+#   positions: {base_id: [(full_header, start, end)]}
+#   sequences: {full_header: sequence} (dict or IndexedFasta)
+# --------------------------------------------------------
+def load_positions_and_sequences(storf_file: str) -> Tuple[Dict[str, List[Tuple[str, int, int]]], Dict[str, str]]:
+    if not storf_file.endswith('.npz'):
+        return index_positions_and_sequences(storf_file)
+    columns = StORFColumns(storf_file)
+    headers = columns.headers()
+    sequences = dict(zip(headers, columns.sequences()))
+    positions = {}
+    for header, ur, storf_type, start, stop in zip(headers, columns.ur.tolist(), columns.storf_type.tolist(),
+                                                   columns.start.tolist(), columns.stop.tolist()):
+        if storf_type in ('StORF', 'Con-StORF'):
+            positions.setdefault(ur, []).append((header, min(start, stop), max(start, stop)))
+    return positions, sequences
+
 # --------------------------------------------------------
 # Function: check_overlap
 # Purpose: Test if two genomic ranges overlap
@@ -60,12 +112,68 @@ def parse_fasta_positions_and_sequences(fasta_file: str) -> Tuple[Dict[str, List
 def check_overlap(range1: Tuple[int, int], range2: Tuple[int, int]) -> bool:
     return max(range1[0], range2[0]) <= min(range1[1], range2[1])
 
+# --------------------------------------------------------
+# Function: storf_strand
+# Purpose: Strand of a StORF from its header (';Strand=+'), None if the
+# header does not say
+# --------------------------------------------------------
+def storf_strand(full_header: str) -> Optional[str]:
+    match = re.search(r';Strand=([+-])', full_header)
+    return match.group(1) if match else None
+
+# --------------------------------------------------------
+# Function: overlap_pairs
+# Purpose: Every overlapping Con-StORF/StORF pair, by a sorted sweep
+# instead of comparing every Con-StORF with every StORF
+# Logic:
+#   - Per base ID both sets are sorted by start and the Con-StORFs are
+#     swept in start order. StORFs that started before the Con-StORF
+#     are kept in a heap by end - the ones ending before it are dropped,
+#     the rest all overlap it. StORFs starting inside it are found by
+#     bisect. O((C + S) log S + k) for k overlapping pairs
+#   - Overlap length counts shared bases (inclusive positions, as
+#     check_overlap - touching ranges overlap by 1)
+#   - Same_Strand is None if either header has no Strand=
+# Input:
+#   min_overlap: pairs sharing fewer bases are skipped
+#   same_strand_only: skip pairs on opposite strands
+# Yields:
+#   (con_full_header, storf_full_header, overlap_length, same_strand)
+#   - Con-StORFs in start order, each one's StORFs in start order
+# --------------------------------------------------------
+def overlap_pairs(storfs: Dict[str, List[Tuple[str, int, int]]], constorfs: Dict[str, List[Tuple[str, int, int]]],
+                  min_overlap: int = 1, same_strand_only: bool = False) -> Iterator[Tuple[str, str, int, Optional[bool]]]:
+    for seq_id in constorfs:
+        if seq_id not in storfs:
+            continue
+        ordered = sorted(storfs[seq_id], key=lambda storf: storf[1])
+        starts = [storf[1] for storf in ordered]
+        strands = [storf_strand(storf[0]) for storf in ordered]
+        active = [] # (end, index) of StORFs starting before the current Con-StORF
+        next_storf = 0
+        for con_full, c_start, c_end in sorted(constorfs[seq_id], key=lambda con: con[1]):
+            while next_storf < len(ordered) and starts[next_storf] < c_start:
+                heapq.heappush(active, (ordered[next_storf][2], next_storf))
+                next_storf += 1
+            while active and active[0][0] < c_start:
+                heapq.heappop(active)
+            inside_end = bisect.bisect_right(starts, c_end, next_storf)
+            con_strand = storf_strand(con_full)
+            for index in sorted(index for _, index in active) + list(range(next_storf, inside_end)):
+                storf_full, s_start, s_end = ordered[index]
+                overlap_length = min(c_end, s_end) - max(c_start, s_start) + 1
+                if overlap_length < min_overlap:
+                    continue
+                same_strand = None if con_strand is None or strands[index] is None else con_strand == strands[index]
+                if same_strand_only and same_strand is False:
+                    continue
+                yield con_full, storf_full, overlap_length, same_strand
+
 # --------------------------------------------------------
 # Function: con_storf_contains_storf
 # Purpose: For each Con-StORF, find overlapping StORFs
 # Logic:
-#   - Match by base ID
-#   - Compare each con-storf range to all storfs on the same seq ID
+#   - Match by base ID, pairs from overlap_pairs
 #   - Track full headers for output
 # Returns:
 #   matches: {con_full_header: [storf_full_header]}
@@ -73,17 +181,29 @@ def check_overlap(range1: Tuple[int, int], range2: Tuple[int, int]) -> bool:
 def con_storf_contains_storf(storfs: Dict[str, List[Tuple[str, int, int]]],
                               constorfs: Dict[str, List[Tuple[str, int, int]]]) -> Dict[str, List[str]]:
     contained = {}
-    for seq_id in constorfs:
-        if seq_id not in storfs:
-            continue
-        for con_full, c_start, c_end in constorfs[seq_id]:
-            for storf_full, s_start, s_end in storfs[seq_id]:
-                if check_overlap((c_start, c_end), (s_start, s_end)):
-                    if con_full not in contained:
-                        contained[con_full] = []
-                    contained[con_full].append(storf_full)
+    for con_full, storf_full, _, _ in overlap_pairs(storfs, constorfs):
+        contained.setdefault(con_full, []).append(storf_full)
     return contained
 
+# --------------------------------------------------------
+# Function: write_overlap_csv
+# Purpose: Stream overlapping pairs to a CSV, one row per pair
+# Returns:
+#   con_hits, storf_hits: headers of the Con-StORFs/StORFs that
+#   overlapped, each once, in the order first written
+# --------------------------------------------------------
+def write_overlap_csv(csv_output: str, pairs: Iterator[Tuple[str, str, int, Optional[bool]]]) -> Tuple[List[str], List[str]]:
+    con_hits = {}
+    storf_hits = {}
+    with open(csv_output, mode='w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Con_StORF_Full_Header", "StORF_Full_Header", "Overlap_Length", "Same_Strand"])
+        for con_full, storf_full, overlap_length, same_strand in pairs:
+            writer.writerow([con_full, storf_full, overlap_length, '' if same_strand is None else same_strand])
+            con_hits[con_full] = None
+            storf_hits[storf_full] = None
+    return list(con_hits), list(storf_hits)
+
 # --------------------------------------------------------
 # Function: write_fasta
 # Purpose: Save FASTA-formatted sequence output
@@ -116,23 +236,18 @@ if __name__ == "__main__":
     storf_fasta_out = "C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/overlapping_storfs.fasta"
     constorf_fasta_out = "C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/overlapping_constorfs.fasta"
 
-    # Parse positions and sequences from input FASTA files
-    storf_coords, storf_sequences = parse_fasta_positions_and_sequences(storf_file)
-    constorf_coords, constorf_sequences = parse_fasta_positions_and_sequences(constorf_file)
-
-    # Find overlaps
-    overlap_dict = con_storf_contains_storf(storf_coords, constorf_coords)
+    # Overlap settings
+    min_overlap = 1  # Minimum shared bases for a pair to be reported
+    same_strand_only = False  # Only report pairs on the same strand
 
-    # Write summary CSV of which Con-StORFs overlapped with which StORFs
-    with open(csv_output, mode='w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["Con_StORF_Full_Header", "Overlapping_StORF_Full_Headers"])
-        for constorf, storfs in overlap_dict.items():
-            writer.writerow([constorf, " -> ".join(storfs)])
+    # Positions and sequences from input FASTA files (indexed - only the exported hits are read)
+    # or StORF-Finder -columnar .npz tables
+    storf_coords, storf_sequences = load_positions_and_sequences(storf_file)
+    constorf_coords, constorf_sequences = load_positions_and_sequences(constorf_file)
 
-    # Gather all headers to extract for FASTA export
-    constorf_hits = list(overlap_dict.keys())
-    storf_hits = [s for v in overlap_dict.values() for s in v]
+    # Find overlaps and write one CSV row per overlapping Con-StORF/StORF pair as they are found
+    pairs = overlap_pairs(storf_coords, constorf_coords, min_overlap=min_overlap, same_strand_only=same_strand_only)
+    constorf_hits, storf_hits = write_overlap_csv(csv_output, pairs)
 
     # Write overlapping sequences to FASTA files
     write_fasta(constorf_fasta_out, constorf_hits, constorf_sequences)
@@ -1,26 +1,50 @@
 import argparse
+import bisect
 import collections
+import copy
+import itertools
+import operator
 import re
 from collections import defaultdict, OrderedDict
 from datetime import date
-import textwrap
-import gzip
+import io
+import multiprocessing
+from multiprocessing import shared_memory
 import os
 import sys
 from utilss import sortORFs
-
-#from line_profiler_pycharm import profile
+from utilss import priority_order, tile_intervals # Shared with the standalone filter (Using now/Filter.py)
+from storf_columns import ColumnBuffer, ColumnWriter # Shared with the downstream analysis scripts (Using now)
+from indexed_fasta import IndexedFasta
 
 
 try:
-    from .utils import sortORFs  # Calling from ORForise via pip
-    from .constants import *
+    from .constants import *  # Calling from ORForise via pip
+    from .codon_index import scan_stops, strand_stops, encode_codons
+    from .storf_table import StORFTable, NO_MID, slice_ref, STORF_TYPES
+    from .translation import translate_sequences, NCBI_TABLES, DEFAULT_TABLE
+    from .storf_output import format_fasta, OutputBuffer
+    from .sequence_qc import SequenceQC
+    from .start_index import StartIndex
+    from .ur_cache import URCache
+    from .run_metrics import RunMetrics, timed_records
+    from .block_gzip import BlockGzipWriter, open_fasta, FORMATS as GZ_FORMATS
 except (ModuleNotFoundError, ImportError, NameError, TypeError) as error:
-    from utils import sortORFs
     from constants import *
+    from codon_index import scan_stops, strand_stops, encode_codons
+    from storf_table import StORFTable, NO_MID, slice_ref, STORF_TYPES
+    from translation import translate_sequences, NCBI_TABLES, DEFAULT_TABLE
+    from storf_output import format_fasta, OutputBuffer
+    from sequence_qc import SequenceQC
+    from start_index import StartIndex
+    from ur_cache import URCache
+    from run_metrics import RunMetrics, timed_records
+    from block_gzip import BlockGzipWriter, open_fasta, FORMATS as GZ_FORMATS
+
 
 
 
+CHUNK_NT = 250000 # UR bases per -threads task
 
 ###################
 gencode = {
@@ -41,511 +65,441 @@ gencode = {
       'TAC':'Y', 'TAT':'Y', 'TAA':'*', 'TAG':'*',
       'TGC':'C', 'TGT':'C', 'TGA':'*', 'TGG':'W'}
 
-def translate_frame(sequence):
-    translate = ''.join([gencode.get(sequence[3 * i:3 * i + 3], 'X') for i in range(len(sequence) // 3)])
+def translate_frame(sequence, table=DEFAULT_TABLE): # gencode is NCBI table 11 - see translation.py for the others
+    translate = translate_sequences([sequence], table)[0]
     return translate
 
 
 
-############################
-def check_non_standard_chars(options,storf_seq):
-    non_standard_set = set(['A', 'T', 'G', 'C'])
-    total_chars = len(storf_seq)
-    non_standard_count = sum(1 for char in storf_seq if char not in non_standard_set)
-    non_standard_percentage = non_standard_count / total_chars
-    if non_standard_percentage > float(options.non_standard):
-        return False
-    else:
-        return True
-
-
-############################
-
-def reverseCorrectLoci(options,sequence_length,sequence_id,first,second,third): # here for the negative loci correction
-    if second == None:
-        corrected_start = max(sequence_length - int(third-3),1)
-        corrected_stop = max(sequence_length - int(first-3),1)
-        return corrected_start, corrected_stop
-    else:
-        corrected_start = max(sequence_length - int(third-3),1)
-        corrected_mid = max(sequence_length - int(second-3),1)
-        corrected_stop = max(sequence_length - int(first-3),1)
-        return corrected_start, corrected_mid, corrected_stop
-
-
-#################################
-def revCompIterative(watson): #Gets Reverse Complement
-
-    complements = {'A': 'T', 'T': 'A', 'C': 'G', 'G': 'C', 'N': 'N',
-                   'R': 'Y', 'Y': 'R', 'S': 'S', 'W': 'W', 'K': 'M',
-                   'M': 'K', 'V': 'B', 'B': 'V', 'H': 'D', 'D': 'H'}
-    watson = watson.upper()
-    watsonrev = watson[::-1]
-    crick = ""
-    for nt in watsonrev: # make dict to catch bad nts - if more than 1 output them to std error
-        try:
-            crick += complements[nt]
-        except KeyError:
-            crick += nt
-            #ns_nt[nt] +=1
-    return crick
-
-######## Might only be the stop which is the first constorfs end.
-def prev_con_StORF_CHECKER(prev_con_StORF,sequence,options):
-    last_stop_str = int(prev_con_StORF.split(',')[-1])
-    seq = sequence[last_stop_str:last_stop_str + 3]
-    if not any(seq in s for s in options.stop_codons.split(',')):
-        last_stop = int(last_stop_str) - 3
-        last_stop = str(last_stop)
-        prev_con_StORF = prev_con_StORF.replace(str(last_stop_str), last_stop)
-    return prev_con_StORF
-
-#########
-def cut_seq(wc_seq,end):
-    while len(wc_seq) % 3 != 0:
-        if '+' in end:
-            wc_seq = wc_seq[:-1] # keep removing char
-        elif '-' in end:
-            wc_seq = wc_seq[1:]  # keep removing char
-    return wc_seq
-
-def start_filtering(storfs):
-    keep_storfs = {}
-    for pos, data in storfs.items():
-        starts = []
-        for start_codon in ['ATG', 'GTG', 'TTG']:
-            starts += [match.start() for match in re.finditer(re.escape(start_codon), data[0])]
-        #### This must be slow?
-        for start in starts:
-            if start % 3 == 0: # maybe add a clause to report only those storfs with starts in first n of storfs
-                keep_storfs.update({pos:data})
-                break
-    return keep_storfs
-
-
+def start_filtering(storfs, metrics=None): # Keep StORFs with an in-frame ATG/GTG/TTG - one lookup per StORF on the UR's StartIndex
+    if metrics is not None:
+        metrics.start('start_filter')
+    start_index = storfs.start_index if storfs.start_index is not None else StartIndex(storfs.parent)
+    keep_rows = []
+    for row in range(len(storfs)):
+        if start_index.first_start(storfs.seq_offset[row], storfs.seq_length[row], storfs.strand_of(row)) != -1:
+            keep_rows.append(row)
+    if metrics is not None:
+        metrics.stop(removed_start_filter=len(storfs) - len(keep_rows))
+    return storfs.take(keep_rows)
+
+def non_standard_filtering(storfs, options): # -non_standard - two prefix sum lookups per StORF on the UR's SequenceQC
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('non_standard_filter')
+    threshold = float(getattr(options, 'non_standard', 1.0)) # Not every StORF-Reporter caller sets it
+    keep_rows = []
+    for row in range(len(storfs)):
+        offset = storfs.seq_offset[row]
+        if storfs.qc.non_standard_fraction(offset, offset + storfs.seq_length[row]) <= threshold:
+            keep_rows.append(row)
+    if metrics is not None:
+        metrics.stop(removed_non_standard=len(storfs) - len(keep_rows))
+    if len(keep_rows) == len(storfs):
+        return storfs
+    return storfs.take(keep_rows)
 
-# --------------------------------------------------------
-# Import: OrderedDict from collections
-# Purpose: Maintain the insertion order of ORFs throughout
-# the filtering process, especially after sorting by
-# length or type. This ensures predictable and stable output
-# when iterating or exporting results.
-# --------------------------------------------------------
-from collections import OrderedDict 
 
 # --------------------------------------------------------
-# Function: storf_type_score
-# Purpose: Assign a priority score based on StORF type
-# Logic:
-#   - If the StORF type is 'Con-StORF', return score 0 (higher priority)
-#   - Otherwise, return score 1 (regular StORF)
+# Function: tile_filtering
+# Purpose: Filter overlapping StORFs of a StORFTable based on length
+# or StORF type priority (same rules as Filter.tile_filtering)
 # Input:
-#   storf: tuple containing ORF information
+#   storfs: StORFTable
+#   options: object with filtering and ordering preferences
+#   relations: list collecting every overlap checked (-olap_relations)
+#     as (candidate, kept, overlap length, reason) - StORFs as
+#     (start, stop, strand, type, idx), reason 'nested'/'threshold'
+#     (candidate removed), 'priority' (removed by a shorter StORF of
+#     higher -priority) or 'below_threshold' (both kept - only written
+#     for candidates that were kept)
 # Returns:
-#   int: score (0 or 1)
+#   StORFTable of the filtered StORFs
 # --------------------------------------------------------
-
-def storf_type_score(storf):
-    return 0 if storf[1] == 'Con-StORF' else 1
+def tile_filtering(storfs, options, relations=None):
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('tiling')
+    strategy = getattr(options, 'priority_strategy', 'length')
+    ordered_by_priority = priority_order(storfs.length, storfs.types(), strategy)
+    checked = [] if relations is not None else None
+    kept = tile_intervals([(storfs.start[row], storfs.stop[row]) for row in ordered_by_priority], options.overlap_nt, checked)
+    if relations is not None:
+        storf_types = storfs.types()
+        for candidate, winner, overlap, reason in checked:
+            candidate, winner = ordered_by_priority[candidate], ordered_by_priority[winner]
+            if reason == 'threshold' and storfs.length[winner] < storfs.length[candidate]:
+                reason = 'priority'
+            relations.append(tuple((storfs.start[row], storfs.stop[row], storfs.strand_of(row), storf_types[row], storfs.idx[row])
+                                   for row in (candidate, winner)) + (overlap, reason))
+    rows = [ordered_by_priority[k] for k in kept]
+    if options.storf_order == 'start_pos': # sort by start position
+        rows.sort(key=lambda row: storfs.start[row])
+    elif options.storf_order == 'strand': # sort by internal storf number
+        rows.sort(key=lambda row: storfs.idx[row])
+    if metrics is not None:
+        metrics.stop(removed_tiling=len(storfs) - len(rows))
+    return storfs.take(rows)
 
 
 # --------------------------------------------------------
-# Function: tile_filtering
-# Purpose: Filter overlapping ORFs based on length or StORF type priority
-# Logic:
-#   - Sort ORFs by chosen strategy (length or type priority)
-#   - Remove overlapping or nested ORFs using user-specified overlap threshold
-#   - Return filtered and re-sorted ORFs
-# Input:
-#   storfs: OrderedDict of ORFs with positions as keys
-#   options: object with filtering and ordering preferences
+# Function: gff_loci
+# Purpose: GFF start/stop of a StORF from its UR positions
 # Returns:
-#   final_filtered_storfs: OrderedDict of filtered ORFs
+#   (gff_start, gff_stop)
 # --------------------------------------------------------
-
-def tile_filtering(storfs, options):
-    # check which sorting strategy to use, default being 'length'
-    if hasattr(options, 'priority_strategy'):
-        strategy = options.priority_strategy
-    else:
-        strategy = 'length'
-    
-
-    # appply sorting strategy 
-    if strategy == 'length':
-        # sort by ORF length (index 3), descending
-        storfs = sorted(storfs.items(), key=lambda s: s[1][3], reverse=True)
-    elif strategy == 'storf_type':
-        # sort by storf type score (con-storf first), then lenght 
-        storfs = sorted(storfs.items(), key=lambda s: (storf_type_score(s), -s[1][3]))
+def gff_loci(start, stop, strand, ur_offset, unannotated, stop_inclusive):
+    if not unannotated:
+        return start, stop
+    if strand == '+':
+        gff_start = start + 1 + ur_offset # + 1 to adjust the first stop codon loci
+        gff_stop = stop + ur_offset
+        if not stop_inclusive: # To remove the start and stop codon positions.
+            gff_start += 3
     else:
-         # Unsupported strategy
-        raise ValueError(f"Unsupported priority strategy: {strategy}")
-    
-
-    # Convert sorted list to list for mutability
-    ordered_by_priority = list(storfs)
-    num_storfs = len(ordered_by_priority)
-    i = 0
-
-    # Strat filtering process
-    while i < num_storfs:
-        pos_x, data_x = ordered_by_priority[i] # get the first ORF
-        start_x = int(pos_x.split(',')[0]) # get start position 
-        stop_x = int(pos_x.split(',')[-1]) # get start position 
-
-        j = i + 1 # start checking the next ORF
-
-        # Check for overlap with subsequent ORFs
-        while j < num_storfs:
-            pos_y, data_y = ordered_by_priority[j] # get the next ORF 
-            start_y = int(pos_y.split(',')[0]) # get start position 
-            stop_y = int(pos_y.split(',')[-1]) # get start position 
-
-            # No overlap
-            if start_y >= stop_x or stop_y <= start_x:
-                j += 1 # continue to next ORF
-
-            # Fully nested ORF 
-            elif start_y >= start_x and stop_y <= stop_x: 
-                ordered_by_priority.pop(j) # remove nested ORf 
-                num_storfs -= 1 # update the number of ORFs
-            else:
-                # Calculate overlap length 
-                overlap_start = max(start_x, start_y) # get the start of the overlap
-                overlap_end = min(stop_x, stop_y) # get the end of the overlap
-                overlap = max(0, overlap_end - overlap_start + 1) # +1 to include both ends 
-
-                # Remove if overlap exceeds threshold
-                if overlap >= options.overlap_nt: 
-                    ordered_by_priority.pop(j) # remove the overlapping stORF
-                    num_storfs -=1 # update the number of ORFs
-                else:
-                    j += 1 # continue to next ORF
-
-            i += 1 # update the index of the first ORf
-        
-        # Convert filtered list to OrderedDict 
-        filtered_storfs = OrderedDict(ordered_by_priority) # convert to OrderedDict 
-
-        # final sorting based on options 
-        if options.storf_order == 'start_pos': # sort by start position
-            final_filtered_storfs = sortORFs(filtered_storfs) # sort by start position 
-        elif options.storf_order == 'strand': # sort by strand 
-            final_filtered_storfs = OrderedDict() # initialise empty OrderedDict 
-            storf_nums = sorted([item[-1] for item in filtered_storfs.values()]) # get the sorted list of storf numbers
-            for num in storf_nums: # iterate through the sorted list of storf numbers 
-                for key, value in filtered_storfs.items(): # iterate through the filtered storfs 
-                    if value[-1] == num: # check if the storf number matches 
-                        final_filtered_storfs.update((key, value)) # update the final filtered storfs 
-                        break
-        else:
-            final_filtered_storfs = filtered_storfs # keep the order as is 
-
-        return final_filtered_storfs # return the filtered ORfs 
+        gff_start = start - 2 + ur_offset # -2 / -3 to adjust the first stop codon loci
+        gff_stop = stop - 3 + ur_offset
+        if not stop_inclusive:
+            gff_stop -= 3
+    return gff_start, gff_stop
 
+# Per-StORF fields of a GFF/FASTA record template (indices into the fields tuple built by prepare_out)
+(F_START, F_STOP, F_STRAND, F_TYPE, F_IDX, F_STOP_LOCATIONS, F_LENGTH, F_FRAME, F_UR_FRAME, F_START_STOP, F_MID_STOP,
+ F_END_STOP, F_EXTRA) = range(13)
 
+def compile_template(tokens): # Constant text and field indices -> ('%s' template, fields getter)
+    template = ''.join(token.replace('%', '%%') if isinstance(token, str) else '%s' for token in tokens)
+    return template, operator.itemgetter(*[token for token in tokens if not isinstance(token, str)])
 
+# --------------------------------------------------------
+# Function: record_templates
+# Purpose: GFF line and FASTA header templates of a UR, with every
+# field that is the same for all its StORFs (contig, UR name and
+# offset, feature type) already filled in
+# Returns:
+#   (gff_template, fasta_template, contig, ur_offset) - templates as
+#   returned by compile_template
+# --------------------------------------------------------
+def record_templates(options, seq_id):
+    native_seq = seq_id.replace('>','')
+    if options.unannotated == True:
+        ur_name = seq_id.replace('|', ':')
+        ur_offset = int(ur_name.split('_')[-2])
+        ur_attribute = ur_name.replace('>','')
+        contig = native_seq.split('_UR')[0]
+        gff_tokens = [contig + '\tSingle_Genome\t' + options.feature_type + '\t', F_START, '\t', F_STOP, '\t.\t', F_STRAND,
+                      '\t.\tID=' + native_seq + '_', F_TYPE, '_', F_IDX, ':', F_START, '-', F_STOP, ';UR=' + ur_attribute +
+                      ';UR_Stop_Locations=', F_STOP_LOCATIONS, ';Length=', F_LENGTH, ';Strand=', F_STRAND, ';Frame=', F_FRAME,
+                      ';UR_Frame=', F_UR_FRAME, ';Start_Stop=', F_START_STOP, ';Mid_Stop=', F_MID_STOP, ';End_Stop=', F_END_STOP,
+                      ';StORF_Type=', F_TYPE, F_EXTRA, '\n']
+        fasta_tokens = ['>' + native_seq + '_', F_TYPE, '_', F_IDX, ':', F_START, '-', F_STOP, ';UR=' + ur_attribute +
+                        ';UR_Stop_Locations=', F_STOP_LOCATIONS, ';Length=', F_LENGTH, ';Strand=', F_STRAND, ';Frame=', F_FRAME,
+                        ';UR_Frame=', F_UR_FRAME, ';Start_Stop=', F_START_STOP, ';End_Stop=', F_END_STOP, ';StORF_Type=', F_TYPE, '\n']
+    else: # Not done yet
+        ur_offset = 0
+        contig = native_seq
+        gff_tokens = [native_seq + '\tStORF_Reporter\t' + options.feature_type + '\t', F_START, '\t', F_STOP, '\t.\t', F_STRAND,
+                      '\t.\tID=' + native_seq + '_', F_TYPE, '_', F_IDX, ':', F_START, '-', F_STOP, ';=' + native_seq +
+                      ';UR_Stop_Locations=', F_STOP_LOCATIONS, ';Length=', F_LENGTH, ';Frame=', F_FRAME, ';Start_Stop=', F_START_STOP,
+                      ';End_Stop=', F_END_STOP, ';StORF_Type=', F_TYPE, F_EXTRA, '\n']
+        fasta_tokens = ['>' + native_seq + ';Length=', F_LENGTH, ';Strand=', F_STRAND, ';Frame=', F_FRAME, ';Start_Stop=',
+                        F_START_STOP, ';End_Stop=', F_END_STOP, ';StORF_Type=', F_TYPE, '\n']
+    return compile_template(gff_tokens), compile_template(fasta_tokens), contig, ur_offset
 
-def prepare_out(options, storfs, seq_id):
-    gff_entries = []
-    fasta_entries = {}
-    for pos, data in storfs.items():
-        sequence = data[0]
-        strand = data[2]
-        idx = data[5]
-        pos_ = pos.split(',')
+# --------------------------------------------------------
+# Function: prepare_out
+# Purpose: GFF lines and FASTA records of a UR's final StORFs
+# Logic:
+#   - Per-UR fields are rendered into the templates once, each StORF
+#     then fills its own fields into preallocated lists
+#   - A FASTA header seen twice keeps its first place and last sequence
+#     (as when the records were keyed by header)
+# Returns:
+#   (gff_entries, (fasta_headers, fasta_sequences))
+# --------------------------------------------------------
+def prepare_out(options, storfs, seq_id, columns_out=None):
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('formatting')
+    (gff_template, gff_fields), (fasta_template, fasta_fields), contig, ur_offset = record_templates(options, seq_id)
+    unannotated = options.unannotated == True
+    stop_inclusive = options.stop_inclusive == True
+    gc_content = options.gc_content == True
+    start_info = options.start_info == True
+    seq_shift = 1 if stop_inclusive else -2 # -start_info positions within the output StORF sequence (1-based, as -spos)
+    storf_types = storfs.types()
+    ur_name = seq_id.replace('|', ':').replace('>','') # -columnar UR column
+    gff_entries = [None] * len(storfs)
+    fasta_headers = [None] * len(storfs)
+    fasta_sequences = [None] * len(storfs)
+    column_rows = [None] * len(storfs) if columns_out is not None else None
+    for row in range(len(storfs)):
+        sequence = storfs.sequence(row)
+        strand = storfs.strand_of(row)
+        start = storfs.start[row]
+        mid_pos = storfs.mid[row]
+        stop = storfs.stop[row]
+        storf_Type = storf_types[row]
+        length = len(sequence)
         start_stop = sequence[0:3]
-        if len(pos_) == 3:
-            if strand == '-':
-                mid = int(pos_[2]) - int(pos_[1])
-                mid_stop = sequence[mid:mid + 3]
-            else:
-                mid = int(pos_[1]) - int(pos_[0])
-                mid_stop = sequence[mid:mid + 3]
+        end_stop = sequence[-3:]
+        if mid_pos != NO_MID:
+            mid = stop - mid_pos if strand == '-' else mid_pos - start
+            mid_stop = sequence[mid:mid + 3]
+            stop_locations = str(start) + '-' + str(mid_pos) + '-' + str(stop)
         else:
             mid_stop = 'N/A'
-        end_stop = sequence[-3:]
-        start = int(pos_[0])
-        stop = int(pos_[-1])
-        ur_frame = int(data[1])
-        storf_Type = data[4]
-        native_seq = seq_id.replace('>','')
-        ur_name = seq_id.replace('|', ':')
-        length = len(sequence)
-        if options.unannotated == True:
-            if strand == '+':
-                gff_start = str(start + 1 + int(ur_name.split('_')[-2])) # + 1 to adjust the first stop codon loci
-                gff_stop = str(stop + int(ur_name.split('_')[-2]))
-                if options.stop_inclusive == False:  # To remove the start and stop codon positions.
-                    gff_start = str(int(gff_start) + 3)
-                frame = (int(gff_stop) % 3) + 1
-            elif strand == '-':
-                gff_start = str(start - 2 + int(ur_name.split('_')[-2])) # -2 / -3 to adjust the first stop codon loci
-                gff_stop = str(stop - 3 + int(ur_name.split('_')[-2]))
-                if options.stop_inclusive == False:  # To remove the start and stop codon positions.
-                    gff_stop = str(int(gff_stop) - 3)
-                frame = (int(gff_stop) % 3) + 4
-
-            storf_name = native_seq + '_' + storf_Type + '_' + str(idx) + ':' + gff_start + '-' + gff_stop
-
-            gff_entries.append(native_seq.split('_UR')[0] + '\tSingle_Genome\t' + options.feature_type + '\t' + gff_start + '\t' + gff_stop + '\t.\t' + data[2] +
-                '\t.\tID=' + storf_name + ';UR=' + ur_name.replace('>','')  + ';UR_Stop_Locations=' + '-'.join(pos_) + ';Length=' + str(
-                    length) + ';Strand=' + data[2] +
-                ';Frame=' + str(frame) + ';UR_Frame=' + str(ur_frame) +
-                ';Start_Stop=' + start_stop + ';Mid_Stop=' + mid_stop  + ';End_Stop=' + end_stop + ';StORF_Type=' + storf_Type + '\n')
-
-            ### need to add - if con-storf then add middle stops
-            fasta_entries.update({'>' + storf_name + ';UR=' + ur_name.replace('>','')  + ';UR_Stop_Locations=' + '-'.join(pos_) + ';Length=' +
-                                str(length) + ';Strand=' + data[2] + ';Frame=' + str(frame) + ';UR_Frame=' + str(ur_frame) +
-                ';Start_Stop=' + start_stop + ';End_Stop=' + end_stop + ';StORF_Type=' + storf_Type + '\n':data[0]})
-
-#########################################################################
-        elif options.unannotated == False: # Not done yet
-            if strand == '+':
-                frame = (int(stop) % 3) + 4
-            elif strand == '-':
-                frame = (int(stop) % 3) + 1
-            storf_name = native_seq + '_' + storf_Type + '_' + str(idx) + ':' + str(start) + '-' + str(stop)
-
-            gff_entries.append(native_seq + '\tStORF_Reporter\t' + options.feature_type + '\t' + str(start) + '\t' + str(stop) + '\t.\t' + data[2] +
-                '\t.\tID=' + storf_name + ';=' + native_seq + ';UR_Stop_Locations=' + '-'.join(pos_) + ';Length=' + str(length) +
-                               ';Frame=' + str(frame) + ';Start_Stop=' + start_stop + ';End_Stop=' + end_stop + ';StORF_Type=' + storf_Type + '\n')
-
-            fasta_entries.update({'>' + native_seq + ';Length=' + str(length) + ';Strand=' + data[2] + ';Frame=' + str(frame) +
-                ';Start_Stop=' + start_stop + ';End_Stop=' + end_stop + ';StORF_Type=' + storf_Type + '\n':data[0]})
-
-    return gff_entries, fasta_entries
+            stop_locations = str(start) + '-' + str(stop)
+        extra_attributes = ''
+        if gc_content: # From the UR prefix sums, no pass over the sequence
+            offset = storfs.seq_offset[row]
+            extra_attributes = ';GC_Content=' + format(storfs.qc.gc_content(offset, offset + length), '.3f')
+        if start_info:
+            offset = storfs.seq_offset[row]
+            first_start = storfs.start_index.first_start(offset, length, strand)
+            longest_orf = storfs.start_index.longest_orf(offset, length, strand)
+            extra_attributes += ';First_Start=' + (str(first_start + seq_shift) if first_start != -1 else 'N/A')
+            if longest_orf != None:
+                extra_attributes += ';Longest_Sub_ORF=' + str(longest_orf[0] + seq_shift) + '-' + str(longest_orf[0] + longest_orf[1] - 1 + seq_shift)
+            else:
+                extra_attributes += ';Longest_Sub_ORF=N/A'
+        gff_start, gff_stop = gff_loci(start, stop, strand, ur_offset, unannotated, stop_inclusive)
+        if unannotated:
+            frame = (gff_stop % 3) + 1 if strand == '+' else (gff_stop % 3) + 4
+        else:
+            frame = (stop % 3) + 4 if strand == '+' else (stop % 3) + 1
+        fields = (gff_start, gff_stop, strand, storf_Type, storfs.idx[row], stop_locations, length, frame, storfs.frame[row],
+                  start_stop, mid_stop, end_stop, extra_attributes)
+        gff_entries[row] = gff_template % gff_fields(fields)
+        fasta_headers[row] = fasta_template % fasta_fields(fields)
+        fasta_sequences[row] = sequence
+        if column_rows is not None: # Same StORF as the FASTA entry, typed
+            column_rows[row] = (contig, ur_name, fasta_headers[row][1:-1], gff_start, gff_stop,
+                                start, mid_pos, stop, storfs.seq_offset[row], strand, frame, storfs.frame[row], length, storf_Type,
+                                start_stop, mid_stop, end_stop, sequence if stop_inclusive else sequence[3:])
+    if len(set(fasta_headers)) != len(fasta_headers): # Identical headers (possible when not unannotated) - one record each
+        fasta_entries = dict(zip(fasta_headers, fasta_sequences))
+        fasta_headers, fasta_sequences = list(fasta_entries), list(fasta_entries.values())
+        if column_rows is not None: # The row of the record written - first place, last values
+            column_rows = list({column_row[2]: column_row for column_row in column_rows}.values())
+    if column_rows is not None:
+        for column_row in column_rows:
+            columns_out.add(*column_row)
+
+    if metrics is not None:
+        metrics.stop()
+    return gff_entries, (fasta_headers, fasta_sequences)
 
 
 def write_gff(gff_entries,gff_out):
     ###GFF Out
-    for entry in gff_entries:
-            gff_out.write(entry)
+    gff_text = ''.join(gff_entries)
+    gff_out.write(gff_text) # One write per UR
+    return len(gff_text)
 
 def write_fasta(options, fasta_entries, fasta_out,aa_fasta_out):
     ###FASTA Prepare
-    storf_num = 0 # This requires a much more elegant solution.
-    ###FASTA Out
-    for fasta_id, sequence in fasta_entries.items(): # could be made more efficient
-        if options.stop_inclusive == False: # Remove first stop codon.
-            sequence = sequence[3:]
-        if options.aa_only == False:# and options.translate == False:
-            fasta_out.write(fasta_id)
-            if options.line_wrap:
-                wrapped = textwrap.wrap(sequence, width=60)
-                for wrap in wrapped:
-                    fasta_out.write(wrap + '\n')
-            else:
-                fasta_out.write(sequence + '\n')
-        if options.translate == True or options.aa_only == True:
-            aa_fasta_out.write(fasta_id)
-            amino = translate_frame(sequence[0:])
-            if options.stop_ident == False:
-                amino = amino.replace('*', '') # Remove * from sequences
-            if options.line_wrap:
-                amino = textwrap.wrap(amino, width=60)
-                for wrap in amino:
-                    aa_fasta_out.write(wrap + '\n')
-            else:
-                aa_fasta_out.write(amino + '\n')
-        storf_num += 1
+    fasta_ids, sequences = fasta_entries
+    if options.stop_inclusive == False: # Remove first stop codon.
+        sequences = [sequence[3:] for sequence in sequences]
+    ###FASTA Out - each file gets the whole UR as one chunk
+    written = 0
+    if options.aa_only == False:# and options.translate == False:
+        fasta_text = format_fasta(fasta_ids, sequences, options.line_wrap)
+        fasta_out.write(fasta_text)
+        written += len(fasta_text)
+    if options.translate == True or options.aa_only == True: # All StORFs of the UR translated in one batch
+        aminos = translate_sequences(sequences, options.code_table, strip_stops=options.stop_ident == False)
+        aa_text = format_fasta(fasta_ids, aminos, options.line_wrap)
+        aa_fasta_out.write(aa_text)
+        written += len(aa_text)
+    return written # Characters (= bytes, ASCII) passed to the handles
+
+def write_storfs(options, storfs, sequence_id, fasta_out, aa_fasta_out, gff_out, columns_out=None): # Writes a UR's final StORFs and returns them
+    gff_entries, fasta_entries = prepare_out(options, storfs, sequence_id, columns_out)
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('writing')
+    written = write_fasta(options, fasta_entries, fasta_out, aa_fasta_out)
+    if not options.aa_only:
+        written += write_gff(gff_entries, gff_out)
+    if metrics is not None:
+        metrics.stop(bytes_written=written)
+    return storfs
+
+# --------------------------------------------------------
+# Function: write_relations
+# Purpose: -olap_relations TSV rows of a UR - one per overlap checked
+# during tiling, StORFs named by their output IDs
+# Returns:
+#   number of characters written
+# --------------------------------------------------------
+def write_relations(options, relations, seq_id, relations_out):
+    native_seq = seq_id.replace('>','')
+    ur_name = seq_id.replace('|', ':').replace('>','')
+    ur_offset = int(ur_name.split('_')[-2]) if options.unannotated == True else 0
+    unannotated = options.unannotated == True
+    stop_inclusive = options.stop_inclusive == True
+
+    def storf_id(start, stop, strand, storf_type, idx): # As the ID= of the GFF
+        gff_start, gff_stop = gff_loci(start, stop, strand, ur_offset, unannotated, stop_inclusive)
+        return native_seq + '_' + storf_type + '_' + str(idx) + ':' + str(gff_start) + '-' + str(gff_stop)
+
+    rows = []
+    for candidate, kept, overlap, reason in relations:
+        candidate_id, kept_id = storf_id(*candidate), storf_id(*kept)
+        winner = 'both' if reason == 'below_threshold' else kept_id
+        rows.append('\t'.join((ur_name, kept_id, candidate_id, str(overlap), winner, reason)) + '\n')
+    text = ''.join(rows)
+    relations_out.write(text)
+    return len(text)
+
+RELATIONS_HEADER = 'UR\tKept_ID\tCandidate_ID\tOverlap_Length\tWinner\tReason\n'
+
+def reporter_result(storfs, options): # StORF-Reporter gets the dict form - parallel reporter workers send back the compact table
+    if options.reporter == 'table':
+        storfs.parent = '' # The parent process already holds the UR sequence
+        storfs.qc = None
+        storfs.start_index = None
+        return storfs
+    return storfs.to_dict()
+
+def in_frame_successors(stops): # Buckets stops by frame - next_in_frame[i] is the index of the next stop in the same frame as stops[i]
+    next_in_frame = [None] * len(stops)
+    last_in_frame = [None, None, None]
+    for idx in range(len(stops) - 1, -1, -1):
+        frame = stops[idx] % 3
+        next_in_frame[idx] = last_in_frame[frame]
+        last_in_frame[frame] = idx
+    return next_in_frame
 
-#@profile
 def find_storfs(working_frame,sequence_id,stops,sequence,storfs,short_storfs,con_StORFs,frames_covered,counter,lengths,strand,StORF_idx,short_StORF_idx,Con_StORF_idx,options):
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('pairing')
+        found_before = (len(storfs), len(con_StORFs), len(short_storfs))
     first = True
     con_StORF_tracker = ''
-    next_stops = []
-    start_stops = []
-    seen_stops = []
-    for stop in stops:  # Finds Stop-Stop#
-        seen_stops.append(stop)
+    seen_stops = set()
+    next_in_frame = in_frame_successors(stops)
+    sequence_length = len(sequence)
+
+    def storf_loci(first_stop, mid_stop, last_stop): # (start, mid, stop) as reported
+        if working_frame == 'negative': # Loci on the plus strand, stops are never within 3 nt of the end
+            return (sequence_length + 3 - last_stop, NO_MID if mid_stop == None else sequence_length + 3 - mid_stop,
+                    sequence_length + 3 - first_stop)
+        return first_stop, NO_MID if mid_stop == None else mid_stop, last_stop
+
+    for idx, stop in enumerate(stops):  # Finds Stop-Stop#
+        seen_stops.add(stop)
         if strand == '+':
             frame = (stop % 3) + 1
         elif strand == '-':
             frame = (stop % 3) + 4
         frames_covered.update({frame: 1})
-        for next_stop in stops[counter + 1:]:
-            length = abs((next_stop + 3) - stop)
-            if length % 3 == 0 and next_stop not in seen_stops: # In frame and not already seen?
-                    if length >= options.min_orf and length <= options.max_orf:
-                        if not first and stop == prev_next_stop:
-                            if prev_next_stop != con_StORF_tracker:
-                                con_StORF_tracker = next_stop
-                                seq = sequence[prev_stop:next_stop + 3]
-                                length = next_stop - prev_stop
-                                ##### Needed to correct for negative frame loci
-                                if working_frame == 'negative':
-                                    rev_corrected_start, rev_corrected_mid, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,prev_stop,stop,next_stop  + 3)
-                                    con_StORF_Pos = ",".join([str(rev_corrected_start), str(rev_corrected_mid), str(rev_corrected_stop)])
-                                else:
-                                    con_StORF_Pos = ",".join([str(prev_stop), str(stop), str(next_stop  + 3)])
-                                #####
-                                con_length = abs((next_stop + 3) - prev_stop)
-                                con_StORFs.update({con_StORF_Pos: [seq, str(frame), strand, con_length,'Con-StORF',Con_StORF_idx]})
-                                Con_StORF_idx +=1
-                            elif stop == con_StORF_tracker:
-                                con_StORF_tracker = next_stop
-                                prev_con_StORF = next(reversed(con_StORFs.keys())) #Get last key
-                                seq_start = int(prev_con_StORF.split(',')[0])
-                                #seq = sequence[seq_start:next_stop  + 3]
-                                seq = sequence[int(prev_con_StORF.split(',')[0]):next_stop + 3]
-                                length = next_stop - seq_start # Check
-                                prev_con_StORF = prev_con_StORF_CHECKER(prev_con_StORF,sequence,options)
-                                ##### Needed to correct for negative frame loci
-                                if working_frame == 'negative':
-                                    rev_corrected_start, rev_corrected_mid, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,prev_stop,stop,next_stop  + 3)
-                                    con_StORF_Pos = ",".join([str(rev_corrected_start), str(rev_corrected_mid), str(rev_corrected_stop)])
-                                else:
-                                    con_StORF_Pos = ",".join([str(prev_stop), str(stop), str(next_stop  + 3)])
-                                #####
-                                if options.olap_filtering == 'both-strand':
-                                    con_StORFs.popitem()
-                                con_length = abs((next_stop + 3) - prev_stop)
-                                con_StORFs.update({con_StORF_Pos: [seq, str(frame), strand, con_length,'Con-StORF',Con_StORF_idx]})
-                                Con_StORF_idx +=1
-
-                        if options.olap_filtering == 'none': # This could be made more efficient
-                            seq = sequence[stop:next_stop  + 3]
-                            ##### Needed to correct for negative frame loci
-                            if working_frame == 'negative':
-                                rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                storfs.update({",".join([str(rev_corrected_start), str(rev_corrected_stop)]): [seq, str(frame), strand, length, 'StORF', StORF_idx]})
-                            else:
-                                storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame), strand, length,'StORF',StORF_idx]})
-                            #####
-                            StORF_idx +=1
-                            lengths.append(length)
-                        elif not first:
-                            if stop > prev_stop and next_stop < prev_next_stop: # Check
-                                break
-                            storf = set(range(stop, next_stop + 4)) # + 4 to account for set use
-                            storf_overlap = len(prev_storf.intersection(storf))
-                            if storf_overlap <= options.overlap_nt:
-                                seq = sequence[stop:next_stop  + 3]
-                                ##### Needed to correct for negative frame loci
-                                if working_frame == 'negative':
-                                    rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                    storfs.update({",".join([str(rev_corrected_start), str(rev_corrected_stop)]): [
-                                        seq, str(frame), strand, length, 'StORF', StORF_idx]})
-                                else:
-                                    storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame), strand,
-                                                                                               length, 'StORF',
-                                                                                               StORF_idx]})
-                                #####
-                                StORF_idx +=1
-                                seen_stops.append(next_stop)#  + 3)
-                                prev_storf = storf
-                                prev_stop = stop
-                                prev_next_stop = next_stop # Check
-                                next_stops.append(next_stop)
-                                start_stops.append(stop)
-                                prevlength = prev_next_stop - prev_stop
-                            elif storf_overlap >= options.overlap_nt and options.olap_filtering == 'both-strand':  # and length > prevlength:
-                                if length > prevlength:
-                                    storfs.popitem()
-                                    seq = sequence[stop:next_stop  + 3]
-                                    ##### Needed to correct for negative frame loci
-                                    if working_frame == 'negative':
-                                        rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                        storfs.update({",".join(
-                                            [str(rev_corrected_start), str(rev_corrected_stop)]): [seq, str(frame),
-                                                                                                       strand, length,
-                                                                                                       'StORF',
-                                                                                                       StORF_idx]})
-                                    else:
-                                        storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame),
-                                                                                                   strand, length,
-                                                                                                   'StORF', StORF_idx]})
-                                    #####
-                                    StORF_idx +=1
-                                    seen_stops.append(next_stop)
-                                    prev_storf = storf
-                                    prev_stop = stop
-                                    prev_next_stop = next_stop
-                                    next_stops.append(next_stop)
-                                    start_stops.append(stop)
-                                    prevlength = prev_next_stop - prev_stop
-                            else: # If filtering is none or single-strand, we do not remove overlapping StORFs on the same strand
-                                seq = sequence[stop:next_stop  + 3]
-                                ##### Needed to correct for negative frame loci
-                                if working_frame == 'negative':
-                                    rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                    storfs.update({",".join([str(rev_corrected_start), str(rev_corrected_stop)]): [
-                                        seq, str(frame), strand, length, 'StORF', StORF_idx]})
-                                else:
-                                    storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame), strand,
-                                                                                               length, 'StORF',
-                                                                                               StORF_idx]})
-                                #####
-                                StORF_idx += 1
-                                seen_stops.append(next_stop)
-                                prev_storf = storf
-                                prev_stop = stop
-                                prev_next_stop = next_stop
-                                next_stops.append(next_stop)
-                                start_stops.append(stop)
-                                prevlength = prev_next_stop - prev_stop
-                        elif first:
-                            if options.partial_storf: # upstream partial StORF_Reporter
-                                if stop > options.min_orf and frames_covered[frame] != 1:
-                                    seq = sequence[0:stop + 3] #Start of seq to first stop identified
-                                    #ps_seq = cut_seq(seq, '-')
-                                    ##### Needed to correct for negative frame loci
-                                    if working_frame == 'negative':
-                                        rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                        storfs.update({",".join(
-                                            [str(rev_corrected_start), str(rev_corrected_stop)]): [seq, str(frame),
-                                                                                                       strand, length,
-                                                                                                       'StORF',
-                                                                                                       StORF_idx]})
-                                    else:
-                                        storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame),
-                                                                                                   strand, length,
-                                                                                                   'StORF', StORF_idx]})
-                                    #####
-                                    StORF_idx +=1
-                            seq = sequence[stop:next_stop  + 3]
-                            length = next_stop - stop
-                            ##### Needed to correct for negative frame loci
-                            if working_frame == 'negative':
-                                rev_corrected_start, rev_corrected_stop = reverseCorrectLoci(options,len(sequence),sequence_id,stop,None,next_stop  + 3)
-                                storfs.update({",".join([str(rev_corrected_start), str(rev_corrected_stop)]): [seq, str(frame), strand, length, 'StORF', StORF_idx]})
-                            else:
-                                storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame), strand, length,'StORF',StORF_idx]})
-                            #####
+        next_idx = next_in_frame[idx]
+        while next_idx != None: # Only walks stops in the same frame
+            next_stop = stops[next_idx]
+            next_idx = next_in_frame[next_idx]
+            if next_stop in seen_stops: # Already the end of a reported StORF
+                continue
+            length = (next_stop + 3) - stop
+            if length >= options.min_orf and length <= options.max_orf:
+                if not first and stop == prev_next_stop: # Consecutive StORFs make a Con-StORF
+                    if prev_next_stop != con_StORF_tracker:
+                        seq_start = prev_stop
+                    else: # Extend the last Con-StORF
+                        seq_start = con_StORFs.start[-1]
+                        if options.olap_filtering == 'both-strand':
+                            con_StORFs.pop()
+                    length = next_stop - seq_start
+                    con_StORF_tracker = next_stop
+                    con_length = (next_stop + 3) - prev_stop
+                    con_StORFs.append(*storf_loci(prev_stop, stop, next_stop + 3), frame, strand, con_length, 'Con-StORF',
+                                      Con_StORF_idx, slice_ref(sequence_length, seq_start, next_stop + 3, strand))
+                    Con_StORF_idx +=1
+
+                if options.olap_filtering == 'none': # Every in-frame stop pair is reported
+                    storfs.append(*storf_loci(stop, None, next_stop + 3), frame, strand, length, 'StORF', StORF_idx,
+                                  slice_ref(sequence_length, stop, next_stop + 3, strand))
+                    StORF_idx +=1
+                    lengths.append(length)
+                    break
+                if first:
+                    if options.partial_storf: # upstream partial StORF_Reporter
+                        if stop > options.min_orf and frames_covered[frame] != 1:
+                            storfs.append(*storf_loci(stop, None, next_stop + 3), frame, strand, length, 'StORF', StORF_idx,
+                                          slice_ref(sequence_length, 0, stop + 3, strand)) #Start of seq to first stop identified
                             StORF_idx +=1
-                            seen_stops.append(next_stop)
-                            prev_storf = set(range(stop, next_stop + 4)) # + 4 to account for set use
-                            prev_stop = stop
-                            prev_next_stop = next_stop
-                            next_stops.append(next_stop)
-                            start_stops.append(stop)
-                            prevlength = prev_next_stop - prev_stop
-                            first = False
-                        break
-
-                    if options.short_storfs != False and length >= 30: # Report short (<= 120) StORFs
-                        seq = sequence[stop:next_stop  + 3]
-                        length = next_stop - stop # Check
-                        short_storfs.update({",".join([str(stop), str(next_stop  + 3)]): [seq, str(frame), strand, length,'Short-StORF', short_StORF_idx]})
-                        short_StORF_idx +=1
-                    else:
-                        break
-        counter +=1
-    if options.partial_storf:  # downstream partial StORF_Reporter - Last Stop to end of sequence
-        try:
-            if (len(sequence) - stop) > options.min_orf:
-                seq = sequence[stop:len(sequence)]  # Start of seq to first stop identified - not working
-                ps_seq = cut_seq(seq, '+')
-                storfs.update({",".join([str(stop), str(len(sequence))]): [ps_seq, str(frame), strand, stop,'Partial-StORF',StORF_idx]})
-                StORF_idx +=1
-        except UnboundLocalError:
-            pass
+                    length = next_stop - stop
+                    keep = True
+                    first = False
+                elif stop > prev_stop and next_stop < prev_next_stop: # Nested in the previous StORF
+                    break
+                else:
+                    storf_overlap = max(0, min(prev_next_stop, next_stop) - max(prev_stop, stop) + 4) # + 4 as for set(range(stop, next_stop + 4))
+                    if storf_overlap <= options.overlap_nt or options.olap_filtering != 'both-strand':
+                        keep = True # If filtering is single-strand, we do not remove overlapping StORFs on the same strand
+                    else: # both-strand keeps the longer of the two
+                        keep = length > prevlength
+                        if keep:
+                            storfs.pop()
+                if keep:
+                    storfs.append(*storf_loci(stop, None, next_stop + 3), frame, strand, length, 'StORF', StORF_idx,
+                                  slice_ref(sequence_length, stop, next_stop + 3, strand))
+                    StORF_idx +=1
+                    seen_stops.add(next_stop)
+                    prev_stop = stop
+                    prev_next_stop = next_stop
+                    prevlength = prev_next_stop - prev_stop
+                break
 
+            if options.short_storfs != False and length >= 30: # Report short (<= 120) StORFs
+                short_storfs.append(stop, NO_MID, next_stop + 3, frame, strand, next_stop - stop, 'Short-StORF', short_StORF_idx,
+                                    slice_ref(sequence_length, stop, next_stop + 3, strand))
+                short_StORF_idx +=1
+            else:
+                break
+        counter +=1
+    if options.partial_storf and stops:  # downstream partial StORF_Reporter - Last Stop to end of sequence
+        if (sequence_length - stop) > options.min_orf:
+            ps_length = (sequence_length - stop) - (sequence_length - stop) % 3 # Trimmed to whole codons from the end
+            storfs.append(stop, NO_MID, sequence_length, frame, strand, stop, 'Partial-StORF', StORF_idx,
+                          slice_ref(sequence_length, stop, stop + ps_length, strand))
+            StORF_idx +=1
+
+    if metrics is not None: # Con-StORFs extended in place are only counted once
+        metrics.stop(candidates=len(storfs) + len(con_StORFs) + len(short_storfs) - sum(found_before),
+                     con_storf_candidates=len(con_StORFs) - found_before[1], short_storf_candidates=len(short_storfs) - found_before[2])
     return storfs, short_storfs, con_StORFs, frames_covered, counter, lengths, StORF_idx, Con_StORF_idx
 
-def STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, gff_out, split_index): #Main Function
+# --------------------------------------------------------
+# Function: scan_ur
+# Purpose: Everything STORF_Finder computes from a UR sequence alone -
+# the six frame stop scan, the SequenceQC and (when start codons are
+# needed) the StartIndex - so one scan can serve several filter runs
+# Returns:
+#   (frame_stops, qc, start_index)
+# --------------------------------------------------------
+def scan_ur(sequence, options):
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('stop_scan')
+    try:
+        codons = encode_codons(sequence) # Shared by the stop scan and the StartIndex
+    except ImportError: # No NumPy - both fall back to Python
+        codons = None
+    frame_stops = scan_stops(sequence, options.stop_codons, codons) # All six frames in a single pass
+    qc = SequenceQC(sequence) # Non-standard nucleotide and GC prefix sums, built once per UR
+    if options.start_filtering == True or getattr(options, 'start_info', False) == True:
+        start_index = StartIndex(sequence, options.stop_codons, codons) # In-frame start/stop lookups, built once per UR
+    else:
+        start_index = None
+    if metrics is not None:
+        metrics.stop(stops_scanned=sum(len(stops) for stops in frame_stops.values()))
+    return frame_stops, qc, start_index
+
+def select_storfs(options, sequence_info, sequence_id, split_index, ur_scan=None, relations=None): # Final (filtered and ordered) StORFTable of a UR, or None
     ## If UR is the start of a sequence the 0/1 base position throws off the start of the StORF
     if sequence_id.split('_')[split_index] == '1':
         start_of_seq = True
@@ -553,17 +507,17 @@ def STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, g
         start_of_seq = False
 
 
-    sequence = sequence_info[1]
-    stops = []
+    sequence = sequence_info[1] # The minus strand is never materialised, only the reported StORFs are reverse complemented
     frames_covered = OrderedDict()
     for x in range (1,7):
         frames_covered.update({x: 0})
-    for stop_codon in options.stop_codons.split(','): #Find all Stops in seq
-        stops += [match.start() for match in re.finditer(re.escape(stop_codon), sequence)]
-    stops.sort()
-    storfs = OrderedDict()
-    short_storfs = OrderedDict()
-    con_StORFs = OrderedDict()
+    if ur_scan is None:
+        ur_scan = scan_ur(sequence, options)
+    frame_stops, qc, start_index = ur_scan
+    stops = strand_stops(frame_stops, '+')
+    storfs = StORFTable(sequence, qc, start_index)
+    short_storfs = StORFTable(sequence, qc, start_index)
+    con_StORFs = StORFTable(sequence, qc, start_index)
     counter = 0
     lengths = []
     StORF_idx = 0
@@ -571,55 +525,64 @@ def STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, g
     Con_StORF_idx = 0
     storfs, short_storfs, con_StORFs,frames_covered,counter,lengths,StORF_idx,Con_StORF_idx = find_storfs("positive",sequence_id,stops,sequence,storfs,short_storfs,con_StORFs,frames_covered,counter,lengths,'+',StORF_idx,short_StORF_idx,Con_StORF_idx,options)
     ###### Reversed Comppliment
-    sequence_rev = revCompIterative(sequence)
-    stops = []
-    for stop_codon in options.stop_codons.split(','): #Find all Stops in seq
-        stops += [match.start() for match in re.finditer(re.escape(stop_codon), sequence_rev)]
-    stops.sort()
+    stops = strand_stops(frame_stops, '-') # Already in reverse complement coordinates
     counter = 0
-    storfs, short_storfs, con_StORFs,frames_covered,counter,lengths,StORF_idx,Con_StORF_idx = find_storfs("negative",sequence_id,stops,sequence_rev,storfs,short_storfs,con_StORFs,frames_covered,counter,lengths,'-',StORF_idx,short_StORF_idx,Con_StORF_idx,options)
+    storfs, short_storfs, con_StORFs,frames_covered,counter,lengths,StORF_idx,Con_StORF_idx = find_storfs("negative",sequence_id,stops,sequence,storfs,short_storfs,con_StORFs,frames_covered,counter,lengths,'-',StORF_idx,short_StORF_idx,Con_StORF_idx,options)
+    ## One StORF per position key - the minus strand's wins, as when StORFs were dicts keyed by "start,stop"
+    storfs = storfs.collapse_positions()
+    short_storfs = short_storfs.collapse_positions()
+    con_StORFs = con_StORFs.collapse_positions()
+    ## Reject StORFs with too many non-standard nucleotides
+    storfs = non_standard_filtering(storfs, options)
+    short_storfs = non_standard_filtering(short_storfs, options)
+    con_StORFs = non_standard_filtering(con_StORFs, options)
 
     ## The correction for base 0/1 position in the UR
     if start_of_seq == True:
-        for key in list(storfs.keys()):
-            if storfs[key][2] == '-':  # Check if the strand is '-'
-                positions = key.split(',')
-                new_positions = [str(int(pos) - 1) for pos in positions]
-                new_key = ','.join(new_positions)
-                storfs[new_key] = storfs.pop(key)
+        for row in range(len(storfs)):
+            if storfs.strand_of(row) == '-':  # Check if the strand is '-'
+                storfs.start[row] -= 1
+                storfs.stop[row] -= 1
+        storfs = storfs.collapse_positions()
 
     #Potential run-through StORFs
     if options.whole_contig:
         for frame,present in frames_covered.items():
             if present == 0:
-                if frame <4:
-                    wc_seq = sequence[frame-1:]
-                    wc_seq = cut_seq(wc_seq,'+')
-                    storfs.update({",".join([str(0), str(len(sequence))]): [wc_seq, str(frame), '+', len(sequence),'Run-Through-StORF',StORF_idx]})
-                    StORF_idx +=1
-                else:
-                    wc_seq = sequence_rev[frame-4:]
-                    wc_seq = cut_seq(wc_seq,'+')
-                    storfs.update({",".join([str(0), str(len(sequence))]): [wc_seq, str(frame), '-', len(sequence_rev),'Run-Through-StORF',StORF_idx]})
-                    StORF_idx +=1
+                wc_offset = (frame - 1) % 3
+                wc_length = (len(sequence) - wc_offset) - (len(sequence) - wc_offset) % 3 # Trimmed to whole codons from the end
+                wc_strand = '+' if frame < 4 else '-'
+                storfs.append(0, NO_MID, len(sequence), frame, wc_strand, len(sequence), 'Run-Through-StORF',
+                              StORF_idx, slice_ref(len(sequence), wc_offset, wc_offset + wc_length, wc_strand))
+                StORF_idx +=1
+
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start('con_storf_assembly')
+    final_storfs = assemble_storfs(options, storfs, short_storfs, con_StORFs, relations)
+    if metrics is not None:
+        metrics.stop()
+    return final_storfs
 
+# --------------------------------------------------------
+# Function: assemble_storfs
+# Purpose: Combine a UR's StORF, Short-StORF and Con-StORF tables into
+# the reported StORFs - type selection, filtering and ordering
+# Returns:
+#   StORFTable or None if there is nothing to report
+# --------------------------------------------------------
+def assemble_storfs(options, storfs, short_storfs, con_StORFs, relations=None):
 ####################################### Writing output
     ######## Only StORFs
     #Check if there are StORFs to report
     if options.con_storfs == False and options.con_only == False and options.short_storfs == False:
         if bool(storfs):
             if options.start_filtering == True:
-                storfs = start_filtering(storfs)
+                storfs = start_filtering(storfs, getattr(options, 'metrics', None))
             if options.olap_filtering == 'both-strand':
-                storfs = tile_filtering(storfs, options)  # Filtering
-            storfs = OrderedDict(sorted(storfs.items(), key=lambda e: tuple(map(int, e[0].split(",")))))  # Reorder by start position
-            if options.reporter == True:
-                return storfs
-            ###Data Prepare
-            gff_entries, fasta_entries = prepare_out(options, storfs, sequence_id)
-            write_fasta(options, fasta_entries, fasta_out, aa_fasta_out)
-            if not options.aa_only:
-                write_gff(gff_entries, gff_out)
+                storfs = tile_filtering(storfs, options, relations)  # Filtering
+            storfs = storfs.sorted_by_position()  # Reorder by start position
+            return storfs
 
     ###### Only Short-StORFs
     # elif options.short_storfs != False and options.short_storfs_only == True: # Short-StORFs ONLY
@@ -639,92 +602,405 @@ def STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, g
     elif options.short_storfs != False: # and options.short_storfs_only == False:
         ### Don't allow short-storfs to overlap with storfs
         if options.short_storfs == 'Nolap':
-            all_StORFs = {**storfs, **short_storfs}
+            all_StORFs = storfs.concat(short_storfs)
             if options.olap_filtering == 'both-strand':
-                all_StORFs = tile_filtering(all_StORFs,options) # Filtering
-            filtered_StORFs = OrderedDict(sorted(all_StORFs.items(), key=lambda e: tuple(map(int, e[0].split(","))))) # Reorder by start position
+                all_StORFs = tile_filtering(all_StORFs,options, relations) # Filtering
+            filtered_StORFs = all_StORFs.sorted_by_position() # Reorder by start position
 
         ### short-storfs can onverlap with storfs
         elif options.short_storfs == 'Olap':
             if options.olap_filtering == 'both-strand': # Filter individually
-                storfs = tile_filtering(storfs,options) # Filtering
-                short_storfs = tile_filtering(short_storfs,options) # Filtering
-            all_StORFs = {**storfs, **short_storfs}
-            filtered_StORFs = OrderedDict(sorted(all_StORFs.items(), key=lambda e: tuple(map(int, e[0].split(",")))))
+                storfs = tile_filtering(storfs,options, relations) # Filtering
+                short_storfs = tile_filtering(short_storfs,options, relations) # Filtering
+            all_StORFs = storfs.concat(short_storfs)
+            filtered_StORFs = all_StORFs.sorted_by_position()
         if options.short_storfs_only == True: # Checking what short_storfs survived filtering and extracting them
-            final_StORFs = dict(short_storfs.items() & filtered_StORFs.items())
+            final_StORFs = filtered_StORFs.take([row for row in range(len(filtered_StORFs)) if filtered_StORFs.type_of(row) == 'Short-StORF'])
             if len(final_StORFs) != 0:
                 print("we have one: " + options.fasta)
         else:
             final_StORFs = filtered_StORFs
 
-        if options.reporter == True:
-            return final_StORFs
-            ###Data Prepare
-        gff_entries, fasta_entries = prepare_out(options, final_StORFs, sequence_id)
-        write_fasta(options, fasta_entries, fasta_out, aa_fasta_out)
-        if not options.aa_only:
-            write_gff(gff_entries, gff_out)
+        return final_StORFs
 
     ####### StORFs and Con-StORFs
     elif options.con_storfs == True and options.con_only == False:
-        all_StORFs = {**storfs, **con_StORFs}
+        all_StORFs = storfs.concat(con_StORFs)
         if bool(storfs):
             if options.olap_filtering == 'both-strand':
-                all_StORFs = tile_filtering(all_StORFs, options) # Filtering
-            all_StORFs = OrderedDict(sorted(all_StORFs.items(), key=lambda e: tuple(map(int, e[0].split(","))))) # Reorder by start position
-            if options.reporter == True:
-                return all_StORFs
-            ###Data Prepare
-            gff_entries, fasta_entries = prepare_out(options, all_StORFs, sequence_id)
-            write_fasta(options, fasta_entries, fasta_out, aa_fasta_out)
-            if not options.aa_only:
-                write_gff(gff_entries, gff_out)
+                all_StORFs = tile_filtering(all_StORFs, options, relations) # Filtering
+            all_StORFs = all_StORFs.sorted_by_position() # Reorder by start position
+            return all_StORFs
 
     ###### Con-StORFs only
     elif options.con_only == True:
         if options.olap_filtering == 'both-strand':
-            con_StORFs = tile_filtering(con_StORFs, options)
-            con_StORFs = OrderedDict(sorted(con_StORFs.items(), key=lambda e: tuple(map(int, e[0].split(","))))) # Reorder by start position
-        else:
-            con_StORFs = OrderedDict(sorted(con_StORFs.items(), key=lambda e: tuple(map(int, e[0].split(","))))) # Reorder by start position
-        if options.reporter == True:
-            return con_StORFs
-        ###Data Prepare
-        gff_entries, fasta_entries = prepare_out(options, con_StORFs, sequence_id)
-        write_fasta(options, fasta_entries, fasta_out, aa_fasta_out)
-        if not options.aa_only:
-            write_gff(gff_entries, gff_out)
+            con_StORFs = tile_filtering(con_StORFs, options, relations)
+        con_StORFs = con_StORFs.sorted_by_position() # Reorder by start position
+        return con_StORFs
     ###### Below won't work..?
     elif options.verbose == True:
         print("No StOFS Found")
 
-def fasta_load(fasta_in, sequence_regions, sequences):
-    first = True
+def STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, gff_out, split_index, ur_scan=None, columns_out=None,
+                 relations_out=None): #Main Function
+    metrics = getattr(options, 'metrics', None)
+    if metrics is not None:
+        metrics.start_ur(sequence_id, len(sequence_info[1]))
+    relations = [] if relations_out is not None else None
+    ur_cache = getattr(options, 'ur_cache', None) if relations is None else None # Cached URs are not tiled again - not used with -olap_relations
+    if ur_cache is not None: # Same UR sequence and search options as an earlier run - skip the search
+        cache_key = ur_cache.key(sequence_info[1], sequence_id.split('_')[split_index] == '1', options)
+        found, storfs = ur_cache.get(cache_key, sequence_info[1])
+        if found and metrics is not None:
+            metrics.count('cache_hits')
+        if found and storfs is not None:
+            if getattr(options, 'gc_content', False) == True:
+                storfs.qc = SequenceQC(sequence_info[1])
+            if getattr(options, 'start_info', False) == True:
+                storfs.start_index = StartIndex(sequence_info[1], options.stop_codons)
+    if ur_cache is None or not found:
+        storfs = select_storfs(options, sequence_info, sequence_id, split_index, ur_scan, relations)
+        if ur_cache is not None:
+            ur_cache.put(cache_key, storfs)
+    if relations:
+        write_relations(options, relations, sequence_id, relations_out)
+    if metrics is not None:
+        metrics.count('reported', len(storfs) if storfs is not None else 0)
+    if storfs is None:
+        result = None
+    elif options.reporter in (True, 'table'):
+        result = reporter_result(storfs, options)
+    else: ###Data Prepare
+        result = write_storfs(options, storfs, sequence_id, fasta_out, aa_fasta_out, gff_out, columns_out)
+    if metrics is not None:
+        metrics.end_ur()
+    return result
+
+# --------------------------------------------------------
+# Function: read_fasta
+# Purpose: Stream FASTA records one at a time
+# Logic:
+#   - Sequence lines are collected in a list and joined once per record
+#   - '##sequence-region' lines are appended to sequence_regions as they
+#     are read and set the region length of the record being read
+#   - Records before the first sequence line are skipped (as fasta_load)
+# Input:
+#   fasta_in: open text handle (plain, gzip or BGZF - see open_fasta)
+#   sequence_regions: list collecting '##sequence-region' lines
+# Yields:
+#   (sequence_id, region_length, sequence)
+# --------------------------------------------------------
+def read_fasta(fasta_in, sequence_regions):
+    sequence_name = None
+    seq_lines = []
     sequence_region_length = 0
+    seen_sequence = False
     for line in fasta_in:
         line = line.strip()
         if '##sequence-region' in line:
             sequence_region_length = int(line.split(' ')[-1]) # bug and wont work on non-UR runs
             sequence_regions.append(line)
-        elif line.startswith((';','\n','#')):
+        elif line.startswith((';','#')):
             continue
-        elif line.startswith('>') and not first:
-            sequences.update({sequence_name: [sequence_region_length,seq.strip()]})
-            seq = ''
-            sequence_name = line.strip()
         elif line.startswith('>'):
-            seq = ''
-            sequence_name = line.strip()
+            if seen_sequence:
+                yield sequence_name, sequence_region_length, ''.join(seq_lines)
+            seq_lines = []
+            sequence_name = line
         elif line:
-            seq += str(line)
-            first = False
-    sequences.update({sequence_name: [sequence_region_length,seq.strip()]})
+            seq_lines.append(line)
+            seen_sequence = True
+    if sequence_name is not None and seen_sequence:
+        yield sequence_name, sequence_region_length, ''.join(seq_lines)
+
+# --------------------------------------------------------
+# Function: read_indexed_urs
+# Purpose: The records of selected URs, fetched through the FASTA index
+# instead of reading the whole file (-ur_ids)
+# Logic:
+#   - Same records as read_fasta gives for those URs, in file order
+#   - '##sequence-region' lines are found in the mapped file and all go
+#     to sequence_regions, each UR gets the region length of the last
+#     one before the next header (as read_fasta)
+# Input:
+#   indexed: IndexedFasta of the UR file
+#   ur_ids: UR names (header up to the first space, '>' optional)
+#   sequence_regions: list collecting '##sequence-region' lines
+# Returns:
+#   iterator of (sequence_id, region_length, sequence) - KeyError
+#   straight away for a name not in the index
+# --------------------------------------------------------
+def read_indexed_urs(indexed, ur_ids, sequence_regions):
+    wanted = set(ur_id.lstrip('>') for ur_id in ur_ids)
+    missing = sorted(wanted.difference(indexed))
+    if missing:
+        raise KeyError('URs not in ' + indexed.name + ': ' + ', '.join(missing[:5]) + (' ...' if len(missing) > 5 else ''))
+    regions = indexed.lines_starting('##sequence-region')
+    sequence_regions.extend(line.strip() for _, line in regions)
+    region_offsets = [offset for offset, _ in regions]
+    names = list(indexed)
+    following = dict(zip(names, names[1:]))
+
+    def region_length(name): # read_fasta reads a record up to the next header
+        end = indexed.header_offset(following[name]) if name in following else float('inf')
+        region = bisect.bisect_right(region_offsets, end) - 1
+        return int(regions[region][1].strip().split(' ')[-1]) if region >= 0 else 0
+
+    return ((indexed.header(name).strip(), region_length(name), indexed[name])
+            for name in indexed if name in wanted and indexed.length(name) > 0) # Checked above, read as the URs are searched
+
+def read_ur_ids(ur_ids): # -ur_ids: comma separated names or a file of names (one per line)
+    if os.path.isfile(ur_ids):
+        with open(ur_ids) as ids_in:
+            return [line.strip() for line in ids_in if line.strip()]
+    return [ur_id.strip() for ur_id in ur_ids.split(',') if ur_id.strip()]
+
+def fasta_load(fasta_in, sequence_regions, sequences): # Whole file in memory - main() streams with read_fasta
+    for sequence_name, sequence_region_length, seq in read_fasta(fasta_in, sequence_regions):
+        sequences.update({sequence_name: [sequence_region_length, seq]})
     return sequence_regions, sequences
 
+# --------------------------------------------------------
+# Function: size_chunks
+# Purpose: Group streamed URs into chunks of roughly chunk_nt bases
+# so each worker task is about the same amount of work
+# Yields:
+#   (records, regions_seen) - regions_seen is len(sequence_regions)
+#   when each record was read, to place late '##sequence-region' lines
+# --------------------------------------------------------
+def size_chunks(records, sequence_regions, chunk_nt=CHUNK_NT):
+    chunk, regions_seen, chunk_size = [], [], 0
+    for record in records:
+        chunk.append(record)
+        regions_seen.append(len(sequence_regions))
+        chunk_size += len(record[2])
+        if chunk_size >= chunk_nt:
+            yield chunk, regions_seen
+            chunk, regions_seen, chunk_size = [], [], 0
+    if chunk:
+        yield chunk, regions_seen
+
+def cache_counters(options): # (hits, misses, evictions) of the -cache URCache of this process
+    ur_cache = getattr(options, 'ur_cache', None)
+    return ur_cache.counters() if ur_cache is not None else (0, 0, 0)
+
+def merge_cache_counters(options, before, after): # Adds a worker's cache counters to the main process
+    ur_cache = getattr(options, 'ur_cache', None)
+    if ur_cache is not None:
+        ur_cache.add_stats(*[count_after - count_before for count_before, count_after in zip(before, after)])
+
+def find_chunk_task(options, chunk, outputs): # Pool task - find_chunk plus the worker's cache counters and -metrics for the chunk
+    before = cache_counters(options)
+    results = find_chunk(options, chunk, outputs)
+    metrics = getattr(options, 'metrics', None)
+    return results, before, cache_counters(options), metrics.worker_results() if metrics is not None else None
+
+OUTPUT_HANDLES = [io.StringIO, io.StringIO, io.StringIO, ColumnBuffer, io.StringIO] # fasta, aa fasta, gff, -columnar, -olap_relations
+
+def find_chunk(options, chunk, outputs): # Worker - runs STORF_Finder on each UR and returns its captured fasta/aa/gff text (and -columnar rows, -olap_relations text)
+    results = []
+    for sequence_id, sequence_region_length, sequence in chunk:
+        handles = [handle_type() if wanted else None for handle_type, wanted in zip(OUTPUT_HANDLES, outputs)]
+        if len(sequence) >= options.min_orf:
+            STORF_Finder(options, [sequence_region_length, sequence], sequence_id, handles[0], handles[1], handles[2], 3,
+                         columns_out=handles[3] if len(handles) > 3 else None,
+                         relations_out=handles[4] if len(handles) > 4 else None)
+        results.append([handle.getvalue() if handle is not None else '' for handle in handles])
+    return results
+
+# --------------------------------------------------------
+# Function: process_pool
+# Purpose: multiprocessing.Pool for the -threads workers, started with
+# forkserver (spawn where there is none) rather than fork
+# Logic:
+#   - The -gz writers and the BGZF reader run thread pools, and a fork
+#     taken while one of their threads holds a lock (the allocator, I/O)
+#     can leave a worker deadlocked. forkserver workers are forked from a
+#     clean single threaded server process
+#   - Tasks and initargs are pickled either way
+# --------------------------------------------------------
+def process_pool(threads, **kwargs):
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method).Pool(threads, **kwargs)
+
+# --------------------------------------------------------
+# Function: find_parallel
+# Purpose: Run StORF-Finder over streamed URs with a process pool
+# Logic:
+#   - Size balanced chunks are submitted in input order and at most
+#     2 * threads chunks are in flight, so memory stays bounded
+#   - Results are collected in submission order, so the output is the
+#     same as a serial run
+#   - task is find_chunk_task, or sweep_chunk_task for -sweep
+# Yields:
+#   (regions_seen, [fasta, aa_fasta, gff] text) per UR in input order
+#   (for -sweep, a list of ([fasta, aa_fasta, gff] text, StORF types)
+#   per configuration)
+# --------------------------------------------------------
+def find_parallel(options, records, sequence_regions, outputs, task=find_chunk_task):
+    pending = collections.deque()
+    with process_pool(options.threads) as pool:
+        for chunk, regions_seen in size_chunks(records, sequence_regions):
+            pending.append((regions_seen, pool.apply_async(task, (options, chunk, outputs))))
+            while len(pending) >= 2 * options.threads:
+                regions_seen, result = pending.popleft()
+                results, before, after, metrics = result.get()
+                merge_cache_counters(options, before, after)
+                if metrics is not None:
+                    options.metrics.merge(metrics)
+                yield from zip(regions_seen, results)
+        while pending:
+            regions_seen, result = pending.popleft()
+            results, before, after, metrics = result.get()
+            merge_cache_counters(options, before, after)
+            if metrics is not None:
+                options.metrics.merge(metrics)
+            yield from zip(regions_seen, results)
+
+# -sweep parameters: name -> (options dest, value parser)
+SWEEP_PARAMETERS = OrderedDict([
+    ('olap', ('overlap_nt', int)),
+    ('minorf', ('min_orf', int)),
+    ('maxorf', ('max_orf', int)),
+    ('priority', ('priority_strategy', str)),
+    ('olap_filt', ('olap_filtering', str)),
+    ('con_storfs', ('con_storfs', eval)),
+    ('start_filt', ('start_filtering', eval))])
+SWEEP_CHOICES = {'priority': ['length', 'storf_type'], 'olap_filt': ['none', 'single-strand', 'both-strand'],
+                 'con_storfs': [True, False], 'start_filt': [True, False]}
+
+# --------------------------------------------------------
+# Function: sweep_configs
+# Purpose: Expand a -sweep grid into one options object per configuration
+# Input:
+#   options: run options - the base every configuration starts from
+#   sweep: e.g. "olap=0,50,100;minorf=99,150;con_storfs=False,True"
+# Returns:
+#   list of (name, options) - names are sweep_1, sweep_2 ... in grid order
+# --------------------------------------------------------
+def sweep_configs(options, sweep):
+    grid = OrderedDict()
+    for parameter in sweep.split(';'):
+        if not parameter.strip():
+            continue
+        name, _, values = parameter.partition('=')
+        name = name.strip().lstrip('-')
+        if name not in SWEEP_PARAMETERS:
+            sys.exit('StORF-Finder: error: -sweep parameter must be one of ' + ', '.join(SWEEP_PARAMETERS) + ": '" + name + "'")
+        dest, value_type = SWEEP_PARAMETERS[name]
+        try:
+            grid[dest] = [value_type(value.strip()) for value in values.split(',')]
+        except (ValueError, NameError, SyntaxError):
+            sys.exit("StORF-Finder: error: invalid -sweep values for " + name + ": '" + values + "'")
+        if name in SWEEP_CHOICES and any(value not in SWEEP_CHOICES[name] for value in grid[dest]):
+            sys.exit('StORF-Finder: error: -sweep ' + name + ' must be from ' + ', '.join(map(str, SWEEP_CHOICES[name])))
+    configs = []
+    for number, values in enumerate(itertools.product(*grid.values()), 1):
+        config = copy.copy(options)
+        for dest, value in zip(grid, values):
+            setattr(config, dest, value)
+        configs.append(('sweep_' + str(number), config))
+    return configs
+
+def sweep_scan_options(options, configs): # One scan has to serve every configuration
+    scan_options = copy.copy(options)
+    scan_options.start_filtering = any(config.start_filtering == True for _, config in configs)
+    return scan_options
+
+def sweep_ur(configs, scan_options, record, outputs): # Scans a UR once and searches it with every configuration - returns each one's StORF types
+    sequence_id, sequence_region_length, sequence = record
+    if len(sequence) < min(config.min_orf for _, config in configs):
+        return [[] for _ in configs]
+    ur_scan = scan_ur(sequence, scan_options)
+    config_types = []
+    for (_, config), (fasta_out, aa_fasta_out, gff_out) in zip(configs, outputs):
+        storfs = None
+        if len(sequence) >= config.min_orf:
+            storfs = STORF_Finder(config, [sequence_region_length, sequence], sequence_id, fasta_out, aa_fasta_out, gff_out, 3, ur_scan)
+        config_types.append(storfs.types() if storfs else [])
+    return config_types
+
+def sweep_chunk(configs, scan_options, chunk, outputs): # Worker - sweep_ur on each UR of a chunk, returns the captured fasta/aa/gff text and StORF types per configuration
+    results = []
+    for record in chunk:
+        handles = [[io.StringIO() if wanted else None for wanted in outputs] for _ in configs]
+        config_types = sweep_ur(configs, scan_options, record, handles)
+        results.append([([handle.getvalue() if handle is not None else '' for handle in config_handles], types)
+                        for config_handles, types in zip(handles, config_types)])
+    return results
+
+def sweep_chunk_task(options, chunk, outputs): # Pool task - sweep_chunk for the configurations of options.sweep, as find_chunk_task
+    configs = sweep_configs(options, options.sweep)
+    before = cache_counters(options)
+    results = sweep_chunk(configs, sweep_scan_options(options, configs), chunk, outputs)
+    return results, before, cache_counters(options), None
+
+# --------------------------------------------------------
+# Function: run_sweep
+# Purpose: -sweep mode - each UR is scanned once (scan_ur) and every
+# configuration runs the StORF search and filtering on that scan
+# Logic:
+#   - Each configuration writes its own output set (<output>_sweep_N)
+#   - <output>_sweep_summary.tsv has one row per configuration with
+#     its parameters and the number of StORFs of each type reported
+#   - With -threads, chunks of URs are swept by find_parallel's process
+#     pool and written in input order, as a serial run
+# --------------------------------------------------------
+def run_sweep(options, records, output_file, sequence_regions):
+    configs = sweep_configs(options, options.sweep)
+    outputs = [open_outputs(config, output_file + '_' + name, sequence_regions) for name, config in configs]
+    counts = [collections.Counter() for _ in configs]
+    regions_written = len(sequence_regions)
+
+    def write_regions(first, last): # '##sequence-region' lines found later in the file
+        for _, _, gff_out in outputs:
+            if gff_out is not None:
+                for seq_reg in sequence_regions[first:last]:
+                    gff_out.write(seq_reg + '\n')
+
+    if getattr(options, 'threads', 1) > 1:
+        wanted = [out is not None for out in outputs[0]] # Output options are not swept
+        for regions_seen, ur_results in find_parallel(options, records, sequence_regions, wanted, task=sweep_chunk_task):
+            if regions_seen > regions_written:
+                write_regions(regions_written, regions_seen)
+                regions_written = regions_seen
+            for (texts, types), handles, count in zip(ur_results, outputs, counts):
+                for out, text in zip(handles, texts):
+                    if text:
+                        out.write(text)
+                if types:
+                    count['URs'] += 1
+                    count.update(types)
+    else:
+        scan_options = sweep_scan_options(options, configs)
+        for record in records:
+            if len(sequence_regions) > regions_written:
+                write_regions(regions_written, len(sequence_regions))
+                regions_written = len(sequence_regions)
+            for types, count in zip(sweep_ur(configs, scan_options, record, outputs), counts):
+                if types:
+                    count['URs'] += 1
+                    count.update(types)
+    for handles in outputs:
+        for out in handles:
+            if out is not None:
+                out.close()
+
+    with open(output_file + '_sweep_summary.tsv', 'w', newline='\n', encoding='utf-8') as summary_out:
+        summary_out.write('\t'.join(['Config'] + ['-' + name for name in SWEEP_PARAMETERS] + ['URs_With_StORFs'] +
+                                     STORF_TYPES + ['Total']) + '\n')
+        for (name, config), count in zip(configs, counts):
+            row = [name] + [str(getattr(config, dest)) for dest, _ in SWEEP_PARAMETERS.values()] + [str(count['URs'])]
+            row += [str(count[storf_type]) for storf_type in STORF_TYPES] + [str(sum(count[storf_type] for storf_type in STORF_TYPES))]
+            summary_out.write('\t'.join(row) + '\n')
+    return counts
+
 ## Function to control how StORF-Finder handles Single_Genome output
 def StORF_Reported(options, Contigs):
     options.unannotated = True
+    if getattr(options, 'threads', 1) > 1:
+        return StORF_Reported_parallel(options, Contigs)
     Reporter_StORFs = collections.OrderedDict()
     for Contig_ID, Contig_URs in Contigs.items():
         Reporter_StORFs.update({Contig_ID:[]})
@@ -750,6 +1026,147 @@ def StORF_Reported(options, Contigs):
     return Reporter_StORFs
 
 
+# --------------------------------------------------------
+# Function: StORF_Reported_parallel
+# Purpose: StORF_Reported using options.threads worker processes
+# Logic:
+#   - All UR sequences are copied once into a shared memory block, tasks
+#     only carry (sequence_id, contig_length, offset, length)
+#   - Workers return each UR's StORFTable without its sequence and the
+#     dict form is built here from the UR sequence already held
+#   - Tasks are size balanced chunks and results are merged in input
+#     order, giving the same Reporter_StORFs as StORF_Reported
+# --------------------------------------------------------
+def StORF_Reported_parallel(options, Contigs):
+    Reporter_StORFs = collections.OrderedDict()
+    tasks = [] # (Contig_ID, UR, sequence_id, contig_length)
+    for Contig_ID, Contig_URs in Contigs.items():
+        Reporter_StORFs.update({Contig_ID:[]})
+        URs = Contig_URs[3]
+        try:
+            for UR in URs:
+                if len(URs[UR][1]) >= options.min_orf:
+                    if UR.split('_')[0] == '0': # This is to account for the GFF base-1 system
+                        sequence_id = "1_" + UR.split('_')[1]
+                    else:
+                        sequence_id = UR
+                    tasks.append((Contig_ID, UR, sequence_id, Contigs[Contig_ID][1]))
+        except TypeError:
+            print("No URs in seq")
+    if not tasks:
+        return Reporter_StORFs
+
+    encoded = [Contigs[Contig_ID][3][UR][1].encode('utf-8') for Contig_ID, UR, _, _ in tasks]
+    shared_seqs = shared_memory.SharedMemory(create=True, size=sum(len(sequence) for sequence in encoded) or 1)
+    try:
+        chunks, chunk, chunk_size, offset = [], [], 0, 0
+        for (_, _, sequence_id, contig_length), sequence in zip(tasks, encoded):
+            shared_seqs.buf[offset:offset + len(sequence)] = sequence
+            chunk.append((sequence_id, contig_length, offset, len(sequence)))
+            offset += len(sequence)
+            chunk_size += len(sequence)
+            if chunk_size >= CHUNK_NT:
+                chunks.append(chunk)
+                chunk, chunk_size = [], 0
+        if chunk:
+            chunks.append(chunk)
+        del encoded
+
+        worker_options = copy.copy(options)
+        worker_options.reporter = 'table'
+        with process_pool(options.threads, initializer=init_reporter_worker,
+                          initargs=(worker_options, shared_seqs.name)) as pool:
+            results = itertools.chain.from_iterable(chunk_results for chunk_results, _, _ in
+                                                    (merge_worker_counters(options, task_result) for task_result in pool.imap(report_chunk, chunks)))
+            for (Contig_ID, UR, sequence_id, _), storfs in zip(tasks, results):
+                if storfs:
+                    URs = Contigs[Contig_ID][3]
+                    storfs.parent = URs[UR][1]
+                    StORFs = storfs.to_dict()
+                    for StORF in StORFs.values():
+                        StORF.append(URs[UR][0]) # True UR
+                        StORF.append(sequence_id) # Extended UR
+                    Reporter_StORFs[Contig_ID].append(StORFs)
+    finally:
+        shared_seqs.close()
+        shared_seqs.unlink()
+    return Reporter_StORFs
+
+_worker_state = {} # Per process - the reporter options and the attached shared memory
+
+def init_reporter_worker(options, shared_name):
+    _worker_state['options'] = options
+    _worker_state['shared_seqs'] = shared_memory.SharedMemory(name=shared_name)
+
+def merge_worker_counters(options, task_result):
+    merge_cache_counters(options, task_result[1], task_result[2])
+    return task_result
+
+def report_chunk(chunk): # Worker - StORF_Finder on URs read straight from shared memory
+    options = _worker_state['options']
+    buf = _worker_state['shared_seqs'].buf
+    before = cache_counters(options)
+    results = []
+    for sequence_id, contig_length, offset, length in chunk:
+        sequence = bytes(buf[offset:offset + length]).decode('utf-8')
+        StORFs = STORF_Finder(options, [contig_length, sequence], sequence_id, None, None, None, 0)
+        results.append(StORFs if StORFs else None)
+    return results, before, cache_counters(options)
+
+
+# --------------------------------------------------------
+# Function: open_outputs
+# Purpose: Create the GFF/FASTA/aa FASTA outputs of a run (buffered)
+# and write the GFF header
+# Logic:
+#   - With -gz the files are written by BlockGzipWriter, compressing
+#     blocks on -threads threads (-gz_level, -gz_format)
+# Returns:
+#   fasta_out, aa_fasta_out, gff_out - None where not written
+# --------------------------------------------------------
+def open_output(options, path): # Buffered text output, '.gz' added with -gz - clears the file if not empty
+    if options.gz:
+        return OutputBuffer(BlockGzipWriter(path + '.gz', options.gz_level, options.threads, options.gz_format))
+    return OutputBuffer(open(path, 'w', newline='\n', encoding='utf-8'))
+
+def open_outputs(options, output_file, sequence_regions):
+    if not options.aa_only:
+        gff_out = open_output(options, output_file + '.gff')
+        gff_out.write("##gff-version\t3\n#\tSingle_Genome - Stop ORF Predictions\n#\tRun Date:" + str(date.today()) + '\n')
+        gff_out.write('##Single_Genome ' + StORF_Reporter_Version + '\n')
+        for seq_reg in sequence_regions:
+            gff_out.write(seq_reg + '\n')
+        gff_out.write("##Original File: " + options.fasta.split(os.sep)[-1] + '\n\n')
+        fasta_out = open_output(options, output_file + '.fasta')
+        if options.translate:
+            aa_fasta_out = open_output(options, output_file + '_aa.fasta')
+        else:
+            aa_fasta_out = None
+    else:
+        gff_out = fasta_out = None
+        aa_fasta_out = open_output(options, output_file + '_aa.fasta')
+    return fasta_out, aa_fasta_out, gff_out
+
+# --------------------------------------------------------
+# Function: default_options
+# Purpose: Options of a plain nucleotide run with the defaults of main(),
+# for calling the search functions directly (tests, benchmark)
+# Input:
+#   kwargs: options to change
+# Returns:
+#   argparse.Namespace
+# --------------------------------------------------------
+def default_options(**kwargs):
+    options = dict(unannotated=True, whole_contig=False, partial_storf=False, olap_filtering='both-strand',
+                   start_filtering=False, con_storfs=False, con_only=False, short_storfs=False,
+                   short_storfs_only=False, feature_type='CDS', min_orf=99, max_orf=60000,
+                   stop_codons='TAG,TGA,TAA', non_standard='0.20', overlap_nt=50, storf_order='start_pos',
+                   priority_strategy='length', translate=False, code_table=11, gc_content=False, start_info=False,
+                   aa_only=False, line_wrap=True, stop_inclusive=False, stop_ident=False, reporter=False,
+                   verbose=False, threads=1, ur_cache=None)
+    options.update(kwargs)
+    return argparse.Namespace(**options)
+
 def main():
     # Create the main argument parser with a description that includes the tool version
     parser = argparse.ArgumentParser(description='StORF-Reporter ' + StORF_Reporter_Version + ': StORF-Finder Run Parameters.')
@@ -826,6 +1243,14 @@ def main():
                           help='Default - "length": Strategy to prioritise StORFs during overlap filtering. '
                                '"length" keeps the longest ORFs. "storf_type" prioritises Con-StORFs over regular StORFs.')
     # ----------------------------------------------------------------------------------------
+    optional.add_argument('-ur_ids', action='store', dest='ur_ids', default=None, required=False,
+                          help='Default - None: Only search these URs - comma separated names or a file of names (one per '
+                               'line). The uncompressed input is read through a samtools-style .fai index (built next to it '
+                               'if missing), so the other URs are never loaded')
+    optional.add_argument('-sweep', action='store', dest='sweep', default=None, required=False,
+                          help='Default - None: Parameter sweep - scan each UR once and report every combination of the given '
+                               'filter settings, e.g. "olap=0,50,100;minorf=99,150;priority=length,storf_type". Parameters: '
+                               + ', '.join(SWEEP_PARAMETERS) + '. Writes <output>_sweep_N files and <output>_sweep_summary.tsv')
 
     # Define output-related arguments group
     output = parser.add_argument_group('Output')
@@ -835,8 +1260,24 @@ def main():
                         help='Default -  Same directory as input FASTA')
     output.add_argument('-gff', action='store', dest='gff', default=True, type=eval, choices=[True, False],
                         help='Default - True: Output a GFF file')
+    output.add_argument('-gc_content', action="store", dest='gc_content', default=False, type=eval, choices=[True, False],
+                        help='Default - False: Add the GC content of each StORF to its GFF entry (GC_Content=)')
+    output.add_argument('-start_info', action="store", dest='start_info', default=False, type=eval, choices=[True, False],
+                        help='Default - False: Add the first in-frame start codon (First_Start=) and the longest start-to-stop '
+                             'sub-ORF (Longest_Sub_ORF=) of each StORF to its GFF entry')
+    output.add_argument('-columnar', action="store", dest='columnar', default=False, type=eval, choices=[True, False],
+                        help='Default - False: Also write the StORFs as a typed columnar table (<output>.npz - see '
+                             'storf_columns.py) for downstream analysis - needs numpy, not written with -sweep')
+    output.add_argument('-olap_relations', action="store", dest='olap_relations', default=False, type=eval, choices=[True, False],
+                        help='Default - False: Also write every overlap checked by -olap_filt both-strand tiling to '
+                             '<output>_overlaps.tsv - both StORF IDs, overlap length (in UR positions, as -olap), the '
+                             'StORF kept and why (nested, threshold, priority or below_threshold). -cache is not used, '
+                             'not written with -sweep')
     output.add_argument('-aa', action="store", dest='translate', default=False, type=eval, choices=[True, False],
                         help='Default - False: Report StORFs as amino acid sequences')
+    output.add_argument('-code_table', action="store", dest='code_table', default=DEFAULT_TABLE, type=int,
+                        choices=sorted(NCBI_TABLES),
+                        help='Default - 11: NCBI translation table used for -aa and -aa_only output')
     output.add_argument('-aa_only', action="store", dest='aa_only', default=False, type=eval, choices=[True, False],
                         help='Default - False: Only output Amino Acid Fasta')
     output.add_argument('-lw', action="store", dest='line_wrap', default=True, type=eval, choices=[True, False],
@@ -850,6 +1291,11 @@ def main():
                         help='Default - False: Report all gene sequences (nt) at the bottom of GFF files in Prokka output mode')
     output.add_argument('-gz', action='store', dest='gz', default='False', type=eval, choices=[True, False],
                         help='Default - False: Output as .gz')
+    output.add_argument('-gz_level', action='store', dest='gz_level', default=6, type=int, choices=range(10),
+                        metavar='0-9', help='Default - 6: Compression level of -gz output')
+    output.add_argument('-gz_format', action='store', dest='gz_format', default='bgzf', choices=GZ_FORMATS,
+                        help='Default - bgzf: -gz output as BGZF blocks (readable by gzip/zcat, block-level random '
+                             'access as bgzip) or larger plain gzip members')
 
     # Hidden/internal flag
     optional.add_argument('-nout', action='store', dest='nout', default='False', type=eval, choices=[True, False],
@@ -857,6 +1303,15 @@ def main():
 
     # Miscellaneous group
     misc = parser.add_argument_group('Misc')
+    misc.add_argument('-threads', action='store', dest='threads', default=1, type=int,
+                      help='Default - 1: Number of processes used to search URs - Output order is unchanged')
+    misc.add_argument('-cache', action='store', dest='cache_dir', default=None, required=False,
+                      help='Default - None: Directory of a StORF cache - URs already searched with the same sequence and '
+                           'search options are not searched again (output-only options such as -aa/-lw/-gz can change)')
+    misc.add_argument('-cache_size', action='store', dest='cache_size', default=1024, type=int,
+                      help='Default - 1024: Maximum size of the -cache directory in MB - least recently used URs are removed')
+    misc.add_argument('-metrics', action='store', dest='metrics_file', default=None, required=False,
+                      help='Default - None: Write per-phase wall time and counters (per UR and in total) to this JSON file')
     misc.add_argument('-verbose', action='store', dest='verbose', default=False, type=eval, choices=[True, False],
                       help='Default - False: Print out runtime messages')
     misc.add_argument('-v', action='store_true', dest='version',
@@ -882,17 +1337,33 @@ def main():
     #############
 
 
+    if options.cache_dir != None:
+        options.ur_cache = URCache(options.cache_dir, options.cache_size * 1024 * 1024)
+    else:
+        options.ur_cache = None
+    if options.metrics_file != None and not options.sweep:
+        options.metrics = RunMetrics()
+    else: # -sweep runs every configuration on each UR - not recorded
+        options.metrics = None
+
     #ns_nt = defaultdict  # Used to Record non-standard nucleotides - not implemented yet
     ##### Load in fasta file
-    sequences = OrderedDict()
     sequence_regions = []
+    records = iter(())
+    first_record = None
     if options.reporter == False:
-        try: # Detect whether fasta files are .gz or text and read accordingly
-            fasta_in = gzip.open(options.fasta,'rt')
-            sequence_regions, sequences = fasta_load(fasta_in, sequence_regions, sequences)
-        except:
-            fasta_in = open(options.fasta,'r')
-            sequence_regions, sequences =  fasta_load(fasta_in, sequence_regions, sequences)
+        if options.ur_ids != None: # Only the listed URs are read, through the FASTA index
+            try:
+                fasta_in = IndexedFasta(options.fasta)
+                records = read_indexed_urs(fasta_in, read_ur_ids(options.ur_ids), sequence_regions)
+            except (ValueError, KeyError) as error:
+                sys.exit('StORF-Finder: error: -ur_ids: ' + str(error).strip('"\''))
+        else:
+            fasta_in = open_fasta(options.fasta, options.threads) # Plain, gzip or BGZF - told apart by the magic bytes
+            records = read_fasta(fasta_in, sequence_regions) # URs are processed as they are read
+        if options.metrics != None:
+            records = timed_records(records, options.metrics)
+        first_record = next(records, None) # Reads the '##sequence-region' header lines for the GFF
         if options.verbose == True:
             print(fasta_in.name)
     #### Output Directory and Filename handling
@@ -911,40 +1382,55 @@ def main():
         output_file = options.fasta.replace(tmp_filename, '')
         output_file = output_file + options.o_name
 
-    if not options.gz: # Clear fasta and gff files if not empty - Needs an elegant solution
-        if not options.aa_only:
-            gff_out = open(output_file + '.gff', 'w', newline='\n', encoding='utf-8')
-            gff_out.write("##gff-version\t3\n#\tSingle_Genome - Stop ORF Predictions\n#\tRun Date:" + str(date.today()) + '\n')
-            gff_out.write('##Single_Genome ' + StORF_Reporter_Version + '\n')
-            for seq_reg in sequence_regions:
-                gff_out.write(seq_reg + '\n')
-            gff_out.write("##Original File: " + options.fasta.split(os.sep)[-1] + '\n\n')
-            fasta_out = open(output_file + '.fasta', 'w', newline='\n', encoding='utf-8')
-            if options.translate:
-                aa_fasta_out = open(output_file + '_aa.fasta', 'w', newline='\n', encoding='utf-8')
-            else:
-                aa_fasta_out = None
-        elif options.aa_only:
-            aa_fasta_out = open(output_file + '_aa.fasta', 'w', newline='\n', encoding='utf-8')
-    elif options.gz:
-        if not options.aa_only:
-            gff_out = gzip.open(output_file + '.gff.gz', 'wt', newline='\n', encoding='utf-8')
-            gff_out.write("##gff-version\t3\n#\tSingle_Genome - Stop ORF Predictions\n#\tRun Date:" + str(date.today()) + '\n')
-            gff_out.write('##Single_Genome ' + StORF_Reporter_Version + '\n')
-            for seq_reg in sequence_regions:
-                gff_out.write(seq_reg + '\n')
-            gff_out.write("##Original File: " + options.gff + '\n\n')
-            fasta_out = gzip.open(output_file + '.fasta.gz', 'wt', newline='\n', encoding='utf-8')
-            if options.translate:
-                aa_fasta_out = gzip.open(output_file + '_aa.fasta.gz', 'wt', newline='\n', encoding='utf-8')
-            else:
-                aa_fasta_out = None
-        elif options.aa_only:
-            aa_fasta_out = gzip.open(output_file + '_aa.fasta.gz', 'wt', newline='\n', encoding='utf-8')
-
-    for sequence_id, sequence_info in sequences.items():
-        if len(sequence_info[1]) >= options.min_orf:
-            STORF_Finder(options, sequence_info, sequence_id, fasta_out, aa_fasta_out, gff_out,3)
+    if not options.sweep: # -sweep writes one output set per configuration
+        fasta_out, aa_fasta_out, gff_out = open_outputs(options, output_file, sequence_regions)
+        if options.columnar == True:
+            try:
+                columns_out = ColumnWriter(output_file + '.npz')
+            except ImportError as error:
+                sys.exit('StORF-Finder: error: -columnar: ' + str(error))
+        else:
+            columns_out = None
+        if options.olap_relations == True:
+            relations_out = open_output(options, output_file + '_overlaps.tsv')
+            relations_out.write(RELATIONS_HEADER)
+        else:
+            relations_out = None
+
+    regions_written = len(sequence_regions)
+    if first_record is not None:
+        records = itertools.chain([first_record], records)
+    if options.sweep:
+        run_sweep(options, records, output_file, sequence_regions)
+        return
+    if options.threads > 1:
+        handles = (fasta_out, aa_fasta_out, gff_out, columns_out, relations_out)
+        for regions_seen, ur_output in find_parallel(options, records, sequence_regions, [out is not None for out in handles]):
+            if gff_out is not None and regions_seen > regions_written: # '##sequence-region' lines found later in the file
+                for seq_reg in sequence_regions[regions_written:regions_seen]:
+                    gff_out.write(seq_reg + '\n')
+                regions_written = regions_seen
+            for out, text in zip(handles, ur_output):
+                if text:
+                    out.write(text)
+    else:
+        for sequence_id, sequence_region_length, sequence in records:
+            if gff_out is not None and len(sequence_regions) > regions_written: # '##sequence-region' lines found later in the file
+                for seq_reg in sequence_regions[regions_written:]:
+                    gff_out.write(seq_reg + '\n')
+                regions_written = len(sequence_regions)
+            if len(sequence) >= options.min_orf:
+                STORF_Finder(options, [sequence_region_length, sequence], sequence_id, fasta_out, aa_fasta_out, gff_out,3, columns_out=columns_out,
+                             relations_out=relations_out)
+    for out in (gff_out, fasta_out, aa_fasta_out, columns_out, relations_out): # Write out anything still buffered
+        if out is not None:
+            out.close()
+    if options.ur_cache != None:
+        print(options.ur_cache.stats())
+    if options.metrics != None:
+        options.metrics.write(options.metrics_file)
+        if options.verbose == True:
+            print(options.metrics.summary())
 
 if __name__ == "__main__":
     main()
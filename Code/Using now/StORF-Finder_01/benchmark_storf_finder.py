@@ -0,0 +1,257 @@
+# --------------------------------------------------------
+# Script: benchmark_storf_finder
+# Purpose: Timing baseline for StORF-Finder on seeded synthetic genomes
+# Logic:
+#   - generate_genome writes a UR FASTA (as made by StORF-Reporter's UR
+#     extraction) with set GC content, extra stop codon density and a
+#     log-normal UR length distribution - same seed, same file
+#   - Each scale (10kb, 1Mb, 10Mb of UR sequence) times fasta_load, the
+#     per-UR stages (scan_ur, find_storfs, tile_filtering, prepare_out,
+#     write_fasta) summed over all URs, and an end-to-end main() run
+#   - Results are written as JSON. -baseline compares them to an earlier
+#     results file and flags every phase slower than -tolerance
+# Usage:
+#   python benchmark_storf_finder.py -o results.json
+#   python benchmark_storf_finder.py -scales 10kb,1Mb -baseline results.json
+# --------------------------------------------------------
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# StORF_Finder imports utilss, storf_columns and indexed_fasta from Code/Using now
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import StORF_Finder
+from StORF_Finder import scan_ur, find_storfs, non_standard_filtering, tile_filtering, prepare_out, write_fasta, \
+    fasta_load, default_options
+from codon_index import strand_stops
+from storf_table import StORFTable
+
+SCALES = OrderedDict([('10kb', 10000), ('1Mb', 1000000), ('10Mb', 10000000)])
+PHASES = ['fasta_load', 'scan_ur', 'find_storfs', 'tile_filtering', 'prepare_out', 'write_fasta', 'main']
+STOP_CODONS = ['TAG', 'TGA', 'TAA']
+MIN_REGRESSION = 0.005 # Seconds - smaller differences are timer noise
+
+
+# --------------------------------------------------------
+# Function: generate_urs
+# Purpose: Seeded synthetic URs - same seed, same URs
+# Input:
+#   size: total UR nucleotides
+#   gc: GC fraction of the random sequence
+#   stop_density: fraction of codons replaced by a stop codon, on top of
+#   the stops the random sequence already has
+#   ur_median, ur_sigma: log-normal UR length distribution (min 30 nt)
+# Returns:
+#   [(ur_id, sequence)] with ur_ids as '>SYN_1_UR_<start>_<stop>', and
+#   the sequence-region length
+# --------------------------------------------------------
+def generate_urs(size, seed=0, gc=0.5, stop_density=0.0, ur_median=500, ur_sigma=1.0):
+    rnd = random.Random(seed)
+    weights = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+    urs = []
+    ur_start = 1
+    remaining = size
+    while remaining > 0:
+        length = min(remaining, max(30, int(rnd.lognormvariate(math.log(ur_median), ur_sigma))))
+        sequence = rnd.choices('ACGT', weights=weights, k=length)
+        codons = length // 3
+        for codon in rnd.sample(range(codons), int(round(codons * stop_density))):
+            sequence[codon * 3:codon * 3 + 3] = rnd.choice(STOP_CODONS)
+        urs.append(('>SYN_1_UR_' + str(ur_start) + '_' + str(ur_start + length - 1), ''.join(sequence)))
+        ur_start += length + rnd.randint(100, 2000) # Annotated gene between URs
+        remaining -= length
+    return urs, ur_start
+
+
+# --------------------------------------------------------
+# Function: generate_genome
+# Purpose: Write a seeded synthetic UR FASTA (URs from generate_urs)
+# Returns:
+#   number of URs written
+# --------------------------------------------------------
+def generate_genome(fasta_path, size, seed=0, gc=0.5, stop_density=0.0, ur_median=500, ur_sigma=1.0):
+    urs, region_length = generate_urs(size, seed, gc, stop_density, ur_median, ur_sigma)
+    with open(fasta_path, 'w') as fasta_out:
+        fasta_out.write('##sequence-region SYN_1 1 ' + str(region_length) + '\n')
+        for ur_id, sequence in urs:
+            fasta_out.write(ur_id + '\n')
+            for line in range(0, len(sequence), 60):
+                fasta_out.write(sequence[line:line + 60] + '\n')
+    return len(urs)
+
+
+# --------------------------------------------------------
+# Function: time_phases
+# Purpose: Time each StORF-Finder stage on a UR FASTA
+# Logic:
+#   - The per-UR stages are run in the order STORF_Finder runs them
+#     (for the default StORF-only output) and summed over all URs
+# Returns:
+#   {phase: seconds}
+# --------------------------------------------------------
+def time_phases(fasta_path, options):
+    timings = OrderedDict((phase, 0.0) for phase in PHASES)
+    clock = time.perf_counter()
+    with open(fasta_path) as fasta_in:
+        sequence_regions, sequences = fasta_load(fasta_in, [], OrderedDict())
+    timings['fasta_load'] = time.perf_counter() - clock
+    fasta_out = io.StringIO()
+    for sequence_id, (_, sequence) in sequences.items():
+        clock = time.perf_counter()
+        frame_stops, qc, start_index = scan_ur(sequence, options)
+        timings['scan_ur'] += time.perf_counter() - clock
+
+        clock = time.perf_counter()
+        frames_covered = OrderedDict((frame, 0) for frame in range(1, 7))
+        storfs = StORFTable(sequence, qc, start_index)
+        short_storfs = StORFTable(sequence, qc, start_index)
+        con_storfs = StORFTable(sequence, qc, start_index)
+        found = (storfs, short_storfs, con_storfs, frames_covered, 0, [], 0, 0)
+        for working_frame, strand in (('positive', '+'), ('negative', '-')):
+            storfs, short_storfs, con_storfs, frames_covered, _, lengths, storf_idx, con_storf_idx = found
+            found = find_storfs(working_frame, sequence_id, strand_stops(frame_stops, strand), sequence, storfs,
+                                short_storfs, con_storfs, frames_covered, 0, lengths, strand, storf_idx, 0,
+                                con_storf_idx, options)
+        storfs = non_standard_filtering(found[0], options)
+        timings['find_storfs'] += time.perf_counter() - clock
+        if not storfs:
+            continue
+
+        clock = time.perf_counter()
+        storfs = tile_filtering(storfs, options).sorted_by_position()
+        timings['tile_filtering'] += time.perf_counter() - clock
+
+        clock = time.perf_counter()
+        gff_entries, fasta_entries = prepare_out(options, storfs, sequence_id)
+        timings['prepare_out'] += time.perf_counter() - clock
+
+        clock = time.perf_counter()
+        write_fasta(options, fasta_entries, fasta_out, None)
+        timings['write_fasta'] += time.perf_counter() - clock
+    return timings
+
+
+def time_main(fasta_path, out_dir, extra_args=()):
+    argv = sys.argv
+    sys.argv = ['StORF_Finder.py', '-f', fasta_path, '-odir', out_dir + os.sep, '-oname', 'benchmark'] + list(extra_args)
+    try:
+        clock = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            StORF_Finder.main()
+        return time.perf_counter() - clock
+    finally:
+        sys.argv = argv
+
+
+# --------------------------------------------------------
+# Function: run_benchmarks
+# Purpose: Generate each scale's genome and time it
+# Returns:
+#   results dict as written to JSON - best of 'repeats' runs per phase
+# --------------------------------------------------------
+def run_benchmarks(scales, repeats=3, seed=0, gc=0.5, stop_density=0.0, ur_median=500, ur_sigma=1.0, main_args=()):
+    results = OrderedDict()
+    results['meta'] = OrderedDict([
+        ('date', datetime.now().isoformat(timespec='seconds')), ('python', platform.python_version()),
+        ('machine', platform.machine()), ('storf_reporter_version', StORF_Finder.StORF_Reporter_Version),
+        ('repeats', repeats), ('seed', seed), ('gc', gc), ('stop_density', stop_density), ('ur_median', ur_median),
+        ('ur_sigma', ur_sigma), ('main_args', list(main_args))])
+    results['scales'] = OrderedDict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in scales:
+            fasta_path = os.path.join(tmp_dir, 'synthetic_' + scale + '.fasta')
+            ur_count = generate_genome(fasta_path, SCALES[scale], seed, gc, stop_density, ur_median, ur_sigma)
+            best = OrderedDict((phase, None) for phase in PHASES)
+            for _ in range(repeats):
+                timings = time_phases(fasta_path, default_options())
+                timings['main'] = time_main(fasta_path, tmp_dir, main_args)
+                for phase, seconds in timings.items():
+                    if best[phase] is None or seconds < best[phase]:
+                        best[phase] = seconds
+            results['scales'][scale] = OrderedDict([('nt', SCALES[scale]), ('urs', ur_count),
+                                                    ('seconds', best)])
+            print(scale + '\t' + '\t'.join(phase + '=' + format(seconds, '.4f') for phase, seconds in best.items()))
+    return results
+
+
+# --------------------------------------------------------
+# Function: compare_results
+# Purpose: Phases that got slower than a baseline results file
+# Returns:
+#   [(scale, phase, baseline seconds, new seconds)] for every phase
+#   slower by more than tolerance (a fraction) and MIN_REGRESSION
+# --------------------------------------------------------
+def compare_results(baseline, results, tolerance=0.10):
+    regressions = []
+    for scale, scale_results in results['scales'].items():
+        if scale not in baseline['scales']:
+            continue
+        baseline_seconds = baseline['scales'][scale]['seconds']
+        for phase, seconds in scale_results['seconds'].items():
+            before = baseline_seconds.get(phase)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > MIN_REGRESSION:
+                regressions.append((scale, phase, before, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='StORF-Finder benchmarks on seeded synthetic genomes')
+    parser.add_argument('-scales', action='store', dest='scales', default=','.join(SCALES),
+                        help='Default - ' + ','.join(SCALES) + ': Comma separated genome sizes to benchmark')
+    parser.add_argument('-r', action='store', dest='repeats', default=3, type=int,
+                        help='Default - 3: Runs per scale - the fastest run of each phase is reported')
+    parser.add_argument('-seed', action='store', dest='seed', default=0, type=int,
+                        help='Default - 0: Random seed of the synthetic genome')
+    parser.add_argument('-gc', action='store', dest='gc', default=0.5, type=float,
+                        help='Default - 0.5: GC content of the synthetic genome')
+    parser.add_argument('-stop_density', action='store', dest='stop_density', default=0.0, type=float,
+                        help='Default - 0.0: Fraction of codons replaced by stop codons')
+    parser.add_argument('-ur_median', action='store', dest='ur_median', default=500, type=int,
+                        help='Default - 500: Median UR length (log-normal)')
+    parser.add_argument('-ur_sigma', action='store', dest='ur_sigma', default=1.0, type=float,
+                        help='Default - 1.0: Sigma of the log-normal UR length distribution')
+    parser.add_argument('-main_args', action='store', dest='main_args', default='',
+                        help='Default - None: Extra StORF-Finder arguments for the end-to-end main() run, e.g. "-aa True"')
+    parser.add_argument('-o', action='store', dest='output', default=None,
+                        help='Default - None: Write results to this JSON file')
+    parser.add_argument('-baseline', action='store', dest='baseline', default=None,
+                        help='Default - None: Earlier results JSON - exits with status 1 if any phase regressed')
+    parser.add_argument('-tolerance', action='store', dest='tolerance', default=0.10, type=float,
+                        help='Default - 0.10: Allowed slowdown against -baseline (fraction)')
+    options = parser.parse_args()
+
+    scales = options.scales.split(',')
+    for scale in scales:
+        if scale not in SCALES:
+            sys.exit('Unknown scale: ' + scale + ' - choose from ' + ', '.join(SCALES))
+    results = run_benchmarks(scales, options.repeats, options.seed, options.gc, options.stop_density,
+                             options.ur_median, options.ur_sigma, options.main_args.split())
+    if options.output != None:
+        with open(options.output, 'w') as results_out:
+            json.dump(results, results_out, indent=2)
+    if options.baseline != None:
+        with open(options.baseline) as baseline_in:
+            baseline = json.load(baseline_in)
+        regressions = compare_results(baseline, results, options.tolerance)
+        for scale, phase, before, seconds in regressions:
+            print('REGRESSION\t' + scale + '\t' + phase + '\t' + format(before, '.4f') + 's -> ' + format(seconds, '.4f') + 's')
+        if regressions:
+            sys.exit(1)
+        print('No regressions against ' + options.baseline)
+
+
+if __name__ == "__main__":
+    main()
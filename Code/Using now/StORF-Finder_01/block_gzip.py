@@ -0,0 +1,280 @@
+# --------------------------------------------------------
+# Module: block_gzip
+# Purpose: Compressed StORF-Finder output (-gz) with the compression
+# done on a thread pool
+# Logic:
+#   - Written text is cut into independent blocks, each compressed on
+#     its own into a complete gzip member. zlib releases the GIL while
+#     deflating, so blocks compress in parallel with each other and
+#     with the StORF search on the main thread
+#   - Members are written in order - a file of gzip members is one valid
+#     gzip stream (gzip -d / zcat / gzip.open read it as a whole)
+#   - 'bgzf' blocks are BGZF (as samtools/htslib/bgzip): at most
+#     BGZF_BLOCK_SIZE bytes each with the compressed size in a header
+#     field and an empty EOF block at the end, so a reader can find
+#     every block without decompressing and jump straight to one
+#   - 'gzip' blocks are larger (GZIP_BLOCK_SIZE) plain gzip members,
+#     which compress slightly better
+# Input side (open_fasta): the format of a file is told from its first
+# bytes, BGZF blocks are decompressed on a thread pool in the same way
+# --------------------------------------------------------
+import gzip
+import io
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BGZF_BLOCK_SIZE = 0xff00 # Uncompressed bytes per BGZF block (as htslib), always fits the 64KB block limit
+GZIP_BLOCK_SIZE = 1 << 20
+BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+FORMATS = ['bgzf', 'gzip']
+GZIP_MAGIC = b'\x1f\x8b'
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff' # No name, no mtime - same output for the same input
+_BGZF_HEADER = struct.Struct('<4BI2BH2BHH') # Fixed fields, XLEN, 'BC' subfield and its BSIZE
+_FOOTER = struct.Struct('<II') # CRC32, uncompressed size
+
+
+# --------------------------------------------------------
+# Function: compress_block
+# Purpose: One block of data as a complete gzip member
+# Input:
+#   data: bytes (at most BGZF_BLOCK_SIZE for bgzf)
+#   level: zlib compression level 0-9
+#   bgzf: add the BGZF 'BC' extra field
+# Returns:
+#   bytes of the gzip member
+# --------------------------------------------------------
+def compress_block(data, level=6, bgzf=True):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS) # Raw deflate, header/footer added here
+    deflated = compressor.compress(data) + compressor.flush()
+    footer = _FOOTER.pack(zlib.crc32(data), len(data) & 0xffffffff)
+    if bgzf:
+        block_size = _BGZF_HEADER.size + len(deflated) + _FOOTER.size
+        header = _BGZF_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord('B'), ord('C'), 2, block_size - 1)
+    else:
+        header = _GZIP_HEADER
+    return header + deflated + footer
+
+
+# --------------------------------------------------------
+# Class: BlockGzipWriter
+# Purpose: Text file handle writing a multi-member gzip/BGZF file
+# Input:
+#   path: output file
+#   level: compression level 0-9
+#   threads: compression threads
+#   gz_format: 'bgzf' or 'gzip'
+# Logic:
+#   - At most 4 blocks per thread are in flight, finished blocks are
+#     written as soon as every block before them is written
+#   - flush() writes finished blocks but does not cut a block short,
+#     close() compresses the rest and waits for all of them
+# --------------------------------------------------------
+class BlockGzipWriter:
+
+    def __init__(self, path, level=6, threads=1, gz_format='bgzf'):
+        if gz_format not in FORMATS:
+            raise ValueError('Unknown compressed output format ' + str(gz_format))
+        self.name = path
+        self.level = level
+        self.bgzf = gz_format == 'bgzf'
+        self.block_size = BGZF_BLOCK_SIZE if self.bgzf else GZIP_BLOCK_SIZE
+        self.max_pending = 4 * max(1, threads)
+        self._handle = open(path, 'wb')
+        self._pool = ThreadPoolExecutor(max(1, threads))
+        self._pending = deque()
+        self._buffer = bytearray()
+
+    def write(self, text):
+        self._buffer += text.encode('utf-8')
+        if len(self._buffer) >= self.block_size:
+            data = bytes(self._buffer)
+            whole = len(data) - len(data) % self.block_size
+            for begin in range(0, whole, self.block_size):
+                self._submit(data[begin:begin + self.block_size])
+            self._buffer = bytearray(data[whole:])
+        return len(text)
+
+    def _submit(self, data):
+        while len(self._pending) >= self.max_pending:
+            self._handle.write(self._pending.popleft().result())
+        self._pending.append(self._pool.submit(compress_block, data, self.level, self.bgzf))
+
+    def _write_finished(self):
+        while self._pending and self._pending[0].done():
+            self._handle.write(self._pending.popleft().result())
+
+    def flush(self):
+        self._write_finished()
+        self._handle.flush()
+
+    def close(self):
+        if self._handle.closed:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self._handle.write(self._pending.popleft().result())
+        if self.bgzf:
+            self._handle.write(BGZF_EOF)
+        self._pool.shutdown()
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _is_bgzf_header(header):
+    if len(header) < _BGZF_HEADER.size:
+        return False
+    fields = _BGZF_HEADER.unpack(header[:_BGZF_HEADER.size])
+    return fields[:4] == (0x1f, 0x8b, 8, 4) and fields[8:10] == (ord('B'), ord('C'))
+
+
+def _inflate_block(block, offset): # Compressed data + footer of a BGZF block -> bytes
+    data = zlib.decompress(block[:-_FOOTER.size], -zlib.MAX_WBITS)
+    crc, size = _FOOTER.unpack(block[-_FOOTER.size:])
+    if zlib.crc32(data) != crc or len(data) != size:
+        raise ValueError('Corrupt BGZF block at offset ' + str(offset))
+    return data
+
+
+# --------------------------------------------------------
+# Function: bgzf_blocks
+# Purpose: Index of a BGZF file from the block headers alone
+# Input:
+#   handle: binary file handle
+# Returns:
+#   list of (compressed offset, uncompressed offset) per block,
+#   including the empty EOF block
+# --------------------------------------------------------
+def bgzf_blocks(handle):
+    blocks = []
+    offset = uncompressed = 0
+    while True:
+        handle.seek(offset)
+        header = handle.read(_BGZF_HEADER.size)
+        if not header:
+            return blocks
+        if not _is_bgzf_header(header):
+            raise ValueError('Not a BGZF block at offset ' + str(offset) + ' of ' + str(getattr(handle, 'name', 'file')))
+        block_size = _BGZF_HEADER.unpack(header)[11] + 1
+        handle.seek(offset + block_size - 4)
+        blocks.append((offset, uncompressed))
+        uncompressed += struct.unpack('<I', handle.read(4))[0]
+        offset += block_size
+
+
+# --------------------------------------------------------
+# Function: read_bgzf_block
+# Purpose: Decompress the single BGZF block starting at offset
+# Returns:
+#   bytes of the block
+# --------------------------------------------------------
+def read_bgzf_block(handle, offset):
+    handle.seek(offset)
+    header = handle.read(_BGZF_HEADER.size)
+    if not _is_bgzf_header(header):
+        raise ValueError('Not a BGZF block at offset ' + str(offset) + ' of ' + str(getattr(handle, 'name', 'file')))
+    block_size = _BGZF_HEADER.unpack(header)[11] + 1
+    return _inflate_block(handle.read(block_size - _BGZF_HEADER.size), offset)
+
+
+# --------------------------------------------------------
+# Function: detect_format
+# Purpose: 'bgzf', 'gzip' or 'plain' from the magic bytes of a file
+# --------------------------------------------------------
+def detect_format(path):
+    with open(path, 'rb') as file_in:
+        header = file_in.read(_BGZF_HEADER.size)
+    if _is_bgzf_header(header):
+        return 'bgzf'
+    if header[:2] == GZIP_MAGIC:
+        return 'gzip'
+    return 'plain'
+
+
+# --------------------------------------------------------
+# Class: BGZFReader
+# Purpose: Binary stream of a BGZF file, decompressed on a thread pool
+# Input:
+#   path: BGZF file
+#   threads: decompression threads
+# Logic:
+#   - Compressed blocks are read in order (their sizes are in the block
+#     headers) and handed to the pool, at most 4 per thread ahead of
+#     the block being read from
+#   - Wrapped in io.BufferedReader/TextIOWrapper by open_fasta, so lines
+#     and UTF-8 characters can span blocks
+#   - Its threads are live while -threads workers start, so those are
+#     not forked (StORF_Finder.process_pool)
+# --------------------------------------------------------
+class BGZFReader(io.RawIOBase):
+
+    def __init__(self, path, threads=1):
+        self.name = path
+        self._handle = open(path, 'rb')
+        self._pool = ThreadPoolExecutor(max(1, threads))
+        self.max_pending = 4 * max(1, threads)
+        self._pending = deque()
+        self._offset = 0
+        self._data = memoryview(b'')
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def _read_ahead(self):
+        while not self._eof and len(self._pending) < self.max_pending:
+            header = self._handle.read(_BGZF_HEADER.size)
+            if not header:
+                self._eof = True
+                return
+            if not _is_bgzf_header(header):
+                raise ValueError('Not a BGZF block at offset ' + str(self._offset) + ' of ' + self.name)
+            block_size = _BGZF_HEADER.unpack(header)[11] + 1
+            block = self._handle.read(block_size - _BGZF_HEADER.size)
+            if len(block) != block_size - _BGZF_HEADER.size:
+                raise EOFError('Truncated BGZF block at offset ' + str(self._offset) + ' of ' + self.name)
+            self._pending.append(self._pool.submit(_inflate_block, block, self._offset))
+            self._offset += block_size
+
+    def readinto(self, buffer):
+        while not self._data:
+            self._read_ahead()
+            if not self._pending:
+                return 0
+            self._data = memoryview(self._pending.popleft().result()) # Empty blocks (EOF marker) are skipped
+        size = min(len(buffer), len(self._data))
+        buffer[:size] = self._data[:size]
+        self._data = self._data[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._pool.shutdown(cancel_futures=True)
+            self._handle.close()
+        super().close()
+
+
+# --------------------------------------------------------
+# Function: open_fasta
+# Purpose: Open a plain, gzip or BGZF FASTA file as text
+# Input:
+#   path: FASTA file
+#   threads: BGZF decompression threads
+# Returns:
+#   text handle
+# --------------------------------------------------------
+def open_fasta(path, threads=1):
+    gz_format = detect_format(path)
+    if gz_format == 'bgzf':
+        return io.TextIOWrapper(io.BufferedReader(BGZFReader(path, threads), 1 << 20), encoding='utf-8')
+    if gz_format == 'gzip': # Member sizes are not known without decompressing - single threaded
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
@@ -0,0 +1,156 @@
+# --------------------------------------------------------
+# Module: codon_index
+# Purpose: Encode a UR once as an array of codon indices and
+# locate stop codons in all six reading frames in one pass.
+# Logic:
+#   - Each base is mapped to 0-3 (A,C,G,T) and anything else to 4
+#   - The codon starting at position i is 16*b[i] + 4*b[i+1] + b[i+2]
+#     (0-63), or INVALID_CODON (64) if it contains a non-ACGT base
+#   - Minus strand stops are found as reverse-complemented codons on
+#     the forward strand and mapped into reverse-complement coordinates
+# NumPy is used when available. The pure-Python fallback gives
+# identical results.
+# --------------------------------------------------------
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+NUCLEOTIDES = 'ACGT'
+INVALID_CODON = 64
+_COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+# IUPAC complements - anything else is left as is
+_IUPAC_COMPLEMENT = str.maketrans('ATCGNRYSWKMVBHD', 'TAGCNYRSWMKBVDH')
+
+if np is not None:
+    _BASE_LOOKUP = np.full(256, 4, dtype=np.uint8)
+    for _code, _nt in enumerate(NUCLEOTIDES):
+        _BASE_LOOKUP[ord(_nt)] = _code
+        _BASE_LOOKUP[ord(_nt.lower())] = _code
+
+
+# --------------------------------------------------------
+# Function: codon_to_index / index_to_codon
+# Purpose: Convert between a codon string and its 0-63 index
+# --------------------------------------------------------
+def codon_to_index(codon):
+    codon = codon.upper()
+    if len(codon) != 3 or any(nt not in NUCLEOTIDES for nt in codon):
+        raise ValueError("Codons must be three of A,C,G,T: '" + codon + "'")
+    return 16 * NUCLEOTIDES.index(codon[0]) + 4 * NUCLEOTIDES.index(codon[1]) + NUCLEOTIDES.index(codon[2])
+
+
+def index_to_codon(index):
+    return NUCLEOTIDES[index // 16] + NUCLEOTIDES[(index // 4) % 4] + NUCLEOTIDES[index % 4]
+
+
+def reverse_complement_codon(codon):
+    return codon.upper().translate(_COMPLEMENT)[::-1]
+
+
+# --------------------------------------------------------
+# Function: reverse_complement
+# Purpose: Upper-cased reverse complement of any sequence
+# (str.translate rather than building the string per nucleotide)
+# --------------------------------------------------------
+def reverse_complement(sequence):
+    return sequence.upper().translate(_IUPAC_COMPLEMENT)[::-1]
+
+
+def parse_codons(codons):
+    # '-codons' is given as a comma separated string e.g. 'TAG,TGA,TAA'
+    if isinstance(codons, str):
+        codons = codons.split(',')
+    return sorted(set(codon.strip().upper() for codon in codons if codon.strip()))
+
+
+# --------------------------------------------------------
+# Function: encode_codons
+# Purpose: Encode a sequence as a uint8 array of codon indices
+# Input:
+#   sequence: nucleotide string (case-insensitive)
+# Returns:
+#   numpy uint8 array of length len(sequence) - 2 (or empty)
+# --------------------------------------------------------
+def encode_codons(sequence):
+    if np is None:
+        raise ImportError('encode_codons requires NumPy')
+    if len(sequence) < 3:
+        return np.zeros(0, dtype=np.uint8)
+    bases = _BASE_LOOKUP[np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)]
+    first, second, third = bases[:-2], bases[1:-1], bases[2:]
+    codons = first * 16 + second * 4 + third  # Fits in uint8 even for invalid bases (max 84)
+    codons[((first | second | third) & 4) != 0] = INVALID_CODON
+    return codons
+
+
+# --------------------------------------------------------
+# Function: scan_stops
+# Purpose: Find every stop codon in all six frames in one pass
+# Logic:
+#   - Frames 1-3 are forward positions (pos % 3) + 1
+#   - Frames 4-6 are reverse complement positions (rev_pos % 3) + 4
+#     where rev_pos = len(sequence) - 3 - pos
+#   - Overlapping occurrences are all reported
+# Input:
+#   sequence: UR nucleotide string
+#   stop_codons: comma separated string or list of codons
+#   codons: optional precomputed encode_codons(sequence)
+# Returns:
+#   dict {frame: ascending positions} with frames 1-6
+# --------------------------------------------------------
+def scan_stops(sequence, stop_codons, codons=None):
+    stop_codons = parse_codons(stop_codons)
+    rev_stop_codons = [reverse_complement_codon(codon) for codon in stop_codons]
+    if np is None:
+        return _scan_stops_python(sequence, stop_codons, rev_stop_codons)
+
+    is_stop = np.zeros(INVALID_CODON + 1, dtype=bool)
+    is_rev_stop = np.zeros(INVALID_CODON + 1, dtype=bool)
+    is_stop[[codon_to_index(codon) for codon in stop_codons]] = True
+    is_rev_stop[[codon_to_index(codon) for codon in rev_stop_codons]] = True
+    if codons is None:
+        codons = encode_codons(sequence)
+
+    last = len(sequence) - 3
+    forward = np.flatnonzero(is_stop[codons])
+    reverse = last - np.flatnonzero(is_rev_stop[codons])[::-1]
+    frame_stops = {}
+    for offset in range(3):
+        frame_stops[offset + 1] = forward[forward % 3 == offset]
+        frame_stops[offset + 4] = reverse[reverse % 3 == offset]
+    return frame_stops
+
+
+def _scan_stops_python(sequence, stop_codons, rev_stop_codons):
+    sequence = sequence.upper()
+    last = len(sequence) - 3
+    frame_stops = {frame: [] for frame in range(1, 7)}
+    for strand_codons, first_frame in ((stop_codons, 1), (rev_stop_codons, 4)):
+        positions = []
+        for codon in strand_codons:
+            codon_to_index(codon)  # Same validation as the NumPy path
+            found = sequence.find(codon)
+            while found != -1:
+                positions.append(found if first_frame == 1 else last - found)
+                found = sequence.find(codon, found + 1)
+        for position in sorted(positions):
+            frame_stops[position % 3 + first_frame].append(position)
+    return frame_stops
+
+
+# --------------------------------------------------------
+# Function: strand_stops
+# Purpose: Merge the three per-frame stop arrays of a strand into
+# the single ascending list used by find_storfs
+# Input:
+#   frame_stops: output of scan_stops
+#   strand: '+' or '-'
+# Returns:
+#   list of int positions
+# --------------------------------------------------------
+def strand_stops(frame_stops, strand):
+    frames = (1, 2, 3) if strand == '+' else (4, 5, 6)
+    if np is not None and not isinstance(frame_stops[frames[0]], list):
+        return np.sort(np.concatenate([frame_stops[frame] for frame in frames])).tolist()
+    return sorted(frame_stops[frames[0]] + frame_stops[frames[1]] + frame_stops[frames[2]])
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# utilss, storf_columns and indexed_fasta are shared with the scripts in Code/Using now
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,4 @@
+# --------------------------------------------------------
+# Constants shared by StORF-Finder (StORF-Reporter's constants.py)
+# --------------------------------------------------------
+StORF_Reporter_Version = 'v1.4.3'
@@ -0,0 +1,117 @@
+# --------------------------------------------------------
+# Module: run_metrics
+# Purpose: Per-phase wall time and counters of a StORF-Finder run (-metrics)
+# Logic:
+#   - Stages call start(phase) / stop(**counts) on options.metrics and
+#     skip it entirely when options.metrics is None, so a run without
+#     -metrics only pays one attribute lookup per stage per UR
+#   - Phases nest - a phase's time excludes the phases started inside
+#     it (e.g. con_storf_assembly excludes the tiling it runs)
+#   - Time and counts go to the current UR's record (start_ur) and to
+#     the run totals. Outside a UR (e.g. FASTA loading) only the totals
+# --------------------------------------------------------
+import json
+import time
+from collections import OrderedDict
+
+PHASES = ['load', 'stop_scan', 'pairing', 'start_filter', 'non_standard_filter', 'con_storf_assembly', 'tiling',
+          'formatting', 'writing']
+COUNTERS = ['stops_scanned', 'candidates', 'con_storf_candidates', 'short_storf_candidates', 'removed_non_standard',
+            'removed_start_filter', 'removed_tiling', 'reported', 'bytes_written', 'cache_hits']
+
+
+def _record():
+    return OrderedDict([('seconds', OrderedDict()), ('counts', OrderedDict())])
+
+
+def _add(record, key, value):
+    record[key] = record.get(key, 0) + value
+
+
+# --------------------------------------------------------
+# Class: RunMetrics
+# Purpose: Collects timings and counters per UR and for the whole run
+# --------------------------------------------------------
+class RunMetrics:
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.total = _record()
+        self.total['urs'] = 0
+        self.urs = []
+        self._ur = None
+        self._running = [] # [phase, start time, time spent in nested phases]
+
+    def __getstate__(self): # Worker processes start empty - their URs come back through worker_results/merge
+        return {'worker': True}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def start_ur(self, ur_id, length):
+        self._ur = OrderedDict([('ur', ur_id.replace('>', '')), ('length', length)])
+        self._ur.update(_record())
+        self.urs.append(self._ur)
+        self.total['urs'] += 1
+
+    def end_ur(self):
+        self._ur = None
+
+    def start(self, phase):
+        self._running.append([phase, time.perf_counter(), 0.0])
+
+    def stop(self, **counts):
+        phase, started, nested = self._running.pop()
+        elapsed = time.perf_counter() - started
+        if self._running:
+            self._running[-1][2] += elapsed
+        self.add_time(phase, elapsed - nested)
+        for counter, value in counts.items():
+            self.count(counter, value)
+
+    def add_time(self, phase, seconds):
+        _add(self.total['seconds'], phase, seconds)
+        if self._ur is not None:
+            _add(self._ur['seconds'], phase, seconds)
+
+    def count(self, counter, value=1):
+        _add(self.total['counts'], counter, value)
+        if self._ur is not None:
+            _add(self._ur['counts'], counter, value)
+
+    def worker_results(self): # Plain data for the main process (pickling a RunMetrics gives an empty one)
+        return self.total, self.urs
+
+    def merge(self, worker_results): # URs of a worker process, in the order they were run
+        total, urs = worker_results
+        self.urs.extend(urs)
+        self.total['urs'] += total['urs']
+        for key in ('seconds', 'counts'):
+            for name, value in total[key].items():
+                _add(self.total[key], name, value)
+
+    def to_dict(self):
+        total = OrderedDict([('urs', self.total['urs']), ('wall_seconds', time.perf_counter() - self.created)])
+        total['seconds'] = OrderedDict((phase, self.total['seconds'][phase]) for phase in PHASES
+                                       if phase in self.total['seconds'])
+        total['counts'] = OrderedDict((counter, self.total['counts'].get(counter, 0)) for counter in COUNTERS)
+        return OrderedDict([('total', total), ('urs', self.urs)])
+
+    def write(self, json_path):
+        with open(json_path, 'w', encoding='utf-8') as metrics_out:
+            json.dump(self.to_dict(), metrics_out, indent=1)
+
+    def summary(self):
+        seconds = self.total['seconds']
+        return 'Metrics: ' + ', '.join(phase + ' ' + format(seconds[phase], '.3f') + 's' for phase in PHASES if phase in seconds)
+
+
+def timed_records(records, metrics): # FASTA records with the time spent reading each one counted as 'load'
+    records = iter(records)
+    while True:
+        metrics.start('load')
+        record = next(records, None)
+        metrics.stop()
+        if record is None:
+            return
+        yield record
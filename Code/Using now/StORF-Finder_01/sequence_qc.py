@@ -0,0 +1,61 @@
+# --------------------------------------------------------
+# Module: sequence_qc
+# Purpose: Per-UR prefix sums for constant time interval QC
+# Logic:
+#   - Built once per UR: running counts of non-ACGT bases and of G/C
+#     bases, with a leading 0 so interval [begin, end) is
+#     counts[end] - counts[begin]
+#   - Nucleotides are counted case-insensitively (soft-masked bases
+#     are standard nucleotides)
+# NumPy is used when available. The pure-Python fallback gives
+# identical results.
+# --------------------------------------------------------
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+STANDARD_NT = 'ACGTacgt'
+GC_NT = 'GCgc'
+
+if np is not None:
+    _NON_STANDARD = np.ones(256, dtype=np.int32)
+    _NON_STANDARD[[ord(nt) for nt in STANDARD_NT]] = 0
+    _IS_GC = np.zeros(256, dtype=np.int32)
+    _IS_GC[[ord(nt) for nt in GC_NT]] = 1
+
+
+# --------------------------------------------------------
+# Class: SequenceQC
+# Purpose: Non-standard nucleotide and GC counts for any interval of
+# a UR in two lookups
+# Input:
+#   sequence: forward strand UR sequence - intervals are forward
+#   coordinates, counts are the same for the reverse complement
+# --------------------------------------------------------
+class SequenceQC:
+    __slots__ = ('non_standard', 'gc')
+
+    def __init__(self, sequence):
+        if np is not None:
+            bases = np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+            self.non_standard = np.concatenate(([0], np.cumsum(_NON_STANDARD[bases])))
+            self.gc = np.concatenate(([0], np.cumsum(_IS_GC[bases])))
+        else:
+            self.non_standard = list(accumulate((nt not in STANDARD_NT for nt in sequence), initial=0))
+            self.gc = list(accumulate((nt in GC_NT for nt in sequence), initial=0))
+
+    def non_standard_count(self, begin, end):
+        return int(self.non_standard[end] - self.non_standard[begin])
+
+    def non_standard_fraction(self, begin, end):
+        if end <= begin:
+            return 0.0
+        return self.non_standard_count(begin, end) / (end - begin)
+
+    def gc_content(self, begin, end):
+        if end <= begin:
+            return 0.0
+        return int(self.gc[end] - self.gc[begin]) / (end - begin)
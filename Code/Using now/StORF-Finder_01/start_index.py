@@ -0,0 +1,130 @@
+# --------------------------------------------------------
+# Module: start_index
+# Purpose: Per-UR "next in-frame start/stop codon" lookups so start
+# codon checks on any StORF are O(1)
+# Logic:
+#   - For every codon position i, next_start[i] is the first position
+#     j >= i in the same frame (j % 3 == i % 3) holding a start codon
+#     (next_stop likewise for stop codons), NONE if there is none
+#   - The minus strand uses the same arrays built over the reverse
+#     complement codon indices, so positions are reverse complement
+#     coordinates
+#   - Built from the codon_index encoding already used for the stop scan
+#   - Positions are int32, so the four lookups take 16 bytes per base
+#     (URs are shorter than 2 Gb)
+# NumPy is used when available. The pure-Python fallback gives
+# identical results.
+# --------------------------------------------------------
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+try:
+    from .codon_index import encode_codons, codon_to_index, index_to_codon, reverse_complement_codon, \
+        parse_codons, INVALID_CODON
+except (ModuleNotFoundError, ImportError, NameError, TypeError) as error:
+    from codon_index import encode_codons, codon_to_index, index_to_codon, reverse_complement_codon, \
+        parse_codons, INVALID_CODON
+
+START_CODONS = ['ATG', 'GTG', 'TTG']
+NONE = (1 << 31) - 1 # No further codon in frame - the int32 maximum
+
+if np is not None:
+    _RC_INDEX = np.array([codon_to_index(reverse_complement_codon(index_to_codon(index))) for index in range(INVALID_CODON)]
+                         + [INVALID_CODON], dtype=np.uint8)
+
+
+def _next_in_frame(is_codon):
+    # next[i] = first j >= i with j % 3 == i % 3 and is_codon[j], padded by 3 so any end position can be looked up
+    if np is not None:
+        positions = len(is_codon)
+        next_codon = np.full(positions + 3, NONE, dtype=np.int32)
+        for offset in range(3):
+            frame = np.arange(offset, positions, 3, dtype=np.int32)
+            found = np.where(is_codon[frame], frame, NONE)
+            next_codon[frame] = np.minimum.accumulate(found[::-1])[::-1]
+        return next_codon
+    next_codon = [NONE] * (len(is_codon) + 3)
+    for i in range(len(is_codon) - 1, -1, -1):
+        next_codon[i] = i if is_codon[i] else next_codon[i + 3]
+    return next_codon
+
+
+# --------------------------------------------------------
+# Class: StartIndex
+# Purpose: In-frame start and stop lookups for both strands of a UR
+# Input:
+#   sequence: forward strand UR sequence
+#   stop_codons: comma separated string or list ('-codons')
+#   codons: optional precomputed encode_codons(sequence)
+# --------------------------------------------------------
+class StartIndex:
+    __slots__ = ('length', 'forward', 'reverse')
+
+    def __init__(self, sequence, stop_codons='TAG,TGA,TAA', codons=None):
+        self.length = len(sequence)
+        stop_codons = parse_codons(stop_codons)
+        if np is not None:
+            if codons is None:
+                codons = encode_codons(sequence)
+            rev_codons = _RC_INDEX[codons[::-1]]
+            is_start = np.zeros(INVALID_CODON + 1, dtype=bool)
+            is_start[[codon_to_index(codon) for codon in START_CODONS]] = True
+            is_stop = np.zeros(INVALID_CODON + 1, dtype=bool)
+            is_stop[[codon_to_index(codon) for codon in stop_codons]] = True
+            self.forward = (_next_in_frame(is_start[codons]), _next_in_frame(is_stop[codons]))
+            self.reverse = (_next_in_frame(is_start[rev_codons]), _next_in_frame(is_stop[rev_codons]))
+        else:
+            upper = sequence.upper()
+            forward = [upper[i:i + 3] for i in range(len(upper) - 2)]
+            reverse = [reverse_complement_codon(codon) for codon in reversed(forward)]
+            self.forward = (_next_in_frame([codon in START_CODONS for codon in forward]),
+                            _next_in_frame([codon in stop_codons for codon in forward]))
+            self.reverse = (_next_in_frame([codon in START_CODONS for codon in reverse]),
+                            _next_in_frame([codon in stop_codons for codon in reverse]))
+
+    def _strand(self, offset, length, strand):
+        # Lookups and [begin, end) of a StORF sequence reference (forward offset/length) on its own strand
+        if strand == '-':
+            return self.reverse, self.length - offset - length, self.length - offset
+        return self.forward, offset, offset + length
+
+    # --------------------------------------------------------
+    # Function: first_start
+    # Purpose: First in-frame start codon of a StORF sequence
+    # Returns:
+    #   position within the StORF sequence, or -1 if there is none
+    # --------------------------------------------------------
+    def first_start(self, offset, length, strand):
+        (next_start, _), begin, end = self._strand(offset, length, strand)
+        if begin >= end:
+            return -1
+        start = int(next_start[begin])
+        return start - begin if start + 3 <= end else -1
+
+    # --------------------------------------------------------
+    # Function: longest_orf
+    # Purpose: Longest in-frame start-to-stop ORF within a StORF sequence
+    # Logic:
+    #   - Walks start -> next stop -> next start ... so Con-StORFs (and
+    #     any other internal in-frame stops) split the sequence
+    # Returns:
+    #   (start position within the StORF sequence, length incl. stop)
+    #   or None if no start codon is followed by a stop
+    # --------------------------------------------------------
+    def longest_orf(self, offset, length, strand):
+        (next_start, next_stop), begin, end = self._strand(offset, length, strand)
+        longest = None
+        position = begin
+        while position < end:
+            start = int(next_start[position])
+            if start + 3 > end:
+                break
+            stop = int(next_stop[start])
+            if stop + 3 > end:
+                break
+            if longest is None or stop + 3 - start > longest[1]:
+                longest = (start - begin, stop + 3 - start)
+            position = stop + 3
+        return longest
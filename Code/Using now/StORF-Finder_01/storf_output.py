@@ -0,0 +1,86 @@
+# --------------------------------------------------------
+# Module: storf_output
+# Purpose: Buffered FASTA/GFF output for StORF-Finder
+# Logic:
+#   - Sequences are wrapped by fixed-width slicing (nucleotide and
+#     amino acid sequences have no spaces or hyphens, so this gives the
+#     same lines textwrap.wrap did)
+#   - A whole UR is formatted into one chunk and handed over in a single
+#     write, OutputBuffer then groups chunks into large writes to the file
+# --------------------------------------------------------
+from io import StringIO
+
+LINE_WIDTH = 60
+FLUSH_SIZE = 1 << 20 # Characters held before writing through
+
+
+# --------------------------------------------------------
+# Function: wrap_sequence
+# Purpose: Sequence as newline terminated lines of at most width chars
+# Input:
+#   sequence: nucleotide or amino acid string
+#   width: line length, or None/0 for a single line
+# Returns:
+#   string - empty for an empty wrapped sequence (as textwrap.wrap)
+# --------------------------------------------------------
+def wrap_sequence(sequence, width=LINE_WIDTH):
+    if not width:
+        return sequence + '\n'
+    return ''.join([sequence[i:i + width] + '\n' for i in range(0, len(sequence), width)])
+
+
+# --------------------------------------------------------
+# Function: format_fasta
+# Purpose: One chunk holding every FASTA record of a UR
+# Input:
+#   headers: FASTA header lines (with '>' and '\n')
+#   sequences: sequences in the same order
+#   line_wrap: wrap at LINE_WIDTH
+# --------------------------------------------------------
+def format_fasta(headers, sequences, line_wrap=True):
+    chunk = StringIO()
+    width = LINE_WIDTH if line_wrap else None
+    for header, sequence in zip(headers, sequences):
+        chunk.write(header)
+        chunk.write(wrap_sequence(sequence, width))
+    return chunk.getvalue()
+
+
+# --------------------------------------------------------
+# Class: OutputBuffer
+# Purpose: Collect writes to an output handle and pass them on in
+# FLUSH_SIZE sized blocks
+# Input:
+#   handle: open text (or gzip text) file
+# --------------------------------------------------------
+class OutputBuffer:
+
+    def __init__(self, handle, flush_size=FLUSH_SIZE):
+        self.handle = handle
+        self.name = getattr(handle, 'name', None)
+        self.flush_size = flush_size
+        self._chunks = []
+        self._size = 0
+
+    def write(self, text):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self._chunks:
+            self.handle.write(''.join(self._chunks))
+            self._chunks = []
+            self._size = 0
+        self.handle.flush()
+
+    def close(self):
+        self.flush()
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
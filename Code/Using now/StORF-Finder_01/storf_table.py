@@ -0,0 +1,168 @@
+# --------------------------------------------------------
+# Module: storf_table
+# Purpose: Compact columnar store for StORF candidates of a UR
+# Logic:
+#   - One typed array per field instead of an OrderedDict entry per
+#     StORF keyed by a "start,stop" / "start,mid,stop" string
+#   - Sequences are not copied - each row holds an (offset, length)
+#     reference into the forward UR sequence. Minus strand StORFs are
+#     only reverse complemented when their sequence is asked for
+#   - Stages pass row index lists or derived tables around and only
+#     the API boundary (StORF-Reporter) gets the old dict form
+# --------------------------------------------------------
+from array import array
+from collections import OrderedDict
+
+try:
+    from .codon_index import reverse_complement
+except (ModuleNotFoundError, ImportError, NameError, TypeError) as error:
+    from codon_index import reverse_complement
+
+STORF_TYPES = ['StORF', 'Con-StORF', 'Short-StORF', 'Partial-StORF', 'Run-Through-StORF']
+TYPE_CODES = {storf_type: code for code, storf_type in enumerate(STORF_TYPES)}
+STRANDS = ['+', '-']
+STRAND_CODES = {'+': 0, '-': 1}
+NO_MID = -1 # Only Con-StORFs have a mid stop
+
+
+# --------------------------------------------------------
+# Function: slice_ref
+# Purpose: Forward strand (offset, length) of strand_seq[begin:end]
+# for a UR of the given length, clamped the same way Python slicing is
+# Input:
+#   begin, end: coordinates on the strand (reverse complement
+#   coordinates for '-')
+# --------------------------------------------------------
+def slice_ref(parent_length, begin, end, strand='+'):
+    begin = min(begin, parent_length)
+    length = max(0, min(end, parent_length) - begin)
+    if strand == '-':
+        return parent_length - begin - length, length
+    return begin, length
+
+
+# --------------------------------------------------------
+# Class: StORFTable
+# Purpose: Parallel arrays of StORF candidates for one UR
+# Columns:
+#   start, mid, stop: UR stop locations (mid is NO_MID for 2-stop StORFs)
+#   frame: 1-6, strand: STRAND_CODES, storf_type: TYPE_CODES
+#   length: length used for filtering priority
+#   idx: running StORF number of its type
+#   seq_offset, seq_length: reference into the forward UR sequence
+# qc and start_index are the UR's SequenceQC and StartIndex (or None),
+# shared by all tables of the UR
+# --------------------------------------------------------
+class StORFTable:
+    __slots__ = ('start', 'mid', 'stop', 'frame', 'strand', 'storf_type', 'length', 'idx',
+                 'seq_offset', 'seq_length', 'parent', 'qc',
+                 'start_index')
+
+    def __init__(self, sequence='', qc=None, start_index=None):
+        self.start = array('q')
+        self.mid = array('q')
+        self.stop = array('q')
+        self.frame = array('b')
+        self.strand = array('b')
+        self.storf_type = array('b')
+        self.length = array('q')
+        self.idx = array('q')
+        self.seq_offset = array('q')
+        self.seq_length = array('q')
+        self.parent = sequence
+        self.qc = qc
+        self.start_index = start_index
+
+    def __len__(self):
+        return len(self.start)
+
+    def append(self, start, mid, stop, frame, strand, length, storf_type, idx, seq_ref):
+        self.start.append(start)
+        self.mid.append(mid)
+        self.stop.append(stop)
+        self.frame.append(int(frame))
+        self.strand.append(STRAND_CODES[strand])
+        self.storf_type.append(TYPE_CODES[storf_type])
+        self.length.append(length)
+        self.idx.append(idx)
+        self.seq_offset.append(seq_ref[0])
+        self.seq_length.append(seq_ref[1])
+
+    def pop(self): # Remove the last row
+        for column in self._columns():
+            column.pop()
+
+    def _columns(self):
+        return (self.start, self.mid, self.stop, self.frame, self.strand, self.storf_type, self.length,
+                self.idx, self.seq_offset, self.seq_length)
+
+    def to_columns(self): # Just the columns - e.g. for caching, the UR sequence is held by the caller
+        return self._columns()
+
+    @classmethod
+    def from_columns(cls, sequence, columns, qc=None, start_index=None):
+        table = cls(sequence, qc, start_index)
+        for new_column, column in zip(table._columns(), columns):
+            new_column.extend(column)
+        return table
+
+    def _empty_like(self):
+        return StORFTable(self.parent, self.qc, self.start_index)
+
+    def take(self, rows):
+        # New table holding the given rows in the given order
+        table = self._empty_like()
+        for new_column, column in zip(table._columns(), self._columns()):
+            new_column.extend([column[row] for row in rows])
+        return table
+
+    def concat(self, other):
+        table = self._empty_like()
+        for new_column, column, other_column in zip(table._columns(), self._columns(), other._columns()):
+            new_column.extend(column)
+            new_column.extend(other_column)
+        return table
+
+    def collapse_positions(self):
+        # As the old {"start,mid,stop": [...]} dicts - a row with the positions of an earlier row
+        # replaces it, in the earlier row's place (the strands' coordinates are not told apart)
+        rows = {}
+        for row in range(len(self)):
+            rows[(self.start[row], self.mid[row], self.stop[row])] = row
+        if len(rows) == len(self):
+            return self
+        return self.take(list(rows.values()))
+
+    def positions(self, row):
+        if self.mid[row] == NO_MID:
+            return [self.start[row], self.stop[row]]
+        return [self.start[row], self.mid[row], self.stop[row]]
+
+    def strand_of(self, row):
+        return STRANDS[self.strand[row]]
+
+    def type_of(self, row):
+        return STORF_TYPES[self.storf_type[row]]
+
+    def types(self):
+        return [STORF_TYPES[code] for code in self.storf_type]
+
+    def sequence(self, row): # Only materialised when needed
+        offset = self.seq_offset[row]
+        sequence = self.parent[offset:offset + self.seq_length[row]]
+        if self.strand[row] == STRAND_CODES['-']:
+            return reverse_complement(sequence)
+        return sequence
+
+    def sorted_by_position(self):
+        # Same order as sorting the old "start,mid,stop" keys as integer tuples
+        return self.take(sorted(range(len(self)), key=lambda row: tuple(self.positions(row))))
+
+    def to_dict(self):
+        # OrderedDict form ({"start,stop": [seq, frame, strand, length, type, idx]}) for the API boundary
+        storfs = OrderedDict()
+        for row in range(len(self)):
+            storfs.update({",".join([str(pos) for pos in self.positions(row)]): [
+                self.sequence(row), str(self.frame[row]), self.strand_of(row), self.length[row],
+                self.type_of(row), self.idx[row]]})
+        return storfs
@@ -0,0 +1,16 @@
+# --------------------------------------------------------
+# Shared test data: seeded random URs and main() options
+# --------------------------------------------------------
+from benchmark_storf_finder import generate_urs
+from StORF_Finder import default_options
+
+
+def make_options(**kwargs):
+    # Defaults of StORF_Finder.main() for a plain nucleotide run, 2 workers
+    return default_options(**{'threads': 2, **kwargs})
+
+
+def random_records(size=20000, seed=5, ur_median=1500, ur_sigma=0.6):
+    # URs as read_fasta yields them - (ur_id, sequence region length, sequence)
+    urs, _ = generate_urs(size, seed, ur_median=ur_median, ur_sigma=ur_sigma)
+    return [(ur_id, 0, sequence) for ur_id, sequence in urs]
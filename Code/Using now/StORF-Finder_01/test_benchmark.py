@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from benchmark_storf_finder import generate_genome, time_phases, compare_results, PHASES
+from StORF_Finder import fasta_load, default_options
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fasta_path = os.path.join(self.tmp_dir.name, 'synthetic.fasta')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, fasta_path):
+        with open(fasta_path) as fasta_in:
+            return fasta_load(fasta_in, [], OrderedDict())[1]
+
+    def test_generator_is_seeded(self):
+        generate_genome(self.fasta_path, 20000, seed=3)
+        other_path = os.path.join(self.tmp_dir.name, 'other.fasta')
+        generate_genome(other_path, 20000, seed=3)
+        with open(self.fasta_path) as first, open(other_path) as second:
+            self.assertEqual(first.read(), second.read())
+
+    def test_generator_parameters(self):
+        ur_count = generate_genome(self.fasta_path, 50000, seed=1, gc=0.7, stop_density=0.1)
+        sequences = self.load(self.fasta_path)
+        self.assertEqual(len(sequences), ur_count)
+        genome = ''.join(sequence for _, sequence in sequences.values())
+        self.assertEqual(len(genome), 50000)
+        self.assertAlmostEqual((genome.count('G') + genome.count('C')) / len(genome), 0.7 * 0.9 + 0.1 * 2 / 9, delta=0.02) # TAG/TGA/TAA are 2/9 GC
+        codons = [sequence[i:i + 3] for _, sequence in sequences.values() for i in range(0, len(sequence) - 2, 3)]
+        self.assertGreater(sum(codon in ('TAG', 'TGA', 'TAA') for codon in codons) / len(codons), 0.1)
+
+    def test_time_phases(self):
+        generate_genome(self.fasta_path, 20000, seed=2)
+        timings = time_phases(self.fasta_path, default_options())
+        self.assertEqual(list(timings), PHASES)
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+    def test_compare_results(self):
+        baseline = {'scales': {'1Mb': {'seconds': {'find_storfs': 1.0, 'prepare_out': 0.5}}}}
+        results = {'scales': {'1Mb': {'seconds': {'find_storfs': 1.2, 'prepare_out': 0.52, 'main': 3.0}},
+                              '10Mb': {'seconds': {'find_storfs': 10.0}}}}
+        self.assertEqual(compare_results(baseline, results, 0.10), [('1Mb', 'find_storfs', 1.0, 1.2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import gzip
+import os
+import random
+import tempfile
+import unittest
+import zlib
+
+from block_gzip import BlockGzipWriter, BGZFReader, bgzf_blocks, read_bgzf_block, detect_format, BGZF_BLOCK_SIZE, BGZF_EOF
+from storf_output import OutputBuffer
+
+
+class TestBlockGzip(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = random.Random(5)
+        self.chunks = ['>UR_' + str(i) + '\n' + ''.join(rng.choices('ACGT', k=rng.randint(0, 5000))) + '\n'
+                       for i in range(200)]
+        self.text = ''.join(self.chunks)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, **kwargs):
+        path = os.path.join(self.tmp_dir.name, name)
+        with OutputBuffer(BlockGzipWriter(path, **kwargs), flush_size=3000) as out:
+            for chunk in self.chunks:
+                out.write(chunk)
+        return path
+
+    def test_readable_as_one_gzip_stream(self):
+        for gz_format in ('bgzf', 'gzip'):
+            for threads in (1, 3):
+                path = self.write(gz_format + str(threads) + '.gz', gz_format=gz_format, threads=threads, level=1)
+                with gzip.open(path, 'rt') as gz_in:
+                    self.assertEqual(gz_in.read(), self.text)
+
+    def test_output_independent_of_threads(self):
+        with open(self.write('one.gz', threads=1), 'rb') as one, open(self.write('four.gz', threads=4), 'rb') as four:
+            self.assertEqual(one.read(), four.read())
+
+    def test_bgzf_random_access(self):
+        path = self.write('out.gz')
+        with open(path, 'rb') as gz_in:
+            blocks = bgzf_blocks(gz_in)
+            gz_in.seek(blocks[-1][0])
+            self.assertEqual(gz_in.read(), BGZF_EOF)
+            self.assertEqual(blocks[-1][1], len(self.text))
+            encoded = self.text.encode('utf-8')
+            for offset, begin in reversed(blocks[:-1]):
+                data = read_bgzf_block(gz_in, offset)
+                self.assertLessEqual(len(data), BGZF_BLOCK_SIZE)
+                self.assertEqual(data, encoded[begin:begin + len(data)])
+
+    def test_detect_format(self):
+        plain_path = os.path.join(self.tmp_dir.name, 'plain.fa')
+        with open(plain_path, 'w') as plain_out:
+            plain_out.write(self.text)
+        self.assertEqual(detect_format(plain_path), 'plain')
+        self.assertEqual(detect_format(self.write('out.bgz')), 'bgzf')
+        self.assertEqual(detect_format(self.write('out.gz', gz_format='gzip')), 'gzip')
+
+    def test_parallel_reader(self):
+        path = self.write('out.gz')
+        for threads in (1, 4):
+            with BGZFReader(path, threads) as reader:
+                self.assertEqual(reader.read(), self.text.encode('utf-8'))
+
+    def test_reader_rejects_corrupt_block(self):
+        path = self.write('out.gz')
+        with open(path, 'r+b') as gz_out:
+            gz_out.seek(-40, os.SEEK_END) # Inside the last data block
+            byte = gz_out.read(1)
+            gz_out.seek(-1, os.SEEK_CUR)
+            gz_out.write(bytes([byte[0] ^ 0xff]))
+        with BGZFReader(path) as reader:
+            with self.assertRaises((ValueError, zlib.error)):
+                reader.read()
+
+    def test_empty_file(self):
+        self.chunks = []
+        path = self.write('empty.gz')
+        with gzip.open(path, 'rt') as gz_in:
+            self.assertEqual(gz_in.read(), '')
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            BlockGzipWriter(os.path.join(self.tmp_dir.name, 'x.gz'), gz_format='zip')
+
+
+if __name__ == '__main__':
+    unittest.main()
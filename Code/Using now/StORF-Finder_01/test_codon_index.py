@@ -0,0 +1,93 @@
+import random
+import re
+import unittest
+
+import codon_index
+from codon_index import scan_stops, strand_stops, encode_codons, codon_to_index, INVALID_CODON
+from StORF_Finder import find_chunk
+from storf_test_data import make_options, random_records
+
+
+def regex_stops(sequence, stop_codons):
+    # The original per-codon re.finditer scan used by STORF_Finder
+    stops = []
+    for stop_codon in stop_codons.split(','):
+        stops += [match.start() for match in re.finditer(re.escape(stop_codon), sequence)]
+    return sorted(stops)
+
+
+def rev_comp(sequence):
+    return sequence.translate(str.maketrans('ACGTN', 'TGCAN'))[::-1]
+
+
+class TestScanStops(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(7)
+        self.sequences = [''.join(rnd.choices('ACGTN', weights=[30, 20, 20, 30, 1], k=rnd.randint(0, 3000)))
+                          for _ in range(25)]
+
+    def test_encode_codons(self):
+        codons = encode_codons('ATGNTAA')
+        self.assertEqual(codons.tolist(), [codon_to_index('ATG'), INVALID_CODON, INVALID_CODON,
+                                           INVALID_CODON, codon_to_index('TAA')])
+
+    def test_matches_regex_scan_on_both_strands(self):
+        for sequence in self.sequences:
+            frame_stops = scan_stops(sequence, 'TAG,TGA,TAA')
+            self.assertEqual(strand_stops(frame_stops, '+'), regex_stops(sequence, 'TAG,TGA,TAA'))
+            self.assertEqual(strand_stops(frame_stops, '-'), regex_stops(rev_comp(sequence), 'TAG,TGA,TAA'))
+
+    def test_soft_masked_sequence(self):
+        # Lower case (soft-masked) bases give the same stops as upper case
+        for sequence in self.sequences:
+            frame_stops = scan_stops(sequence.lower(), 'TAG,TGA,TAA')
+            self.assertEqual(strand_stops(frame_stops, '+'), regex_stops(sequence, 'TAG,TGA,TAA'))
+            self.assertEqual(strand_stops(frame_stops, '-'), regex_stops(rev_comp(sequence), 'TAG,TGA,TAA'))
+
+    def upper(self, results):
+        return [[''.join(output).upper() for output in ur_output] for ur_output in results]
+
+    def test_soft_masked_urs_translate(self):
+        # A soft-masked UR gives the same StORFs and translations as the upper case UR - only the case of its sequences differs
+        self.records = random_records()
+        masked = [(sequence_id, length, sequence[:500].lower() + sequence[500:]) for sequence_id, length, sequence in self.records]
+        options = make_options(translate=True, threads=1)
+        outputs = [True, True, True]
+        expected = find_chunk(options, self.records, outputs)
+        results = find_chunk(options, masked, outputs)
+        self.assertEqual(self.upper(results), self.upper(expected))
+        self.assertNotEqual(results, expected)
+        # Headers keep the masked stop codons, amino acids are the same
+        aminos = [[line for line in ''.join(ur_output[1]).splitlines() if not line.startswith('>')] for ur_output in results]
+        self.assertEqual(aminos, [[line for line in ''.join(ur_output[1]).splitlines() if not line.startswith('>')] for ur_output in expected])
+        self.assertTrue(any(ur_output[1] for ur_output in expected))
+
+    def test_frames(self):
+        frame_stops = scan_stops('TAGATAAATGA', 'TAG,TGA,TAA')
+        self.assertEqual(list(frame_stops[1]), [0])
+        self.assertEqual(list(frame_stops[2]), [4])
+        self.assertEqual(list(frame_stops[3]), [8])
+        for frame in range(1, 7):
+            self.assertTrue(all(stop % 3 == (frame - 1) % 3 for stop in frame_stops[frame]))
+
+    def test_python_fallback_identical(self):
+        for codons in ['TAG,TGA,TAA', 'TGA', 'TTT,AAA']:
+            for sequence in self.sequences:
+                fast = scan_stops(sequence, codons)
+                slow = codon_index._scan_stops_python(sequence, codon_index.parse_codons(codons),
+                                                      [codon_index.reverse_complement_codon(codon)
+                                                       for codon in codon_index.parse_codons(codons)])
+                for frame in range(1, 7):
+                    self.assertEqual(list(fast[frame]), slow[frame])
+
+    def test_reverse_complement(self):
+        self.assertEqual(codon_index.reverse_complement('acgtNRYX'), 'XRYNACGT')
+
+    def test_invalid_codon(self):
+        with self.assertRaises(ValueError):
+            scan_stops('ACGT', 'TA')
+
+
+if __name__ == '__main__':
+    unittest.main()
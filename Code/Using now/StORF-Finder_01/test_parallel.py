@@ -0,0 +1,96 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from StORF_Finder import size_chunks, find_chunk, find_parallel, StORF_Reported, read_fasta
+from block_gzip import BlockGzipWriter, open_fasta
+from storf_test_data import make_options, random_records
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records()
+
+    def test_size_chunks(self):
+        chunks = list(size_chunks(iter(self.records), [], chunk_nt=5000))
+        self.assertEqual([record for chunk, _ in chunks for record in chunk], self.records)
+        for chunk, regions_seen in chunks[:-1]:
+            self.assertGreaterEqual(sum(len(record[2]) for record in chunk), 5000)
+            self.assertEqual(len(regions_seen), len(chunk))
+
+    def test_parallel_matches_serial(self):
+        options = make_options(translate=True)
+        outputs = [True, True, True]
+        serial = find_chunk(options, self.records, outputs)
+        parallel = [ur_output for _, ur_output in find_parallel(options, iter(self.records), [], outputs)]
+        self.assertEqual(parallel, serial)
+        self.assertTrue(any(ur_output[2] for ur_output in serial))
+
+    def test_parallel_with_gz_output_open(self):
+        # Workers are started while the -gz compression threads are running
+        options = make_options()
+        outputs = [True, False, True]
+        serial = find_chunk(options, self.records, outputs)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'urs.fasta.gz')
+            with BlockGzipWriter(path, level=1, threads=2) as fasta_out:
+                fasta_out.write('x' * 300000) # Blocks being compressed as the pool starts
+                for _, ur_output in find_parallel(options, iter(self.records), [], outputs):
+                    fasta_out.write(ur_output[0])
+            with gzip.open(path, 'rt') as fasta_in:
+                self.assertEqual(fasta_in.read(), 'x' * 300000 + ''.join(ur_output[0] for ur_output in serial))
+
+    def test_parallel_with_bgzf_input(self):
+        # -threads 2 on BGZF input - workers start while the reader's decompression threads have blocks queued
+        options = make_options(translate=True)
+        outputs = [True, True, True]
+        serial = find_chunk(options, self.records, outputs)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'urs.fa.gz')
+            with BlockGzipWriter(path, level=1) as fasta_out:
+                for sequence_id, _, sequence in self.records:
+                    fasta_out.write(sequence_id + '\n' + sequence + '\n')
+            with open_fasta(path, threads=2) as fasta_in:
+                parallel = [ur_output for _, ur_output in find_parallel(options, read_fasta(fasta_in, []), [], outputs)]
+        self.assertEqual(parallel, serial)
+
+    def test_overlap_relations(self):
+        options = make_options(con_storfs=True, priority_strategy='storf_type')
+        outputs = [True, False, True, False, True]
+        serial = find_chunk(options, self.records, outputs)
+        parallel = [ur_output for _, ur_output in find_parallel(options, iter(self.records), [], outputs)]
+        self.assertEqual(parallel, serial)
+        reported = {line.split('ID=')[1].split(';')[0] for ur_output in serial for line in ur_output[2].splitlines()}
+        rows = [line.split('\t') for ur_output in serial for line in ur_output[4].splitlines()]
+        self.assertTrue(rows)
+        for ur, kept_id, candidate_id, overlap, winner, reason in rows:
+            self.assertIn(kept_id, reported)
+            self.assertTrue(kept_id.startswith(ur) and candidate_id.startswith(ur))
+            if reason == 'below_threshold':
+                self.assertEqual(winner, 'both')
+                self.assertIn(candidate_id, reported)
+                self.assertLess(int(overlap), options.overlap_nt)
+            else:
+                self.assertEqual(winner, kept_id)
+                self.assertNotIn(candidate_id, reported)
+                self.assertIn(reason, ('nested', 'threshold', 'priority'))
+        removed = {row[2] for row in rows if row[5] != 'below_threshold'}
+        self.assertEqual(len(removed), len([row for row in rows if row[5] != 'below_threshold'])) # Removed once
+
+    def test_parallel_reporter_matches_serial(self):
+        # Contigs as built by StORF-Reporter: [.., contig_length, .., {UR: [true_UR, sequence]}]
+        contigs = {'Contig_' + str(c): [None, 50000, None, {}] for c in range(3)}
+        for i, (sequence_id, _, sequence) in enumerate(self.records):
+            ur = '_'.join(sequence_id.split('_')[-2:])
+            contigs['Contig_' + str(i % 3)][3][ur] = [ur, sequence]
+        for mode in ({}, {'con_storfs': True}, {'short_storfs': 'Nolap'}):
+            serial = StORF_Reported(make_options(reporter=True, threads=1, **mode), contigs)
+            parallel = StORF_Reported(make_options(reporter=True, threads=2, **mode), contigs)
+            self.assertEqual(parallel, serial)
+            self.assertTrue(any(serial.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
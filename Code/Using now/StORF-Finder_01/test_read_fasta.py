@@ -0,0 +1,89 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from StORF_Finder import read_fasta, fasta_load, read_indexed_urs
+from block_gzip import BlockGzipWriter, open_fasta
+from indexed_fasta import IndexedFasta
+
+
+FASTA = ('##sequence-region NC_1 1 900\n'
+         '>NC_1_UR_1_20\n'
+         'ACGTACGTAC\n'
+         'GTACGTACGT\n'
+         '\n'
+         '# comment\n'
+         '>NC_1_UR_40_49\n'
+         'TTTTAAAAGG\n')
+
+
+class TestReadFasta(unittest.TestCase):
+
+    def test_records_are_streamed(self):
+        sequence_regions = []
+        records = read_fasta(io.StringIO(FASTA), sequence_regions)
+        self.assertEqual(next(records), ('>NC_1_UR_1_20', 900, 'ACGTACGTACGTACGTACGT'))
+        self.assertEqual(sequence_regions, ['##sequence-region NC_1 1 900'])
+        self.assertEqual(list(records), [('>NC_1_UR_40_49', 900, 'TTTTAAAAGG')])
+
+    def test_fasta_load_matches(self):
+        sequence_regions, sequences = fasta_load(io.StringIO(FASTA), [], OrderedDict())
+        self.assertEqual(list(sequences.items()), [('>NC_1_UR_1_20', [900, 'ACGTACGTACGTACGTACGT']),
+                                                   ('>NC_1_UR_40_49', [900, 'TTTTAAAAGG'])])
+
+    def test_gzip_input(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'urs.fa.gz')
+            with gzip.open(path, 'wt') as fasta_out:
+                fasta_out.write(FASTA)
+            with gzip.open(path, 'rt') as fasta_in:
+                self.assertEqual(len(list(read_fasta(fasta_in, []))), 2)
+
+    def test_open_fasta_formats(self):
+        # Same records from plain, gzip and BGZF (records spanning BGZF blocks) input
+        fasta = FASTA * 3000
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, name) for name in ('urs.fa', 'urs.fa.gz', 'urs.fa.bgz')]
+            with open(paths[0], 'w') as fasta_out:
+                fasta_out.write(fasta)
+            with gzip.open(paths[1], 'wt') as fasta_out:
+                fasta_out.write(fasta)
+            with BlockGzipWriter(paths[2]) as fasta_out:
+                fasta_out.write(fasta)
+            expected = list(read_fasta(io.StringIO(fasta), []))
+            for path in paths:
+                for threads in (1, 3):
+                    with open_fasta(path, threads) as fasta_in:
+                        self.assertEqual(list(read_fasta(fasta_in, [])), expected)
+
+    def test_open_fasta_errors_are_not_hidden(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(FileNotFoundError):
+                open_fasta(os.path.join(tmp_dir, 'missing.fa'))
+
+    def test_indexed_urs_match_read_fasta(self):
+        fasta = FASTA + '##sequence-region NC_2 1 500\n>NC_2_UR_5_14\nACGTACGTAC\n'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'urs.fa')
+            with open(path, 'w') as fasta_out:
+                fasta_out.write(fasta)
+            expected_regions = []
+            expected = list(read_fasta(io.StringIO(fasta), expected_regions))
+            with IndexedFasta(path) as indexed:
+                sequence_regions = []
+                self.assertEqual(list(read_indexed_urs(indexed, ['>NC_1_UR_40_49', 'NC_2_UR_5_14', 'NC_1_UR_1_20'],
+                                                       sequence_regions)), expected)
+                self.assertEqual(sequence_regions, expected_regions)
+                self.assertEqual(list(read_indexed_urs(indexed, ['NC_2_UR_5_14'], [])), expected[2:])
+                with self.assertRaises(KeyError):
+                    read_indexed_urs(indexed, ['NC_3_UR_1_9'], [])
+
+    def test_empty_input(self):
+        self.assertEqual(list(read_fasta(io.StringIO(''), [])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
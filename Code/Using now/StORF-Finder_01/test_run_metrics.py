@@ -0,0 +1,62 @@
+import pickle
+import time
+import unittest
+
+from StORF_Finder import find_chunk
+from run_metrics import RunMetrics, timed_records, COUNTERS
+from storf_test_data import make_options, random_records
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records()
+
+    def test_nested_phases(self):
+        metrics = RunMetrics()
+        metrics.start_ur('>UR_1', 10)
+        metrics.start('con_storf_assembly')
+        metrics.start('tiling')
+        time.sleep(0.02)
+        metrics.stop(removed_tiling=3)
+        metrics.stop()
+        metrics.end_ur()
+        seconds = metrics.urs[0]['seconds']
+        self.assertGreaterEqual(seconds['tiling'], 0.02)
+        self.assertLess(seconds['con_storf_assembly'], 0.02) # Excludes the nested tiling
+        self.assertEqual(metrics.urs[0]['ur'], 'UR_1')
+        self.assertEqual(metrics.total['counts'], {'removed_tiling': 3})
+
+    def test_load_is_run_total_only(self):
+        metrics = RunMetrics()
+        self.assertEqual(list(timed_records(iter(self.records), metrics)), self.records)
+        self.assertIn('load', metrics.total['seconds'])
+        self.assertEqual(metrics.urs, [])
+
+    def test_find_chunk_counts(self):
+        options = make_options(threads=1, con_storfs=True, metrics=RunMetrics())
+        results = find_chunk(options, self.records, [True, False, True])
+        totals = options.metrics.to_dict()['total']
+        self.assertEqual(totals['urs'], len(self.records))
+        self.assertEqual(list(totals['counts']), COUNTERS)
+        self.assertEqual(totals['counts']['reported'], sum(ur_output[0].count('>') for ur_output in results))
+        self.assertEqual(totals['counts']['bytes_written'], sum(len(ur_output[0]) + len(ur_output[2]) for ur_output in results))
+        self.assertGreater(totals['counts']['stops_scanned'], totals['counts']['candidates'])
+        self.assertEqual(totals['counts']['candidates'] - totals['counts']['removed_non_standard'] - totals['counts']['removed_tiling'],
+                         totals['counts']['reported'])
+        for phase in ('stop_scan', 'pairing', 'con_storf_assembly', 'tiling', 'formatting', 'writing'):
+            self.assertIn(phase, totals['seconds'])
+
+    def test_workers_start_empty_and_merge(self):
+        options = make_options(threads=1, metrics=RunMetrics())
+        find_chunk(options, self.records[:4], [True, False, True])
+        worker_options = pickle.loads(pickle.dumps(options))
+        self.assertEqual(worker_options.metrics.urs, [])
+        find_chunk(worker_options, self.records[4:], [True, False, True])
+        options.metrics.merge(pickle.loads(pickle.dumps(worker_options.metrics.worker_results())))
+        self.assertEqual([ur['ur'] for ur in options.metrics.urs], [record[0][1:] for record in self.records])
+        self.assertEqual(options.metrics.total['urs'], len(self.records))
+
+
+if __name__ == '__main__':
+    unittest.main()
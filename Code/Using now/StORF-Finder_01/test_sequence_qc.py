@@ -0,0 +1,43 @@
+import random
+import unittest
+
+import sequence_qc
+from sequence_qc import SequenceQC
+
+
+class TestSequenceQC(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(1)
+        self.sequence = ''.join(rnd.choices('ACGTNacgtRY', weights=[20, 20, 20, 20, 5, 3, 3, 3, 3, 1, 1], k=500))
+        self.intervals = [(0, 500), (0, 0), (499, 500)] + [tuple(sorted(rnd.sample(range(501), 2))) for _ in range(50)]
+
+    def naive(self, begin, end):
+        interval = self.sequence[begin:end].upper()
+        non_standard = sum(1 for nt in interval if nt not in 'ACGT')
+        gc = sum(1 for nt in interval if nt in 'GC')
+        return non_standard, gc
+
+    def check(self, qc):
+        for begin, end in self.intervals:
+            non_standard, gc = self.naive(begin, end)
+            self.assertEqual(qc.non_standard_count(begin, end), non_standard)
+            if end > begin:
+                self.assertAlmostEqual(qc.non_standard_fraction(begin, end), non_standard / (end - begin))
+                self.assertAlmostEqual(qc.gc_content(begin, end), gc / (end - begin))
+            else:
+                self.assertEqual(qc.gc_content(begin, end), 0.0)
+
+    def test_prefix_sums(self):
+        self.check(SequenceQC(self.sequence))
+
+    def test_python_fallback(self):
+        np, sequence_qc.np = sequence_qc.np, None
+        try:
+            self.check(SequenceQC(self.sequence))
+        finally:
+            sequence_qc.np = np
+
+
+if __name__ == '__main__':
+    unittest.main()
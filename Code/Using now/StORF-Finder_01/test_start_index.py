@@ -0,0 +1,72 @@
+import random
+import unittest
+
+import start_index
+from codon_index import reverse_complement, encode_codons
+from start_index import StartIndex
+
+
+def strand_seq(sequence, offset, length, strand):
+    storf_seq = sequence[offset:offset + length]
+    return reverse_complement(storf_seq) if strand == '-' else storf_seq
+
+
+def naive_first_start(storf_seq):
+    for position in range(0, len(storf_seq) - 2, 3):
+        if storf_seq[position:position + 3] in ('ATG', 'GTG', 'TTG'):
+            return position
+    return -1
+
+
+def naive_longest_orf(storf_seq):
+    longest = None
+    start = None
+    for position in range(0, len(storf_seq) - 2, 3):
+        codon = storf_seq[position:position + 3]
+        if start is None and codon in ('ATG', 'GTG', 'TTG'):
+            start = position
+        elif start is not None and codon in ('TAG', 'TGA', 'TAA'):
+            if longest is None or position + 3 - start > longest[1]:
+                longest = (start, position + 3 - start)
+            start = None
+    return longest
+
+
+class TestStartIndex(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(12)
+        self.sequence = ''.join(rnd.choices('ACGTN', weights=[25, 25, 25, 25, 1], k=900))
+        self.refs = [(0, 900), (0, 0), (898, 2)] + [(offset, rnd.randint(0, 900 - offset))
+                                                   for offset in rnd.choices(range(900), k=200)]
+
+    def check(self, index):
+        for offset, length in self.refs:
+            for strand in ('+', '-'):
+                storf_seq = strand_seq(self.sequence, offset, length, strand)
+                self.assertEqual(index.first_start(offset, length, strand), naive_first_start(storf_seq))
+                self.assertEqual(index.longest_orf(offset, length, strand), naive_longest_orf(storf_seq))
+
+    def test_matches_naive_scan(self):
+        self.check(StartIndex(self.sequence))
+
+    def test_shared_codons(self):
+        # The encoding from the stop scan, int32 lookups
+        index = StartIndex(self.sequence.lower(), codons=encode_codons(self.sequence.lower()))
+        self.check(index)
+        self.assertEqual(index.forward[0].dtype, start_index.np.int32)
+
+    def test_python_fallback(self):
+        np, start_index.np = start_index.np, None
+        try:
+            self.check(StartIndex(self.sequence))
+        finally:
+            start_index.np = np
+
+    def test_overlapping_starts(self):
+        # GTGTG - the in-frame GTG at 3 overlaps the out-of-frame one at 1
+        self.assertEqual(StartIndex('TGTGTGAAATAA').first_start(0, 12, '+'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from StORF_Finder import find_chunk, prepare_out
+from storf_columns import ColumnBuffer, ColumnWriter, StORFColumns
+from storf_table import StORFTable, NO_MID, slice_ref
+import Overlap01
+from storf_test_data import make_options, random_records
+
+
+class TestStORFColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.npz_path = os.path.join(self.tmp_dir.name, 'storfs.npz')
+        self.fasta_path = os.path.join(self.tmp_dir.name, 'storfs.fasta')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, options, chunk_rows=50000):
+        # Per-UR ColumnBuffers collected into one table, as main() does with -threads
+        results = find_chunk(options, self.records, [True, False, True, True])
+        columns_out = ColumnWriter(self.npz_path, chunk_rows)
+        with open(self.fasta_path, 'w') as fasta_out:
+            for fasta, _, gff, columns in results:
+                fasta_out.write(fasta)
+                if columns:
+                    columns_out.write(columns)
+        columns_out.close()
+        return results
+
+    def test_matches_fasta_and_gff(self):
+        results = self.write(make_options(threads=1, con_storfs=True, line_wrap=False))
+        columns = StORFColumns(self.npz_path)
+        fasta_lines = ''.join(ur_output[0] for ur_output in results).splitlines()
+        gff_lines = [line.split('\t') for ur_output in results for line in ur_output[2].splitlines()]
+        self.assertEqual(len(columns), len(gff_lines))
+        self.assertEqual(columns.headers(), [line[1:] for line in fasta_lines[0::2]])
+        self.assertEqual(columns.sequences(), fasta_lines[1::2])
+        self.assertEqual(columns.start.tolist(), [int(line[3]) for line in gff_lines])
+        self.assertEqual(columns.stop.tolist(), [int(line[4]) for line in gff_lines])
+        self.assertEqual(columns.strand.tolist(), [line[6] for line in gff_lines])
+        self.assertEqual(['StORF_Type=' + storf_type in line[8] for storf_type, line in zip(columns.storf_type, gff_lines)],
+                         [True] * len(gff_lines))
+        self.assertEqual(columns.ur.tolist(), [header.split(';UR=')[1].split(';')[0] for header in columns.headers()])
+        self.assertIn('Con-StORF', set(columns.storf_type))
+        self.assertEqual(set(columns.ur_mid[columns.storf_type == 'StORF'].tolist()), {-1})
+
+    def test_chunks_join_to_one_table(self):
+        self.write(make_options(threads=1, con_storfs=True))
+        whole = StORFColumns(self.npz_path)
+        for chunk_rows in (1, 7, 30):
+            self.write(make_options(threads=1, con_storfs=True), chunk_rows)
+            with np.load(self.npz_path) as data:
+                self.assertGreater(int(data['chunks']), 1) # Cut after the UR that fills a chunk
+            columns = StORFColumns(self.npz_path)
+            self.assertEqual(columns.headers(), whole.headers())
+            self.assertEqual(columns.sequences(), whole.sequences())
+            for name in ('contig', 'ur', 'storf_type', 'start', 'ur_mid', 'strand', 'frame', 'mid_stop'):
+                self.assertEqual(getattr(columns, name).tolist(), getattr(whole, name).tolist())
+
+    def test_rows_added_one_at_a_time(self):
+        results = find_chunk(make_options(threads=1), self.records, [True, False, True, True])
+        columns_out = ColumnWriter(self.npz_path, chunk_rows=3)
+        for _, _, _, columns in results:
+            for row in zip(*columns.values):
+                columns_out.add(*row)
+        columns_out.close()
+        with np.load(self.npz_path) as data:
+            self.assertEqual(int(data['chunks']), -(-sum(len(columns) for *_, columns in results) // 3))
+        self.assertEqual(StORFColumns(self.npz_path).headers(),
+                         [header for *_, columns in results for header in columns.values[2]])
+
+    def test_rows_match_merged_fasta_records(self):
+        # Two StORFs with the same FASTA header are one record - and one row
+        table = StORFTable('ACGT' * 100)
+        for frame in (1, 2):
+            table.append(10, NO_MID, 130, frame, '+', 120, 'StORF', 0, slice_ref(400, 10, 130))
+        options = make_options(unannotated=False)
+        columns_out = ColumnBuffer()
+        _, (fasta_headers, _) = prepare_out(options, table, '>contig_1', columns_out)
+        self.assertEqual(len(fasta_headers), 1)
+        self.assertEqual(len(columns_out), 1)
+        self.assertEqual(columns_out.values[2], [fasta_headers[0][1:-1]])
+
+    def test_overlap_loader_matches_fasta(self):
+        self.write(make_options(threads=1, con_storfs=True))
+        self.assertEqual(Overlap01.load_positions_and_sequences(self.npz_path),
+                         Overlap01.parse_fasta_positions_and_sequences(self.fasta_path))
+
+    def test_empty_table(self):
+        ColumnWriter(self.npz_path).close()
+        columns = StORFColumns(self.npz_path)
+        self.assertEqual(len(columns), 0)
+        self.assertEqual(columns.headers(), [])
+        self.assertEqual(len(columns.to_dataframe()), 0)
+
+    def test_buffer_protocol(self):
+        buffer = ColumnBuffer()
+        self.assertFalse(buffer)
+        self.assertIs(buffer.getvalue(), buffer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,19 @@
 import unittest
-import StORF_Finder
 from collections import OrderedDict
 from types import SimpleNamespace
-from your_module_name import tile_filtering  # Replace with actual module name
+from StORF_Finder import tile_filtering, record_templates, select_storfs
+from storf_table import StORFTable, NO_MID, slice_ref
+from storf_test_data import make_options, random_records
+
+
+def storf_table(storfs, ur_length=400):
+    # StORFTable holding the same StORFs as an old style OrderedDict
+    table = StORFTable('N' * ur_length)
+    for key, (_, frame, strand, length, storf_type, idx) in storfs.items():
+        start, stop = [int(pos) for pos in key.split(',')]
+        table.append(start, NO_MID, stop, frame, strand, length, storf_type, idx, slice_ref(ur_length, start, stop))
+    return table
+
 
 class TestTileFiltering(unittest.TestCase):
 
@@ -15,6 +26,7 @@ class TestTileFiltering(unittest.TestCase):
             "210,300": ["TTG...TGA", "1", "+", 90, "StORF", 3],
             "240,320": ["ATG...TAA", "1", "+", 80, "Con-StORF", 4]
         })
+        self.storfs = storf_table(self.storfs)
 
         # Common options object with all flags needed
         self.default_options = SimpleNamespace(
@@ -30,7 +42,7 @@ class TestTileFiltering(unittest.TestCase):
         )
 
     def test_length_priority_removes_shorter_overlapping(self):
-        result = tile_filtering(self.storfs, self.default_options)
+        result = tile_filtering(self.storfs, self.default_options).to_dict()
         keys = list(result.keys())
 
         # Should retain 100-200 and remove 180-250 due to overlap and length
@@ -38,7 +50,7 @@ class TestTileFiltering(unittest.TestCase):
         self.assertNotIn("180,250", keys)
 
     def test_storf_type_priority_keeps_con_storf_first(self):
-        result = tile_filtering(self.storfs, self.priority_options)
+        result = tile_filtering(self.storfs, self.priority_options).to_dict()
         keys = list(result.keys())
 
         # Should retain 180-250 over 100-200 due to Con-StORF priority
@@ -46,10 +58,38 @@ class TestTileFiltering(unittest.TestCase):
         self.assertNotIn("100,200", keys)
 
     def test_final_ordering_by_start_pos(self):
-        result = tile_filtering(self.storfs, self.default_options)
+        result = tile_filtering(self.storfs, self.default_options).to_dict()
         starts = [int(k.split(',')[0]) for k in result.keys()]
         self.assertEqual(starts, sorted(starts))
 
+    def test_relations(self):
+        relations = []
+        tile_filtering(self.storfs, self.priority_options, relations)
+        self.assertEqual([(candidate[:2], kept[:2], overlap, reason) for candidate, kept, overlap, reason in relations],
+                         [((180, 250), (240, 320), 11, 'below_threshold'), # Con-StORFs first, longest first
+                          ((100, 200), (180, 250), 21, 'priority'),
+                          ((210, 300), (180, 250), 41, 'priority')])
+        relations = []
+        tile_filtering(self.storfs, self.default_options, relations)
+        self.assertEqual([(candidate[:2], kept[:2], reason) for candidate, kept, _, reason in relations],
+                         [((240, 320), (210, 300), 'threshold'), ((180, 250), (100, 200), 'threshold')])
+
+    def test_relations_of_removed_candidate(self):
+        # 200-300 overlaps kept 100-210 by less than overlap_nt, then is removed by 250-400
+        storfs = storf_table(OrderedDict({
+            "100,210": ["", "1", "+", 110, "StORF", 1],
+            "200,300": ["", "1", "+", 100, "StORF", 2],
+            "250,400": ["", "1", "+", 150, "StORF", 3]
+        }), ur_length=500)
+        relations = []
+        reported = set(tile_filtering(storfs, self.default_options, relations).to_dict())
+        self.assertEqual([(candidate[:2], kept[:2], overlap, reason) for candidate, kept, overlap, reason in relations],
+                         [((200, 300), (250, 400), 51, 'threshold')])
+        for candidate, kept, _, reason in relations:
+            if reason == 'below_threshold': # Both named StORFs must be in the output
+                self.assertIn('%d,%d' % candidate[:2], reported)
+                self.assertIn('%d,%d' % kept[:2], reported)
+
     def test_overlapping_threshold_exclusion(self):
         # Set a strict threshold to allow everything
         loose_options = SimpleNamespace(
@@ -57,8 +97,36 @@ class TestTileFiltering(unittest.TestCase):
             storf_order='start_pos',
             priority_strategy='length'
         )
-        result = tile_filtering(self.storfs, loose_options)
+        result = tile_filtering(self.storfs, loose_options).to_dict()
         self.assertEqual(len(result), len(self.storfs))  # All should pass
 
+class TestSelectStORFs(unittest.TestCase):
+
+    def test_one_storf_per_position_key(self):
+        # Without overlap filtering StORFs on both strands can share a "start,stop" key - only one is reported
+        for olap_filtering, short_storfs in (('none', False), ('single-strand', False), ('none', 'Olap'), ('single-strand', 'Nolap')):
+            options = make_options(threads=1, olap_filtering=olap_filtering, short_storfs=short_storfs)
+            for sequence_id, _, sequence in random_records(200000, seed=2):
+                storfs = select_storfs(options, [len(sequence), sequence], sequence_id, 3)
+                if storfs is not None:
+                    keys = [tuple(storfs.positions(row)) for row in range(len(storfs))]
+                    self.assertEqual(len(set(keys)), len(keys), sequence_id)
+
+
+class TestRecordTemplates(unittest.TestCase):
+
+    def test_literal_percent_and_braces_in_ids(self):
+        options = SimpleNamespace(unannotated=True, feature_type='CDS')
+        (gff_template, gff_fields), (fasta_template, fasta_fields), contig, ur_offset = \
+            record_templates(options, '>chr%s{0}_UR_10_200')
+        self.assertEqual((contig, ur_offset), ('chr%s{0}', 10))
+        fields = (14, 106, '+', 'StORF', 0, '3-99', 93, 3, 1, 'TAG', 'N/A', 'TGA', '')
+        gff_line = (gff_template % gff_fields(fields)).split('\t')
+        self.assertEqual(gff_line[:7], ['chr%s{0}', 'Single_Genome', 'CDS', '14', '106', '.', '+'])
+        self.assertTrue(gff_line[8].startswith('ID=chr%s{0}_UR_10_200_StORF_0:14-106;UR=chr%s{0}_UR_10_200;'))
+        self.assertEqual(fasta_template % fasta_fields(fields),
+                         '>chr%s{0}_UR_10_200_StORF_0:14-106;UR=chr%s{0}_UR_10_200;UR_Stop_Locations=3-99;Length=93;'
+                         'Strand=+;Frame=3;UR_Frame=1;Start_Stop=TAG;End_Stop=TGA;StORF_Type=StORF\n')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import io
+import random
+import textwrap
+import unittest
+
+from storf_output import wrap_sequence, format_fasta, OutputBuffer
+
+
+def textwrap_fasta(headers, sequences, line_wrap):
+    # The original per-line textwrap writer of write_fasta
+    out = io.StringIO()
+    for header, sequence in zip(headers, sequences):
+        out.write(header)
+        if line_wrap:
+            for wrap in textwrap.wrap(sequence, width=60):
+                out.write(wrap + '\n')
+        else:
+            out.write(sequence + '\n')
+    return out.getvalue()
+
+
+class TestStORFOutput(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(3)
+        self.sequences = [''.join(rnd.choices('ACGTNX*', k=length)) for length in [0, 1, 59, 60, 61, 120, 121, 1000]]
+        self.headers = ['>storf_' + str(i) + ';Length=' + str(len(sequence)) + '\n' for i, sequence in enumerate(self.sequences)]
+
+    def test_wrap_matches_textwrap(self):
+        for line_wrap in (True, False):
+            self.assertEqual(format_fasta(self.headers, self.sequences, line_wrap),
+                             textwrap_fasta(self.headers, self.sequences, line_wrap))
+
+    def test_empty_sequence(self):
+        self.assertEqual(wrap_sequence(''), '')
+        self.assertEqual(wrap_sequence('', None), '\n')
+
+    def test_buffer_flushes_in_order(self):
+        handle = io.StringIO()
+        out = OutputBuffer(handle, flush_size=10)
+        out.write('abc')
+        self.assertEqual(handle.getvalue(), '')
+        out.write('defghijk')
+        self.assertEqual(handle.getvalue(), 'abcdefghijk')
+        out.write('l')
+        out.flush()
+        self.assertEqual(handle.getvalue(), 'abcdefghijkl')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from collections import OrderedDict
+
+from codon_index import reverse_complement
+from storf_table import StORFTable, NO_MID, slice_ref
+
+
+class TestStORFTable(unittest.TestCase):
+
+    def setUp(self):
+        self.sequence = 'TAAATGCCCGGGTAGAAATGA'
+        self.sequence_rev = reverse_complement(self.sequence)
+        self.table = StORFTable(self.sequence)
+        self.table.append(0, NO_MID, 15, 1, '+', 15, 'StORF', 0, slice_ref(21, 0, 15))
+        self.table.append(0, 12, 21, 1, '+', 21, 'Con-StORF', 0, slice_ref(21, 0, 21))
+        self.table.append(3, NO_MID, 9, 4, '-', 6, 'StORF', 1, slice_ref(21, 3, 9, '-'))
+
+    def test_slice_ref_clamps_like_python(self):
+        self.assertEqual(slice_ref(10, 4, 20), (4, 6))
+        self.assertEqual(slice_ref(10, 12, 20), (10, 0))
+        self.assertEqual(slice_ref(10, 6, 3), (6, 0))
+        self.assertEqual(slice_ref(10, 2, 5, '-'), (5, 3))
+
+    def test_sequences_are_references(self):
+        self.assertEqual(self.table.sequence(0), self.sequence[0:15])
+        self.assertEqual(self.table.sequence(2), self.sequence_rev[3:9])
+
+    def test_pop_and_take(self):
+        taken = self.table.take([2, 0])
+        self.assertEqual(list(taken.idx), [1, 0])
+        self.table.pop()
+        self.assertEqual(len(self.table), 2)
+
+    def test_sorted_by_position_matches_key_order(self):
+        order = self.table.sorted_by_position()
+        self.assertEqual([order.positions(row) for row in range(len(order))], [[0, 12, 21], [0, 15], [3, 9]])
+
+    def test_collapse_positions_as_dict(self):
+        self.assertIs(self.table.collapse_positions(), self.table)
+        self.table.append(0, NO_MID, 15, 6, '-', 15, 'StORF', 2, slice_ref(21, 0, 15, '-'))
+        collapsed = self.table.collapse_positions()
+        expected = OrderedDict(self.table.to_dict()) # Same key, later value, earlier place
+        self.assertEqual(collapsed.to_dict(), expected)
+        self.assertEqual([collapsed.strand_of(row) for row in range(len(collapsed))], ['-', '+', '-'])
+
+    def test_to_dict(self):
+        storfs = self.table.to_dict()
+        self.assertIsInstance(storfs, OrderedDict)
+        self.assertEqual(list(storfs.keys()), ['0,15', '0,12,21', '3,9'])
+        self.assertEqual(storfs['3,9'], [self.sequence_rev[3:9], '4', '-', 6, 'StORF', 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
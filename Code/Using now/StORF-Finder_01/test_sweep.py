@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from StORF_Finder import sweep_configs, run_sweep, find_chunk
+from storf_test_data import make_options, random_records
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records()
+        self.options = make_options(threads=1, gz=False, fasta='urs.fasta', sweep='olap=0,50;con_storfs=False,True')
+
+    def test_sweep_configs(self):
+        configs = sweep_configs(self.options, self.options.sweep)
+        self.assertEqual([name for name, _ in configs], ['sweep_1', 'sweep_2', 'sweep_3', 'sweep_4'])
+        self.assertEqual([(config.overlap_nt, config.con_storfs) for _, config in configs],
+                         [(0, False), (0, True), (50, False), (50, True)])
+        self.assertEqual(self.options.overlap_nt, 50)
+        with self.assertRaises(SystemExit):
+            sweep_configs(self.options, 'olap=0;codons=TAG')
+        with self.assertRaises(SystemExit):
+            sweep_configs(self.options, 'priority=longest')
+
+    def test_sweep_matches_single_runs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, 'urs')
+            run_sweep(self.options, iter(self.records), output_file, [])
+            for name, config in sweep_configs(self.options, self.options.sweep):
+                single = find_chunk(config, self.records, [True, False, True])
+                with open(output_file + '_' + name + '.fasta') as fasta_in:
+                    self.assertEqual(fasta_in.read(), ''.join(ur_output[0] for ur_output in single))
+            with open(output_file + '_sweep_summary.tsv') as summary_in:
+                summary = [line.rstrip('\n').split('\t') for line in summary_in]
+            self.assertEqual(len(summary), 5)
+            self.assertEqual(summary[0][0], 'Config')
+            self.assertTrue(all(int(row[-1]) > 0 for row in summary[1:]))
+
+    def test_sweep_with_threads(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            outputs = {}
+            for threads in (1, 2):
+                output_file = os.path.join(tmp_dir, 'urs_' + str(threads))
+                counts = run_sweep(make_options(threads=threads, gz=False, fasta='urs.fasta', sweep=self.options.sweep),
+                                   iter(self.records), output_file, ['##sequence-region NC_1 1 100000'])
+                files = []
+                for name in ['sweep_' + str(number) for number in range(1, 5)]:
+                    for suffix in ('.fasta', '.gff'):
+                        with open(output_file + '_' + name + suffix) as output_in:
+                            files.append(output_in.read())
+                outputs[threads] = counts, files
+            self.assertEqual(outputs[2], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
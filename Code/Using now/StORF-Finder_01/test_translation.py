@@ -0,0 +1,57 @@
+import random
+import unittest
+
+import translation
+from translation import translate_sequences, codon_table, NCBI_TABLES
+from StORF_Finder import gencode
+
+
+def dict_translate(sequence, codons):
+    # The original per-codon dict lookup of translate_frame, lower case codons upper-cased
+    return ''.join([codons.get(sequence[3 * i:3 * i + 3].upper(), 'X') for i in range(len(sequence) // 3)])
+
+
+class TestTranslation(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(11)
+        self.sequences = [''.join(rnd.choices('ACGTNacgt', weights=[30, 20, 20, 30, 1, 1, 1, 1, 1], k=rnd.randint(0, 400)))
+                          for _ in range(40)]
+
+    def test_table_11_is_gencode(self):
+        self.assertEqual(codon_table(11), gencode)
+
+    def test_tables_are_complete(self):
+        for table in NCBI_TABLES:
+            self.assertEqual(len(codon_table(table)), 64)
+
+    def test_alternative_table(self):
+        self.assertEqual(translate_sequences(['ATGTGAAGA'], 11), ['M*R'])
+        self.assertEqual(translate_sequences(['ATGTGAAGA'], 2), ['MW*'])
+        with self.assertRaises(ValueError):
+            translate_sequences(['ATG'], 7)
+
+    def test_batch_matches_dict_lookup(self):
+        for table in (1, 4, 11, 25):
+            codons = codon_table(table)
+            expected = [dict_translate(sequence, codons) for sequence in self.sequences]
+            self.assertEqual(translate_sequences(self.sequences, table), expected)
+            self.assertEqual(translate_sequences(self.sequences, table, strip_stops=True),
+                             [amino.replace('*', '') for amino in expected])
+
+    def test_soft_masked(self):
+        self.assertEqual(translate_sequences(['atgTGAaga', 'ATGnga'], 11), ['M*R', 'MX'])
+
+    def test_python_fallback(self):
+        batch = translate_sequences(self.sequences, 11, strip_stops=True)
+        np, translation.np = translation.np, None
+        lookups, translation._lookups = translation._lookups, {}
+        try:
+            self.assertEqual(translate_sequences(self.sequences, 11, strip_stops=True), batch)
+        finally:
+            translation.np = np
+            translation._lookups = lookups
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from StORF_Finder import STORF_Finder, select_storfs
+from ur_cache import URCache
+from storf_test_data import make_options, random_records
+
+
+class TestURCache(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.options = make_options(threads=1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def search(self, options):
+        return [STORF_Finder(options, [len(sequence), sequence], sequence_id, None, None, None, 3)
+                for sequence_id, _, sequence in self.records]
+
+    def test_roundtrip(self):
+        cache = URCache(self.tmp_dir.name)
+        for sequence_id, _, sequence in self.records:
+            storfs = select_storfs(self.options, [len(sequence), sequence], sequence_id, 3)
+            key = cache.key(sequence, True, self.options)
+            cache.put(key, storfs)
+            found, cached = cache.get(key, sequence)
+            self.assertTrue(found)
+            if storfs is None:
+                self.assertIsNone(cached)
+            else:
+                self.assertEqual(cached.to_dict(), storfs.to_dict())
+
+    def test_hits_and_misses(self):
+        self.options.reporter = True
+        expected = self.search(self.options)
+        self.options.ur_cache = URCache(self.tmp_dir.name)
+        for run in range(2):
+            self.assertEqual(self.search(self.options), expected)
+        self.assertEqual((self.options.ur_cache.hits, self.options.ur_cache.misses), (len(self.records), len(self.records)))
+
+    def test_malformed_entries_are_misses(self):
+        cache = URCache(self.tmp_dir.name)
+        sequence_id, _, sequence = self.records[0]
+        storfs = select_storfs(self.options, [len(sequence), sequence], sequence_id, 3)
+        key = cache.key(sequence, True, self.options)
+        cache.put(key, storfs)
+        with open(cache._path(key), 'rb') as entry_in:
+            data = entry_in.read()
+        for bad in (b'', data[:10], data[:-1], data + b'\0', b'X' + data[1:], pickle.dumps(storfs.to_columns())):
+            with open(cache._path(key), 'wb') as entry_out:
+                entry_out.write(bad)
+            self.assertEqual(cache.get(key, sequence), (False, None))
+        self.assertEqual((cache.hits, cache.misses), (0, 6))
+
+    def test_key_options(self):
+        cache = URCache(self.tmp_dir.name)
+        sequence = self.records[0][2]
+        key = cache.key(sequence, True, self.options)
+        self.assertNotEqual(key, cache.key(sequence, False, self.options))
+        self.assertNotEqual(key, cache.key(sequence[1:], True, self.options))
+        self.assertNotEqual(key, cache.key(sequence, True, make_options(threads=1, overlap_nt=0)))
+        self.assertEqual(key, cache.key(sequence, True, make_options(threads=1, line_wrap=False, translate=True)))
+
+    def test_evicts_least_recently_used(self):
+        cache = URCache(self.tmp_dir.name)
+        sequence_id, _, sequence = self.records[0]
+        storfs = select_storfs(self.options, [len(sequence), sequence], sequence_id, 3)
+        keys = [cache.key(sequence, True, make_options(threads=1, min_orf=min_orf)) for min_orf in (99, 100, 101)]
+        for age, key in enumerate(keys[:2]):
+            cache.put(key, storfs)
+            os.utime(cache._path(key), (time.time() - 100 + age, time.time() - 100 + age))
+        cache.get(keys[0], sequence) # keys[1] is now the oldest
+        cache.max_bytes = os.path.getsize(cache._path(keys[0])) * 2
+        cache.put(keys[2], storfs)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual([cache.get(key, sequence)[0] for key in keys], [True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# --------------------------------------------------------
+# Module: translation
+# Purpose: Table-driven translation of StORF sequences
+# Logic:
+#   - Each NCBI genetic code is held as a 65-entry lookup over the
+#     codon indices of codon_index (64 codons + INVALID_CODON -> 'X')
+#   - All sequences of a UR are joined, encoded once in frame and
+#     translated with a single lookup, then split back by offsets
+#   - A,C,G,T codons translate in either case, so soft-masked (lower
+#     case) StORFs translate as upper case - anything else is 'X'
+# NumPy is used when available. The pure-Python fallback gives
+# identical results.
+# --------------------------------------------------------
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+try:
+    from .codon_index import NUCLEOTIDES, INVALID_CODON, index_to_codon
+except (ModuleNotFoundError, ImportError, NameError, TypeError) as error:
+    from codon_index import NUCLEOTIDES, INVALID_CODON, index_to_codon
+
+DEFAULT_TABLE = 11
+UNKNOWN_AA = 'X'
+STOP_AA = '*'
+
+# NCBI translation tables in NCBI's own notation - amino acids of the
+# 64 codons with bases ordered T,C,A,G (TTT, TTC, TTA, TTG, TCT ...)
+# Tables with context dependent stops (27, 28, 31) are not included
+_NCBI_ORDER = 'TCAG'
+NCBI_TABLES = {
+    1: 'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    2: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSS**VVVVAAAADDEEGGGG',
+    3: 'FFLLSSSSYY**CCWWTTTTPPPPHHQQRRRRIIMMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    4: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    5: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSSSVVVVAAAADDEEGGGG',
+    6: 'FFLLSSSSYYQQCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    9: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNNKSSSSVVVVAAAADDEEGGGG',
+    10: 'FFLLSSSSYY**CCCWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    11: 'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    12: 'FFLLSSSSYY**CC*WLLLSPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    13: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSGGVVVVAAAADDEEGGGG',
+    14: 'FFLLSSSSYYY*CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNNKSSSSVVVVAAAADDEEGGGG',
+    16: 'FFLLSSSSYY*LCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    21: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNNKSSSSVVVVAAAADDEEGGGG',
+    22: 'FFLLSS*SYY*LCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    23: 'FF*LSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    24: 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSSKVVVVAAAADDEEGGGG',
+    25: 'FFLLSSSSYY**CCGWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    26: 'FFLLSSSSYY**CC*WLLLAPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    29: 'FFLLSSSSYYYYCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    30: 'FFLLSSSSYYEECC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG',
+    33: 'FFLLSSSSYYY*CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSSKVVVVAAAADDEEGGGG',
+}
+
+if np is not None:
+    _FRAME_BASES = np.full(256, 4, dtype=np.uint8) # Either case, no upper-cased copy of the batch
+    for _code, _nt in enumerate(NUCLEOTIDES):
+        _FRAME_BASES[ord(_nt)] = _code
+        _FRAME_BASES[ord(_nt.lower())] = _code
+
+_lookups = {}
+
+
+# --------------------------------------------------------
+# Function: codon_table
+# Purpose: {codon: amino acid} dict of an NCBI translation table
+# Input:
+#   table: NCBI translation table number (default 11)
+# Returns:
+#   dict of the 64 upper case codons
+# --------------------------------------------------------
+def codon_table(table=DEFAULT_TABLE):
+    if table not in NCBI_TABLES:
+        raise ValueError('Unsupported NCBI translation table: ' + str(table))
+    amino_acids = NCBI_TABLES[table]
+    codons = {}
+    for i, aa in enumerate(amino_acids):
+        codon = _NCBI_ORDER[i // 16] + _NCBI_ORDER[(i // 4) % 4] + _NCBI_ORDER[i % 4]
+        codons[codon] = aa
+    return codons
+
+
+def _lookup(table):
+    # 65-entry amino acid lookup indexed by codon index - built once per table
+    if table not in _lookups:
+        codons = codon_table(table)
+        amino_acids = ''.join(codons[index_to_codon(index)] for index in range(INVALID_CODON)) + UNKNOWN_AA
+        _lookups[table] = np.frombuffer(amino_acids.encode('ascii'), dtype=np.uint8) if np is not None else amino_acids
+    return _lookups[table]
+
+
+# --------------------------------------------------------
+# Function: translate_sequences
+# Purpose: Translate a batch of nucleotide sequences in one pass
+# Logic:
+#   - Every sequence is translated from its first base, a trailing
+#     partial codon is ignored
+#   - Stop codons become '*' and are removed when strip_stops is set
+#   - Lower case bases translate as upper case
+# Input:
+#   sequences: list of nucleotide strings
+#   table: NCBI translation table number
+#   strip_stops: drop '*' from the amino acid sequences
+# Returns:
+#   list of amino acid strings in the same order
+# --------------------------------------------------------
+def translate_sequences(sequences, table=DEFAULT_TABLE, strip_stops=False):
+    lookup = _lookup(table)
+    if np is None:
+        return _translate_python(sequences, lookup, strip_stops)
+    if not sequences:
+        return []
+
+    codon_counts = np.fromiter((len(sequence) // 3 for sequence in sequences), dtype=np.int64, count=len(sequences))
+    joined = ''.join([sequence[:len(sequence) - len(sequence) % 3] for sequence in sequences])
+    bases = _FRAME_BASES[np.frombuffer(joined.encode('ascii', 'replace'), dtype=np.uint8)].reshape(-1, 3)
+    codons = bases[:, 0] * 16 + bases[:, 1] * 4 + bases[:, 2]
+    codons[((bases[:, 0] | bases[:, 1] | bases[:, 2]) & 4) != 0] = INVALID_CODON
+    amino_acids = lookup[codons]
+
+    bounds = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum(codon_counts, out=bounds[1:])
+    if strip_stops:
+        keep = amino_acids != ord(STOP_AA)
+        kept = np.zeros(len(amino_acids) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept[1:])
+        amino_acids = amino_acids[keep]
+        bounds = kept[bounds]
+    amino_acids = amino_acids.tobytes().decode('ascii')
+    bounds = bounds.tolist()
+    return [amino_acids[bounds[i]:bounds[i + 1]] for i in range(len(sequences))]
+
+
+def _translate_python(sequences, lookup, strip_stops):
+    codons = {index_to_codon(index): aa for index, aa in enumerate(lookup[:INVALID_CODON])}
+    translated = []
+    for sequence in sequences:
+        amino_acids = ''.join([codons.get(sequence[3 * i:3 * i + 3].upper(), UNKNOWN_AA) for i in range(len(sequence) // 3)])
+        if strip_stops:
+            amino_acids = amino_acids.replace(STOP_AA, '')
+        translated.append(amino_acids)
+    return translated
@@ -0,0 +1,193 @@
+# --------------------------------------------------------
+# Module: ur_cache
+# Purpose: Content-addressed on-disk cache of the final StORFs of a UR
+# Logic:
+#   - The key is a SHA-256 of the UR sequence, whether the UR starts its
+#     sequence (the 0/1 base correction) and every option that changes
+#     which StORFs are reported - output-only options (-lw, -gz, -aa ..)
+#     are not part of it
+#   - An entry is the StORFTable columns without the sequence (the
+#     caller has it), so entries are a few bytes per StORF. Columns are
+#     stored as raw little-endian arrays behind a small header (no
+#     pickle - a shared cache directory can't run code), and an entry
+#     that doesn't parse is a cache miss
+#   - Entries are written atomically (temp file + rename), so several
+#     processes can share a cache directory
+#   - Least recently used entries (by file modification time, refreshed
+#     on every hit) are evicted once the cache grows over max_bytes
+# --------------------------------------------------------
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+try:
+    from .storf_table import StORFTable
+except (ModuleNotFoundError, ImportError, NameError, TypeError) as error:
+    from storf_table import StORFTable
+
+CACHE_VERSION = 2 # Bump when the search or the entry format changes
+CACHE_OPTIONS = ['stop_codons', 'min_orf', 'max_orf', 'overlap_nt', 'olap_filtering', 'priority_strategy', 'storf_order',
+                 'con_storfs', 'con_only', 'short_storfs', 'short_storfs_only', 'whole_contig', 'partial_storf',
+                 'start_filtering', 'non_standard']
+ENTRY_SUFFIX = '.storfs'
+ENTRY_MAGIC = b'STORFS'
+ENTRY_HEADER = struct.Struct('<6sBBq') # Magic, CACHE_VERSION, number of columns (0 for no StORFs), rows
+COLUMN_TYPES = ''.join(column.typecode for column in StORFTable().to_columns())
+
+
+# --------------------------------------------------------
+# Function: pack_columns / unpack_columns
+# Purpose: StORFTable columns (or None) to and from entry bytes
+# Logic:
+#   - Header, then the column typecodes, then each column's items
+#     in little-endian order
+#   - unpack_columns raises ValueError on anything else
+# --------------------------------------------------------
+def pack_columns(columns):
+    if columns is None:
+        return ENTRY_HEADER.pack(ENTRY_MAGIC, CACHE_VERSION, 0, 0)
+    parts = [ENTRY_HEADER.pack(ENTRY_MAGIC, CACHE_VERSION, len(columns), len(columns[0])),
+             ''.join(column.typecode for column in columns).encode('ascii')]
+    for column in columns:
+        if sys.byteorder == 'big':
+            column = array(column.typecode, column)
+            column.byteswap()
+        parts.append(column.tobytes())
+    return b''.join(parts)
+
+
+def unpack_columns(data):
+    if len(data) < ENTRY_HEADER.size:
+        raise ValueError('Truncated UR cache entry')
+    magic, version, column_count, rows = ENTRY_HEADER.unpack_from(data)
+    if magic != ENTRY_MAGIC or version != CACHE_VERSION:
+        raise ValueError('Not a UR cache entry of this version')
+    if column_count == 0:
+        if len(data) != ENTRY_HEADER.size:
+            raise ValueError('Malformed UR cache entry')
+        return None
+    typecodes = data[ENTRY_HEADER.size:ENTRY_HEADER.size + column_count].decode('ascii', 'replace')
+    if typecodes != COLUMN_TYPES or rows < 0:
+        raise ValueError('Malformed UR cache entry')
+    offset = ENTRY_HEADER.size + column_count
+    columns = []
+    for typecode in typecodes:
+        column = array(typecode)
+        end = offset + rows * column.itemsize
+        if end > len(data):
+            raise ValueError('Truncated UR cache entry')
+        column.frombytes(data[offset:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        offset = end
+    if offset != len(data):
+        raise ValueError('Malformed UR cache entry')
+    return columns
+
+
+# --------------------------------------------------------
+# Class: URCache
+# Purpose: Size-bounded LRU store of StORFTables keyed by URCache.key
+# Input:
+#   directory: cache directory (created if missing)
+#   max_bytes: size bound for all entries together
+# --------------------------------------------------------
+class URCache:
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def __getstate__(self): # Worker processes get their own counters
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, evictions=0)
+        return state
+
+    def key(self, sequence, start_of_seq, options):
+        digest = hashlib.sha256()
+        digest.update(repr((CACHE_VERSION, start_of_seq, [getattr(options, name, None) for name in CACHE_OPTIONS])).encode('utf-8'))
+        digest.update(sequence.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _entries(self):
+        # (modification time, path, size) of every entry
+        entries = []
+        for sub_dir in os.scandir(self.directory):
+            if sub_dir.is_dir():
+                for entry in os.scandir(sub_dir.path):
+                    if entry.name.endswith(ENTRY_SUFFIX):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError: # Evicted by another process
+                            continue
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    # --------------------------------------------------------
+    # Function: get
+    # Purpose: Look up a UR
+    # Returns:
+    #   (found, StORFTable on sequence or None if the UR had no StORFs)
+    # --------------------------------------------------------
+    def get(self, key, sequence):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry_in:
+                columns = unpack_columns(entry_in.read())
+            os.utime(path) # Most recently used
+        except (OSError, ValueError): # Not cached (or unreadable) - search again
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        if columns is None:
+            return True, None
+        return True, StORFTable.from_columns(sequence, columns)
+
+    def put(self, key, storfs):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = pack_columns(storfs.to_columns() if storfs is not None else None)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(tmp_fd, 'wb') as entry_out:
+            entry_out.write(data)
+        os.replace(tmp_path, path)
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Oldest entries first until the cache is back within max_bytes
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def add_stats(self, hits, misses, evictions):
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def counters(self):
+        return self.hits, self.misses, self.evictions
+
+    def stats(self):
+        return 'UR cache: ' + str(self.hits) + ' hits, ' + str(self.misses) + ' misses, ' + str(self.evictions) + ' evictions'
@@ -0,0 +1,186 @@
+# --------------------------------------------------------
+# Module: indexed_fasta
+# Purpose: Random access to the records of an uncompressed FASTA file
+# (genome, UR file or StORF-Finder output) without reading it all in
+# Logic:
+#   - The index is samtools faidx compatible (<fasta>.fai, one line per
+#     record: name, length, offset, bases per line, bytes per line).
+#     It is loaded if present and not older than the FASTA, else built
+#     in one pass and saved next to it (if the directory is writable)
+#   - The FASTA is memory mapped - a fetch reads only the lines of the
+#     region asked for and strips their newlines
+#   - Record names are the first word of the header, as in .fai
+#   - Lines starting with '#' or ';' end the sequence of a record and
+#     are otherwise skipped (as read_fasta), so UR files with
+#     '##sequence-region' lines index the same way
+# --------------------------------------------------------
+import mmap
+import os
+from collections.abc import Mapping
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+# --------------------------------------------------------
+# Function: build_index
+# Purpose: .fai entries of a FASTA file
+# Returns:
+#   list of (name, length, offset, line_bases, line_width)
+# --------------------------------------------------------
+def build_index(fasta_path):
+    entries = []
+    names = set()
+    record = None # [name, length, offset, line_bases, line_width]
+    ended = False # A short (last) line or a comment line was seen in this record
+    position = 0
+    with open(fasta_path, 'rb') as fasta_in:
+        if fasta_in.read(2) == GZIP_MAGIC:
+            raise ValueError(fasta_path + ' is compressed - indexed access needs an uncompressed FASTA')
+        fasta_in.seek(0)
+        for line in fasta_in:
+            line_start = position
+            position += len(line)
+            if line.startswith(b'>'):
+                name = line[1:].split(None, 1)[0].decode('utf-8') if line[1:].strip() else ''
+                if name in names:
+                    raise ValueError('Duplicate sequence name ' + name + ' in ' + fasta_path)
+                names.add(name)
+                record = [name, 0, position, 0, 0]
+                entries.append(record)
+                ended = False
+                continue
+            if line.startswith((b'#', b';')):
+                ended = record is not None and record[1] > 0
+                continue
+            bases = len(line.rstrip(b'\r\n'))
+            if record is None or bases == 0:
+                ended = record is not None and record[1] > 0
+                continue
+            if record[1] == 0:
+                record[2] = line_start # Offset of the first base (after any blank or comment lines)
+                record[3] = bases
+                record[4] = len(line)
+            elif ended or bases > record[3]:
+                raise ValueError('Different line length in sequence ' + record[0] + ' of ' + fasta_path)
+            elif bases == record[3] and line.endswith(b'\n') and len(line) != record[4]:
+                raise ValueError('Different line ending in sequence ' + record[0] + ' of ' + fasta_path)
+            if bases < record[3]:
+                ended = True
+            record[1] += bases
+    return [tuple(entry) for entry in entries]
+
+
+def write_index(entries, fai_path):
+    with open(fai_path, 'w', newline='\n') as fai_out:
+        for entry in entries:
+            fai_out.write('\t'.join(str(field) for field in entry) + '\n')
+
+
+def read_index(fai_path):
+    entries = []
+    with open(fai_path) as fai_in:
+        for line in fai_in:
+            fields = line.rstrip('\n').split('\t')
+            entries.append((fields[0],) + tuple(int(field) for field in fields[1:5]))
+    return entries
+
+
+# --------------------------------------------------------
+# Function: load_index
+# Purpose: The .fai entries of a FASTA - from <fasta>.fai if up to date,
+# else built (and saved when possible)
+# --------------------------------------------------------
+def load_index(fasta_path, fai_path=None):
+    fai_path = fai_path or fasta_path + '.fai'
+    if os.path.exists(fai_path) and os.path.getmtime(fai_path) >= os.path.getmtime(fasta_path):
+        return read_index(fai_path)
+    entries = build_index(fasta_path)
+    try:
+        write_index(entries, fai_path)
+    except OSError: # Read-only location - the index is only kept in memory
+        pass
+    return entries
+
+
+# --------------------------------------------------------
+# Class: IndexedFasta
+# Purpose: {name: sequence} view of a FASTA file backed by its index
+# Input:
+#   fasta_path: uncompressed FASTA
+#   fai_path: index file (default <fasta_path>.fai)
+# Logic:
+#   - A Mapping, so it can stand in for the {header: sequence} dicts of
+#     the analysis scripts - sequences are only read when asked for
+#   - fetch(name, start, end) is 0-based and end exclusive (as slicing)
+# --------------------------------------------------------
+class IndexedFasta(Mapping):
+
+    def __init__(self, fasta_path, fai_path=None):
+        self.name = fasta_path
+        self.index = {entry[0]: entry for entry in load_index(fasta_path, fai_path)}
+        self._handle = open(fasta_path, 'rb')
+        if os.path.getsize(fasta_path) > 0:
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else: # Empty files can not be mapped
+            self._map = b''
+
+    def __getitem__(self, name):
+        return self.fetch(name)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def length(self, name):
+        return self.index[name][1]
+
+    def _position(self, entry, base): # File offset of a base of a record
+        _, _, offset, line_bases, line_width = entry
+        return offset + (base // line_bases) * line_width + base % line_bases
+
+    def fetch(self, name, start=0, end=None):
+        entry = self.index[name]
+        start, end, _ = slice(start, end).indices(entry[1])
+        if start >= end:
+            return ''
+        region = self._map[self._position(entry, start):self._position(entry, end - 1) + 1]
+        return region.translate(None, b'\r\n').decode('utf-8')
+
+    def header_offset(self, name): # File offset of the header line of a record
+        return self._map.rfind(b'\n>', 0, self.index[name][2]) + 1 # Blank or comment lines may sit between header and sequence
+
+    def header(self, name): # Full header line of a record (with '>', without the newline)
+        line_start = self.header_offset(name)
+        return self._map[line_start:self._line_end(line_start)].rstrip(b'\r').decode('utf-8')
+
+    def lines_starting(self, prefix):
+        # (offset, line) of every line starting with prefix, e.g. '##sequence-region' - searched in the mapped file
+        found = []
+        prefix = b'\n' + prefix.encode('utf-8')
+        if self._map[:len(prefix) - 1] == prefix[1:]:
+            found.append(0)
+        position = self._map.find(prefix)
+        while position != -1:
+            found.append(position + 1)
+            position = self._map.find(prefix, position + 1)
+        return [(offset, self._map[offset:self._line_end(offset)].rstrip(b'\r').decode('utf-8')) for offset in found]
+
+    def _line_end(self, offset):
+        end = self._map.find(b'\n', offset)
+        return end if end != -1 else len(self._map)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -4,14 +4,9 @@ Created on Sun Feb 16 16:43:19 2025
 @author: Anesti
 """
 
+import numpy as np
 import pandas as pd
 
-# Set path to the raw BLAST results (tab-separated values)
-blast_results_file = 'C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/Results/S_and_C/S_and_C_blastn_results.tsv'
-
-# Set path to save the output Excel file after comparison
-output_excel_file = 'C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/Results/S_and_C_length_analysis.xlsx'
-
 # Define the expected BLAST column headers
 columns = [
     'Query_ID', 'Subject_ID', 'Percent_Identity', 'Alignment_Length',
@@ -19,36 +14,102 @@ columns = [
     'S_End', 'E_Value', 'Bit_Score'
 ]
 
-# Read the BLAST results into a pandas DataFrame
-blast_results = pd.read_csv(blast_results_file, sep='\t', header=None, names=columns)
-
-
-# For each Subject_ID find the row with the longest alignment length
-longest_storf = blast_results.loc[blast_results.groupby('Subject_ID')['Alignment_Length'].idxmax()]
-
-
-# For each Subject_ID, find the row with the lowest E-value (best BLAST hit)
-best_match_storf = blast_results.loc[blast_results.groupby('Subject_ID')['E_Value'].idxmin()]
-
-
-# Merge both longest and best match DataFrames on Subject_ID
-# Add suffixes to distinguish between the two sources
-comparison_df = longest_storf.merge(best_match_storf, on='Subject_ID', suffixes=('_Longest', '_Best'))
-
-
-# Create a boolean column to check whether the longest STORF is also the best match
-comparison_df['Is_Longest_Best'] = comparison_df['Query_ID_Longest'] == comparison_df['Query_ID_Best']
-
-
-# Write the comparison results to an Excel file for further analysis
-with pd.ExcelWriter(output_excel_file, engine='openpyxl') as writer:
-    comparison_df.to_excel(writer, sheet_name='Longest_vs_Best', index=False)
-
-# Calculate how often the longest STORF is also the best match
-longest_selected = comparison_df['Is_Longest_Best'].mean() * 100
-print(f"The longest STORF is the best match in selected: {longest_selected:.2f}% of cases.")
-
-# Display key comparison columns for inspection
-print(comparison_df[['Query_ID_Longest', 'Query_ID_Best', 'Subject_ID',
-                     'Percent_Identity_Longest', 'E_Value_Longest',
-                     'E_Value_Best', 'Is_Longest_Best']])
\ No newline at end of file
+# BLAST rows read at a time - memory is one chunk plus two rows per Subject_ID
+chunk_rows = 1000000
+
+
+# --------------------------------------------------------
+# Function: keep_extreme_rows
+# Purpose: One row per Subject_ID - the first with the highest
+# (idxmax) or lowest (idxmin) value of a column
+# Logic:
+#   - Rows with no value in the column are dropped first, as
+#     groupby().idxmax() skips them
+#   - Rows keep their order, so on ties the earliest row wins
+# Returns:
+#   DataFrame sorted by Subject_ID (the groupby order)
+# --------------------------------------------------------
+def keep_extreme_rows(rows, column, pick):
+    rows = rows[rows[column].notna()]
+    return rows.loc[getattr(rows.groupby('Subject_ID')[column], pick)()]
+
+
+# --------------------------------------------------------
+# Function: longest_vs_best
+# Purpose: Compare, per Subject_ID, the hit with the longest alignment
+# and the hit with the lowest E-value
+# Logic:
+#   - The BLAST table is read in chunks. After each chunk only the
+#     running longest and best row of each Subject_ID are kept - the
+#     kept rows go ahead of the new chunk, so ties still go to the
+#     earliest row of the whole file
+#   - Gives the same rows as idxmax/idxmin over the whole table, with
+#     numeric columns cast to the type a single read_csv would give
+# Input:
+#   blast_results_file: BLAST tabular output (outfmt 6)
+#   chunksize: rows read at a time
+# Returns:
+#   comparison_df: *_Longest and *_Best columns per Subject_ID and
+#   Is_Longest_Best
+# --------------------------------------------------------
+def longest_vs_best(blast_results_file, chunksize=chunk_rows):
+    longest_storf = best_match_storf = None
+    subjects = set()
+    chunk_dtypes = {}
+    # Index labels carry on across chunks, so they stay unique
+    for chunk in pd.read_csv(blast_results_file, sep='\t', header=None, names=columns, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            chunk_dtypes.setdefault(column, []).append(dtype)
+        subjects.update(chunk['Subject_ID'].dropna().unique())
+        if longest_storf is not None:
+            longest_chunk = pd.concat([longest_storf, chunk])
+            best_chunk = pd.concat([best_match_storf, chunk])
+        else:
+            longest_chunk = best_chunk = chunk
+        longest_storf = keep_extreme_rows(longest_chunk, 'Alignment_Length', 'idxmax')
+        best_match_storf = keep_extreme_rows(best_chunk, 'E_Value', 'idxmin')
+
+    if longest_storf is None: # No rows
+        longest_storf = best_match_storf = pd.DataFrame(columns=columns)
+    for name, kept, column in (('longest', longest_storf, 'Alignment_Length'), ('best', best_match_storf, 'E_Value')):
+        if len(kept) != len(subjects):
+            raise ValueError('No ' + column + ' for the ' + name + ' hit of ' + str(len(subjects) - len(kept)) + ' Subject_IDs')
+
+    # A column read as int in one chunk and float (missing values) in another is float in the whole table
+    for column, dtypes in chunk_dtypes.items():
+        if all(isinstance(dtype, np.dtype) and dtype.kind in 'biuf' for dtype in dtypes):
+            common = np.result_type(*dtypes)
+            longest_storf[column] = longest_storf[column].astype(common)
+            best_match_storf[column] = best_match_storf[column].astype(common)
+
+    # Merge both longest and best match DataFrames on Subject_ID
+    # Add suffixes to distinguish between the two sources
+    comparison_df = longest_storf.merge(best_match_storf, on='Subject_ID', suffixes=('_Longest', '_Best'))
+
+    # Create a boolean column to check whether the longest STORF is also the best match
+    comparison_df['Is_Longest_Best'] = comparison_df['Query_ID_Longest'] == comparison_df['Query_ID_Best']
+    return comparison_df
+
+
+if __name__ == "__main__":
+    # Set path to the raw BLAST results (tab-separated values)
+    blast_results_file = 'C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/Results/S_and_C/S_and_C_blastn_results.tsv'
+
+    # Set path to save the output Excel file after comparison
+    output_excel_file = 'C:/Users/anest/OneDrive/Documents/CS/Y3/T2/MainP/Results/S_and_C_length_analysis.xlsx'
+
+    # Longest and best hit of each Subject_ID, read from the BLAST results in chunks
+    comparison_df = longest_vs_best(blast_results_file)
+
+    # Write the comparison results to an Excel file for further analysis
+    with pd.ExcelWriter(output_excel_file, engine='openpyxl') as writer:
+        comparison_df.to_excel(writer, sheet_name='Longest_vs_Best', index=False)
+
+    # Calculate how often the longest STORF is also the best match
+    longest_selected = comparison_df['Is_Longest_Best'].mean() * 100
+    print(f"The longest STORF is the best match in selected: {longest_selected:.2f}% of cases.")
+
+    # Display key comparison columns for inspection
+    print(comparison_df[['Query_ID_Longest', 'Query_ID_Best', 'Subject_ID',
+                         'Percent_Identity_Longest', 'E_Value_Longest',
+                         'E_Value_Best', 'Is_Longest_Best']])
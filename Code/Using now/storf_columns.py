@@ -0,0 +1,260 @@
+# --------------------------------------------------------
+# Module: storf_columns
+# Purpose: Typed columnar StORF table (.npz) written by StORF-Finder
+# -columnar and loaded by the downstream analysis scripts, so StORF
+# metadata does not have to be regex-parsed back out of FASTA headers
+# Logic:
+#   - One array per field. Numbers are int64/int8, stop codons 'U3'
+#   - contig, ur and storf_type are dictionary encoded
+#     (<name>_codes into <name>_names)
+#   - header and sequence are one UTF-8 byte blob each with an offsets
+#     array (row i is blob[offsets[i]:offsets[i + 1]]), as in Arrow
+#   - Rows are written in chunks of CHUNK_ROWS as they come in (arrays
+#     chunk<k>_<name> in the .npz), so writing holds one chunk in memory
+#     and not the whole genome. Loading joins the chunks back into one
+#     array per field
+#   - Loading reads each array straight from the file - no per-row
+#     parsing until a header or sequence is asked for
+# Columns (one row per StORF, as in the GFF/FASTA output):
+#   contig, ur, header (FASTA header without '>'), start, stop (GFF
+#   loci), ur_start, ur_mid, ur_stop (UR stop locations, ur_mid -1 if
+#   none), ur_offset (StORF offset in the UR), strand, frame, ur_frame,
+#   length, storf_type, start_stop, mid_stop, end_stop, sequence
+# NumPy is needed to write or load a table, not to collect rows.
+# --------------------------------------------------------
+import zipfile
+
+try:
+    import numpy as np
+except ImportError:  # -columnar is not available
+    np = None
+
+COLUMNS_VERSION = 2 # 1: a single unchunked table (still loaded)
+CHUNK_ROWS = 50000
+ROW_COLUMNS = ['contig', 'ur', 'header', 'start', 'stop', 'ur_start', 'ur_mid', 'ur_stop', 'ur_offset', 'strand',
+               'frame', 'ur_frame', 'length', 'storf_type', 'start_stop', 'mid_stop', 'end_stop', 'sequence']
+INT_COLUMNS = ['start', 'stop', 'ur_start', 'ur_mid', 'ur_stop', 'ur_offset', 'length']
+SMALL_INT_COLUMNS = ['frame', 'ur_frame']
+CODE_COLUMNS = ['strand', 'start_stop', 'mid_stop', 'end_stop'] # Short fixed width strings
+CATEGORY_COLUMNS = ['contig', 'ur', 'storf_type']
+TEXT_COLUMNS = ['header', 'sequence']
+NO_MID = -1
+
+
+# --------------------------------------------------------
+# Class: ColumnBuffer
+# Purpose: Rows of StORFs in memory
+# Logic:
+#   - Same handle protocol as the FASTA/GFF outputs (write/getvalue/
+#     close), so -threads workers can send a UR's rows back as one value
+# --------------------------------------------------------
+class ColumnBuffer:
+
+    def __init__(self):
+        self.values = [[] for _ in ROW_COLUMNS]
+
+    def __len__(self):
+        return len(self.values[0])
+
+    def add(self, *row): # Values in ROW_COLUMNS order
+        for column, value in zip(self.values, row):
+            column.append(value)
+
+    def write(self, other): # Append the rows of another ColumnBuffer
+        for column, other_column in zip(self.values, other.values):
+            column.extend(other_column)
+
+    def getvalue(self):
+        return self
+
+    def close(self):
+        pass
+
+    def to_arrays(self):
+        columns = dict(zip(ROW_COLUMNS, self.values))
+        arrays = {}
+        for name in INT_COLUMNS:
+            arrays[name] = np.array(columns[name], dtype=np.int64)
+        for name in SMALL_INT_COLUMNS:
+            arrays[name] = np.array(columns[name], dtype=np.int8)
+        for name in CODE_COLUMNS:
+            arrays[name] = np.array(columns[name], dtype='U3')
+        for name in CATEGORY_COLUMNS:
+            codes = {}
+            arrays[name + '_codes'] = np.array([codes.setdefault(value, len(codes)) for value in columns[name]], dtype=np.int32)
+            arrays[name + '_names'] = np.array(list(codes), dtype=str)
+        for name in TEXT_COLUMNS:
+            encoded = [value.encode('utf-8') for value in columns[name]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            arrays[name + '_offsets'] = offsets
+            arrays[name + '_blob'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return arrays
+
+
+# --------------------------------------------------------
+# Class: ColumnWriter
+# Purpose: ColumnBuffer streamed to an .npz file
+# Logic:
+#   - Every CHUNK_ROWS rows the buffer is converted to arrays, written
+#     into the open .npz (a zip of .npy files, as np.savez writes it)
+#     and emptied
+#   - close() writes the last chunk, then 'version' and 'chunks'
+# --------------------------------------------------------
+class ColumnWriter(ColumnBuffer):
+
+    def __init__(self, npz_path, chunk_rows=CHUNK_ROWS):
+        if np is None:
+            raise ImportError('Columnar StORF output needs numpy')
+        super().__init__()
+        self.name = npz_path
+        self.chunk_rows = chunk_rows
+        self.chunks = 0
+        self._zip = zipfile.ZipFile(npz_path, 'w', zipfile.ZIP_STORED, allowZip64=True) # np.savez would add '.npz' to other file names
+
+    def add(self, *row):
+        super().add(*row)
+        if len(self) >= self.chunk_rows:
+            self._write_chunk()
+
+    def write(self, other):
+        super().write(other)
+        if len(self) >= self.chunk_rows:
+            self._write_chunk()
+
+    def _write_array(self, name, array):
+        with self._zip.open(name + '.npy', 'w', force_zip64=True) as npy_out:
+            np.lib.format.write_array(npy_out, array, allow_pickle=False)
+
+    def _write_chunk(self):
+        for name, array in self.to_arrays().items():
+            self._write_array('chunk' + str(self.chunks) + '_' + name, array)
+        self.chunks += 1
+        self.values = [[] for _ in ROW_COLUMNS]
+
+    def close(self):
+        if self._zip.fp is None: # Already closed
+            return
+        if len(self) or self.chunks == 0: # An empty table is one empty chunk
+            self._write_chunk()
+        self._write_array('version', np.array(COLUMNS_VERSION))
+        self._write_array('chunks', np.array(self.chunks))
+        self._zip.close()
+
+
+# --------------------------------------------------------
+# Function: join_chunks
+# Purpose: One array per field from the chunk arrays of a table
+# Logic:
+#   - Number and code columns are concatenated
+#   - Category names are merged in order of first appearance and the
+#     codes of each chunk mapped onto them
+#   - Text blobs are concatenated, offsets shifted by the blob length
+#     before each chunk
+# --------------------------------------------------------
+def join_chunks(arrays):
+    chunks = [{name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+              for prefix in ('chunk' + str(k) + '_' for k in range(int(arrays['chunks'])))]
+    joined = {'version': arrays['version']}
+    for name in INT_COLUMNS + SMALL_INT_COLUMNS + CODE_COLUMNS:
+        joined[name] = np.concatenate([chunk[name] for chunk in chunks])
+    for name in CATEGORY_COLUMNS:
+        names = {}
+        codes = []
+        for chunk in chunks:
+            mapping = np.array([names.setdefault(value, len(names)) for value in chunk[name + '_names'].tolist()], dtype=np.int32)
+            codes.append(mapping[chunk[name + '_codes']])
+        joined[name + '_codes'] = np.concatenate(codes)
+        joined[name + '_names'] = np.array(list(names), dtype=str)
+    for name in TEXT_COLUMNS:
+        offsets = [np.zeros(1, dtype=np.int64)]
+        blob_size = 0
+        for chunk in chunks:
+            offsets.append(chunk[name + '_offsets'][1:] + blob_size)
+            blob_size += len(chunk[name + '_blob'])
+        joined[name + '_offsets'] = np.concatenate(offsets)
+        joined[name + '_blob'] = np.concatenate([chunk[name + '_blob'] for chunk in chunks])
+    return joined
+
+
+# --------------------------------------------------------
+# Class: StORFColumns
+# Purpose: A loaded StORF table
+# Logic:
+#   - Number and code columns are attributes (numpy arrays)
+#   - contig/ur/storf_type are decoded on first use, headers and
+#     sequences per row or all at once
+# --------------------------------------------------------
+class StORFColumns:
+
+    def __init__(self, npz_path):
+        if np is None:
+            raise ImportError('Loading a columnar StORF table needs numpy')
+        with np.load(npz_path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        if int(arrays['version']) not in (1, COLUMNS_VERSION):
+            raise ValueError('Unsupported StORF table version ' + str(arrays['version']) + ' in ' + npz_path)
+        if 'chunks' in arrays:
+            arrays = join_chunks(arrays)
+        self._arrays = arrays
+        for name in INT_COLUMNS + SMALL_INT_COLUMNS + CODE_COLUMNS:
+            setattr(self, name, arrays[name])
+        self._blobs = {name: arrays[name + '_blob'].tobytes() for name in TEXT_COLUMNS}
+
+    def __len__(self):
+        return len(self.start)
+
+    def codes(self, name): # Dictionary codes and names of a category column
+        return self._arrays[name + '_codes'], self._arrays[name + '_names']
+
+    def category(self, name): # e.g. category('storf_type') -> array of type names per row
+        codes, names = self.codes(name)
+        return names[codes]
+
+    @property
+    def contig(self):
+        return self.category('contig')
+
+    @property
+    def ur(self):
+        return self.category('ur')
+
+    @property
+    def storf_type(self):
+        return self.category('storf_type')
+
+    def _text(self, name, row):
+        offsets = self._arrays[name + '_offsets']
+        return self._blobs[name][offsets[row]:offsets[row + 1]].decode('utf-8')
+
+    def _texts(self, name):
+        blob = self._blobs[name]
+        offsets = self._arrays[name + '_offsets'].tolist()
+        return [blob[begin:end].decode('utf-8') for begin, end in zip(offsets, offsets[1:])]
+
+    def header(self, row):
+        return self._text('header', row)
+
+    def headers(self):
+        return self._texts('header')
+
+    def sequence(self, row):
+        return self._text('sequence', row)
+
+    def sequences(self):
+        return self._texts('sequence')
+
+    def storf_ids(self): # ID part of each header (as the GFF ID=)
+        return [header.split(';', 1)[0] for header in self.headers()]
+
+    def to_dataframe(self, sequences=False):
+        import pandas as pd
+        frame = pd.DataFrame({'header': self.headers()})
+        for name in CATEGORY_COLUMNS:
+            codes, names = self.codes(name)
+            frame[name] = pd.Categorical.from_codes(codes, categories=names)
+        for name in INT_COLUMNS + SMALL_INT_COLUMNS + CODE_COLUMNS:
+            frame[name] = getattr(self, name)
+        if sequences:
+            frame['sequence'] = self.sequences()
+        return frame
@@ -1,6 +1,8 @@
+import random
 import unittest
 from collections import OrderedDict
-from utilss import sortORFs, sortORFs_by_strand
+import utilss
+from utilss import sortORFs, sortORFs_by_strand, tile_intervals
 from Filter import tile_filtering, storf_type_score
 
 
@@ -97,6 +99,109 @@ class TestTileFiltering(unittest.TestCase):
         storf_indices = [v[5] for v in result.values()]
         self.assertEqual(storf_indices, sorted(storf_indices))
 
+    def test_storf_order_keeps_shared_ids(self):
+        """
+        Test that StORFs and Con-StORFs numbered by separate counters are all kept.
+        """
+        options = MockOptions(priority_strategy='length', storf_order='strand')
+        data = OrderedDict({
+            "100,300": ["ATG...", 1, '+', 201, 'StORF', 0],
+            "900,1100": ["ATG...", 1, '+', 201, 'Con-StORF', 0]
+        })
+        result = tile_filtering(data, options)
+        self.assertEqual(list(result.keys()), ["100,300", "900,1100"])
+
+    def test_sort_by_strand_ids(self):
+        """
+        Bucketed by ID - equal IDs keep their order, sparse IDs are still sorted.
+        """
+        for ids in ([3, 0, 2, 0, 1, 3], [10 ** 9, 5, 0, 5], [2.5, 1, 0]):
+            data = OrderedDict((str(i) + ',' + str(i + 10), ["ATG...", 1, '+', 10, 'StORF', orf_id]) for i, orf_id in enumerate(ids))
+            expected = sorted(data.items(), key=lambda item: item[1][-1])
+            self.assertEqual(list(sortORFs_by_strand(data).items()), expected)
+        self.assertEqual(sortORFs_by_strand(OrderedDict()), OrderedDict())
+
+    def test_storf_type_priority_beats_length(self):
+        """
+        Test that a shorter Con-StORF is kept over a longer overlapping StORF.
+        """
+        options = MockOptions(priority_strategy='storf_type', overlap_nt=10)
+        data = OrderedDict({
+            "100,400": ["ATG...", 1, '+', 301, 'StORF', 0],
+            "150,350": ["ATG...", 1, '+', 201, 'Con-StORF', 1]
+        })
+        result = tile_filtering(data, options)
+        self.assertEqual(list(result.keys()), ["150,350"])
+
+
+# --------------------------------------------------------
+# Function: scan_tiling
+# Purpose: Reference tiling - each candidate checked against every kept interval
+# --------------------------------------------------------
+def scan_tiling(intervals, overlap_nt):
+    kept = []
+    for idx, (start, stop) in enumerate(intervals):
+        for kept_start, kept_stop in (intervals[k] for k in kept):
+            if start >= kept_stop or stop <= kept_start:
+                continue
+            if (start >= kept_start and stop <= kept_stop) or \
+                    min(kept_stop, stop) - max(kept_start, start) + 1 >= overlap_nt:
+                break
+        else:
+            kept.append(idx)
+    return kept
+
+
+# --------------------------------------------------------
+# Class: TestTileIntervals
+# Purpose: tile_intervals against the all-pairs reference
+# --------------------------------------------------------
+class TestTileIntervals(unittest.TestCase):
+
+    def test_matches_scan(self):
+        """
+        Random intervals, including touching ends, equal starts, point intervals and long intervals.
+        """
+        rng = random.Random(3)
+        for _ in range(500):
+            span = rng.choice([50, 500, 5000])
+            intervals = []
+            for _ in range(rng.randint(0, 150)):  # Both sides of TILE_SCAN_MAX
+                start = rng.randint(0, span)
+                intervals.append((start, start + rng.choice([0, 1, 2, rng.randint(0, 400), rng.randint(0, 5000)])))
+            for overlap_nt in (0, 1, 2, 20, 50):
+                self.assertEqual(tile_intervals(intervals, overlap_nt), scan_tiling(intervals, overlap_nt))
+
+    def test_scan_matches_segment_trees(self):
+        """
+        The small-n scan and the segment tree path keep the same intervals and write the same relations.
+        """
+        rng = random.Random(4)
+        for _ in range(300):
+            span = rng.choice([50, 500, 5000])
+            intervals = []
+            for _ in range(rng.randint(0, utilss.TILE_SCAN_MAX)):
+                start = rng.randint(0, span)
+                intervals.append((start, start + rng.choice([0, 1, 2, rng.randint(0, 400), rng.randint(0, 5000)])))
+            for overlap_nt in (0, 1, 20, 50):
+                scan_relations, tree_relations = [], []
+                kept = tile_intervals(intervals, overlap_nt, scan_relations)
+                scan_max, utilss.TILE_SCAN_MAX = utilss.TILE_SCAN_MAX, -1
+                try:
+                    self.assertEqual(tile_intervals(intervals, overlap_nt, tree_relations), kept)
+                finally:
+                    utilss.TILE_SCAN_MAX = scan_max
+                self.assertEqual(tree_relations, scan_relations)
+
+    def test_long_kept_interval(self):
+        """
+        One long kept interval does not change which later intervals are kept.
+        """
+        intervals = [(100000, 900000)] + [(start, start + 150) for start in range(0, 60000, 100)]
+        kept = tile_intervals(intervals, 50)  # Neighbours overlap by 51
+        self.assertEqual(kept, scan_tiling(intervals, 50))
+        self.assertEqual(kept, [0] + list(range(1, 601, 2)))
+
 
 # ------------------------------------------
 # Run all tests
@@ -0,0 +1,77 @@
+import os
+import random
+import tempfile
+import unittest
+
+from indexed_fasta import IndexedFasta, build_index, load_index
+import Overlap01
+
+
+def write_fasta(path, records, width=60, newline='\n', prefix=''):
+    with open(path, 'w', newline='') as fasta_out:
+        fasta_out.write(prefix)
+        for header, sequence in records:
+            fasta_out.write('>' + header + newline)
+            for i in range(0, len(sequence), width):
+                fasta_out.write(sequence[i:i + width] + newline)
+
+
+class TestIndexedFasta(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'urs.fa')
+        rng = random.Random(11)
+        self.records = [('NC_1_UR_' + str(i), ''.join(rng.choices('ACGT', k=rng.randint(1, 500)))) for i in range(30)]
+        self.records.append(('NC_1_UR_60', 'A' * 60)) # Exactly one full line
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fetch(self):
+        for newline in ('\n', '\r\n'):
+            write_fasta(self.path, self.records, width=50, newline=newline, prefix='##sequence-region NC_1 1 900' + newline)
+            with IndexedFasta(self.path, fai_path=self.path + newline.replace('\r', 'r')) as indexed:
+                self.assertEqual(list(indexed), [name for name, _ in self.records])
+                self.assertEqual(dict(indexed), dict(self.records))
+                for name, sequence in self.records:
+                    self.assertEqual(indexed.header(name), '>' + name)
+                    for start, end in ((0, 1), (49, 51), (3, -3), (-120, None), (len(sequence), None)):
+                        self.assertEqual(indexed.fetch(name, start, end), sequence[start:end])
+                self.assertEqual(indexed.lines_starting('##sequence-region'), [(0, '##sequence-region NC_1 1 900')])
+
+    def test_samtools_fai_format(self):
+        write_fasta(self.path, [('chr1 description', 'ACGTA' * 5), ('chr2', 'TTT')], width=10)
+        self.assertEqual(build_index(self.path), [('chr1', 25, 18, 10, 11), ('chr2', 3, 52, 3, 4)])
+        load_index(self.path)
+        with open(self.path + '.fai') as fai_in:
+            self.assertEqual(fai_in.read(), 'chr1\t25\t18\t10\t11\nchr2\t3\t52\t3\t4\n')
+
+    def test_saved_index_is_reused(self):
+        write_fasta(self.path, self.records)
+        entries = load_index(self.path)
+        with open(self.path + '.fai', 'a') as fai_out:
+            fai_out.write('marker\t1\t0\t1\t2\n') # Only seen if the saved index is read back
+        self.assertEqual(load_index(self.path)[:-1], entries)
+        self.assertEqual(load_index(self.path)[-1][0], 'marker')
+
+    def test_uneven_lines_rejected(self):
+        with open(self.path, 'w') as fasta_out:
+            fasta_out.write('>UR_1\nACGT\nAC\nACGT\n')
+        with self.assertRaises(ValueError):
+            build_index(self.path)
+
+    def test_overlap_index_matches_parse(self):
+        records = [('NC_1_UR_1_90_StORF_0:' + str(start) + '-' + str(start + 90) + ';Length=90', 'ACG' * 30)
+                   for start in range(0, 900, 45)]
+        records.append(('NC_1_UR_1_90_Con-StORF_1:200-20;Length=181', 'T' * 181))
+        write_fasta(self.path, records)
+        positions, sequences = Overlap01.index_positions_and_sequences(self.path)
+        expected_positions, expected_sequences = Overlap01.parse_fasta_positions_and_sequences(self.path)
+        self.assertEqual(positions, expected_positions)
+        self.assertEqual(dict(sequences), expected_sequences)
+        sequences.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import random
+import tempfile
+import unittest
+
+import pandas as pd
+
+from longest import longest_vs_best, columns
+
+
+def whole_table(blast_results_file):
+    # The original in-memory comparison
+    blast_results = pd.read_csv(blast_results_file, sep='\t', header=None, names=columns)
+    longest_storf = blast_results.loc[blast_results.groupby('Subject_ID')['Alignment_Length'].idxmax()]
+    best_match_storf = blast_results.loc[blast_results.groupby('Subject_ID')['E_Value'].idxmin()]
+    comparison_df = longest_storf.merge(best_match_storf, on='Subject_ID', suffixes=('_Longest', '_Best'))
+    comparison_df['Is_Longest_Best'] = comparison_df['Query_ID_Longest'] == comparison_df['Query_ID_Best']
+    return comparison_df
+
+
+class TestLongestVsBest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'blast.tsv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_blast(self, rows):
+        with open(self.path, 'w') as blast_out:
+            for row in rows:
+                blast_out.write('\t'.join(str(field) for field in row) + '\n')
+
+    def random_rows(self, rng, count):
+        rows = []
+        for i in range(count):
+            length = rng.choice([rng.randint(20, 40), ''])  # Small range for ties, some missing
+            e_value = rng.choice(['0.0', '1e-50', '2.5e-10', '1e-50', '0.003'])
+            mismatches = '' if i == count - 1 else rng.randint(0, 5)  # Float column in the last chunk only
+            rows.append(['StORF_' + str(rng.randint(0, 60)), 'Subject_' + str(rng.randint(0, 25)),
+                         round(rng.uniform(80, 100), 2), length, mismatches, 0, 1, 30, 5, 34, e_value, 55.1])
+        return rows
+
+    def test_matches_whole_table(self):
+        rng = random.Random(8)
+        self.write_blast(self.random_rows(rng, 700))
+        expected = whole_table(self.path)
+        for chunksize in (1, 7, 100, 10000):
+            comparison_df = longest_vs_best(self.path, chunksize=chunksize)
+            pd.testing.assert_frame_equal(comparison_df, expected)
+            self.assertEqual(comparison_df['Is_Longest_Best'].mean(), expected['Is_Longest_Best'].mean())
+
+    def test_missing_values_in_a_later_chunk(self):
+        self.write_blast([['StORF_1', 'S1', 99.0, '', 0, 0, 1, 30, 5, 34, 1e-5, 50.0],
+                          ['StORF_2', 'S1', 98.0, 30, 0, 0, 1, 30, 5, 34, 1e-9, 50.0]])
+        comparison_df = longest_vs_best(self.path, chunksize=1)
+        self.assertEqual(comparison_df['Query_ID_Longest'].tolist(), ['StORF_2'])
+        self.assertTrue(comparison_df['Is_Longest_Best'].all())
+
+    def test_subject_without_length(self):
+        self.write_blast([['StORF_1', 'S1', 99.0, '', 0, 0, 1, 30, 5, 34, 1e-5, 50.0],
+                          ['StORF_2', 'S2', 98.0, 30, 0, 0, 1, 30, 5, 34, 1e-9, 50.0]])
+        with self.assertRaises(ValueError):
+            longest_vs_best(self.path, chunksize=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
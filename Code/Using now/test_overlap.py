@@ -0,0 +1,71 @@
+import csv
+import os
+import random
+import tempfile
+import unittest
+
+from Overlap01 import overlap_pairs, con_storf_contains_storf, write_overlap_csv, check_overlap
+
+
+def random_positions(rng, storf_type, count):
+    positions = {}
+    for i in range(count):
+        seq_id = 'NC_' + str(rng.randint(1, 3))
+        start = rng.randint(0, 5000)
+        end = start + rng.randint(0, 600)
+        header = seq_id + '_' + storf_type + '_' + str(i) + ':' + str(start) + '-' + str(end) + ';Strand=' + rng.choice('+-')
+        positions.setdefault(seq_id, []).append((header, start, end))
+    return positions
+
+
+def brute_force(storfs, constorfs):
+    # The original all-against-all comparison
+    pairs = set()
+    for seq_id in constorfs:
+        for con_full, c_start, c_end in constorfs[seq_id]:
+            for storf_full, s_start, s_end in storfs.get(seq_id, []):
+                if check_overlap((c_start, c_end), (s_start, s_end)):
+                    pairs.add((con_full, storf_full, min(c_end, s_end) - max(c_start, s_start) + 1,
+                               con_full[-1] == storf_full[-1]))
+    return pairs
+
+
+class TestOverlapPairs(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(4)
+        self.storfs = random_positions(rng, 'StORF', 400)
+        self.constorfs = random_positions(rng, 'Con-StORF', 150)
+        self.expected = brute_force(self.storfs, self.constorfs)
+
+    def test_matches_all_against_all(self):
+        pairs = list(overlap_pairs(self.storfs, self.constorfs))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(set(pairs), self.expected)
+        contained = con_storf_contains_storf(self.storfs, self.constorfs)
+        self.assertEqual({(con, storf) for con, storfs in contained.items() for storf in storfs},
+                         {(con, storf) for con, storf, _, _ in self.expected})
+
+    def test_min_overlap_and_strand(self):
+        pairs = set(overlap_pairs(self.storfs, self.constorfs, min_overlap=50, same_strand_only=True))
+        self.assertEqual(pairs, {pair for pair in self.expected if pair[2] >= 50 and pair[3]})
+
+    def test_touching_ranges_and_missing_strand(self):
+        storfs = {'NC_1': [('NC_1_StORF_0:1-10', 1, 10)]}
+        constorfs = {'NC_1': [('NC_1_Con-StORF_0:10-30', 10, 30)], 'NC_2': [('NC_2_Con-StORF_0:1-9', 1, 9)]}
+        self.assertEqual(list(overlap_pairs(storfs, constorfs)), [('NC_1_Con-StORF_0:10-30', 'NC_1_StORF_0:1-10', 1, None)])
+
+    def test_csv_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'overlaps.csv')
+            con_hits, storf_hits = write_overlap_csv(csv_path, overlap_pairs(self.storfs, self.constorfs))
+            with open(csv_path, newline='') as csv_in:
+                rows = list(csv.reader(csv_in))
+        self.assertEqual(rows[0], ['Con_StORF_Full_Header', 'StORF_Full_Header', 'Overlap_Length', 'Same_Strand'])
+        self.assertEqual({(row[0], row[1], int(row[2]), row[3] == 'True') for row in rows[1:]}, self.expected)
+        self.assertEqual(set(con_hits), {pair[0] for pair in self.expected})
+        self.assertEqual(len(storf_hits), len({pair[1] for pair in self.expected}))
+
+
+if __name__ == '__main__':
+    unittest.main()
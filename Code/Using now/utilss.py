@@ -1,5 +1,10 @@
+from bisect import bisect_left, bisect_right
 from collections import OrderedDict
 
+# Below this many intervals tile_intervals scans the kept intervals instead of
+# using segment trees - faster even when every kept interval is in reach
+TILE_SCAN_MAX = 64
+
 
 def sortORFs(orf_dict):
     """
@@ -20,17 +25,251 @@ def sortORFs_by_strand(orf_dict):
     """
     Optional: Sort ORFs by strand order based on ID.
 
+    The internal IDs are counters, so the ORFs are bucketed by ID in one
+    pass and the buckets read back in ID order - linear in the number of
+    ORFs. Buckets keep insertion order, so ORFs sharing an ID (e.g. a StORF
+    and a Con-StORF numbered by separate counters) are all kept, as with a
+    stable sort. IDs spread much wider than the number of ORFs fall back to
+    a stable sort.
+
     Parameters:
         orf_dict (OrderedDict): ORF dictionary
 
     Returns:
         OrderedDict: ORFs sorted by strand order (based on internal ID)
     """
-    final = OrderedDict()
-    ids = sorted([orf[-1] for orf in orf_dict.values()])
-    for i in ids:
-        for key, value in orf_dict.items():
-            if value[-1] == i:
-                final[key] = value
+    items = list(orf_dict.items())
+    if not items:
+        return OrderedDict()
+    ids = [data[-1] for _, data in items]
+    low, high = min(ids), max(ids)
+    if not all(isinstance(orf_id, int) for orf_id in ids) or high - low > 2 * len(items):
+        return OrderedDict(sorted(items, key=lambda x: x[1][-1]))
+    buckets = [[] for _ in range(high - low + 1)]
+    for item, orf_id in zip(items, ids):
+        buckets[orf_id - low].append(item)
+    return OrderedDict(item for bucket in buckets for item in bucket)
+
+
+def priority_order(lengths, storf_types, strategy='length'):
+    """
+    Order ORFs by filtering priority, highest priority first.
+
+    Parameters:
+        lengths (list): ORF lengths
+        storf_types (list): ORF types (e.g. 'StORF', 'Con-StORF'), same order as lengths
+        strategy (str): 'length' keeps the longest ORFs first,
+                        'storf_type' puts Con-StORFs first, then by length
+
+    Returns:
+        list: Indices into lengths in priority order (ties keep input order)
+    """
+    if strategy == 'length':
+        return sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    elif strategy == 'storf_type':
+        return sorted(range(len(lengths)), key=lambda i: (storf_types[i] != 'Con-StORF', -lengths[i]))
+    raise ValueError(f"Unsupported priority strategy: {strategy}")
+
+
+class _MaxTree:
+    """
+    Segment tree of running maxima over fixed positions (unset positions hold -inf).
+    """
+
+    def __init__(self, count):
+        # Values can only be raised (set) - enough for intervals that are kept for good
+        self.size = 1
+        while self.size < count:
+            self.size *= 2
+        self.tree = [float('-inf')] * (2 * self.size)
+
+    def set(self, pos, value):
+        # Values only go up, so stop once a node already covers value
+        tree = self.tree
+        node = pos + self.size
+        tree[node] = value
+        node //= 2
+        while node and tree[node] < value:
+            tree[node] = value
+            node //= 2
+
+    def max(self, lo, hi):
+        # Largest value at positions [lo, hi)
+        tree = self.tree
+        best = float('-inf')
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                if tree[lo] > best:
+                    best = tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                if tree[hi] > best:
+                    best = tree[hi]
+            lo //= 2
+            hi //= 2
+        return best
+
+    def prefix_max(self, hi):
+        # Largest value at positions [0, hi) - only right edge nodes are needed
+        tree = self.tree
+        if hi == self.size:  # Every position - the root
+            return tree[1]
+        best = float('-inf')
+        hi += self.size
+        while hi > 1:
+            if hi & 1:
+                hi -= 1
+                if tree[hi] > best:
+                    best = tree[hi]
+            hi //= 2
+        return best
+
+    def first_above(self, lo, hi, value):
+        # First position in [lo, hi) holding more than value, or -1
+        lo += self.size
+        hi += self.size
+        right = []  # Right edge nodes, collected right to left
+        while lo < hi:
+            if lo & 1:
+                if self.tree[lo] > value:
+                    return self._descend(lo, value)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right.append(hi)
+            lo //= 2
+            hi //= 2
+        for node in reversed(right):
+            if self.tree[node] > value:
+                return self._descend(node, value)
+        return -1
+
+    def _descend(self, node, value):
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] > value else 2 * node + 1
+        return node - self.size
+
+
+def tile_intervals(intervals, overlap_nt, relations=None):
+    """
+    Greedy longest-first (or any priority-first) tiling of intervals.
+
+    An interval is kept unless a higher priority kept interval fully
+    contains it or overlaps it by at least overlap_nt nt. All intervals get
+    a slot in start order and kept ones are entered into two max segment
+    trees over those slots (stop and length). A candidate is checked with
+    two queries: the largest stop of the kept intervals starting at or
+    before it (nested in, or overlapping its start by overlap_nt) and the
+    longest kept interval starting inside it early enough to overlap it by
+    overlap_nt. Each check and insert is O(log n), O(n log n) in all,
+    however long or crowded the intervals. With relations, every overlap
+    written adds O(log n) to find it. Up to TILE_SCAN_MAX intervals (most
+    URs) the kept intervals are scanned instead, with the same result.
+
+    Parameters:
+        intervals (list): (start, stop) tuples in priority order
+        overlap_nt (int): Minimum overlap (inclusive of both ends) that removes an interval
+        relations (list): If given, overlaps are appended as (candidate, kept,
+                          overlap length, decision) - indices into intervals. A removed
+                          candidate gets one row, decision 'nested' or 'threshold'
+                          (the first kept interval by start that removes it). A kept
+                          candidate gets a 'below_threshold' row for every kept
+                          interval it overlaps, in start order
+
+    Returns:
+        list: Indices of the kept intervals, in priority order
+    """
+    if len(intervals) <= TILE_SCAN_MAX:
+        return _tile_intervals_scan(intervals, overlap_nt, relations)
+    interval_starts = [start for start, _ in intervals]
+    by_start = sorted(range(len(intervals)), key=interval_starts.__getitem__)  # Stable - equal starts stay in priority order
+    slot = [0] * len(intervals)
+    for pos, idx in enumerate(by_start):
+        slot[idx] = pos
+    starts = [interval_starts[idx] for idx in by_start]
+    kept_stops = _MaxTree(len(intervals))  # Stop of the kept interval in each slot
+    kept_lengths = _MaxTree(len(intervals))  # stop - start of the kept interval in each slot
+    kept = []
+    for idx, (start, stop) in enumerate(intervals):
+        # Kept intervals starting at or before start (a point interval can only be
+        # overlapped by ones starting before it) - nested if one reaches stop
+        before = bisect_right(starts, start) if start < stop else bisect_left(starts, start)
+        reach = kept_stops.prefix_max(before)
+        removed = reach > start and (reach >= stop or min(reach, stop) - start + 1 >= overlap_nt)
+        if not removed:
+            # Kept intervals starting inside this one, overlapping it by at least overlap_nt
+            after = bisect_right(starts, min(stop - 1, stop - overlap_nt + 1))
+            removed = before < after and kept_lengths.max(before, after) >= overlap_nt - 1
+        if relations is not None:
+            _overlap_relations(intervals, idx, removed, overlap_nt, starts, by_start, kept_stops, relations)
+        if not removed:
+            kept.append(idx)
+            kept_stops.set(slot[idx], stop)
+            kept_lengths.set(slot[idx], stop - start)
+    return kept
+
+
+def _tile_intervals_scan(intervals, overlap_nt, relations=None):
+    # tile_intervals for a few intervals: kept intervals are held sorted by start and
+    # the ones that can reach the candidate are checked in start order
+    kept = []
+    kept_starts = []  # Sorted starts of kept intervals
+    kept_stops = []  # Stops matching kept_starts
+    kept_ids = []  # Indices matching kept_starts
+    max_span = 0
+    for idx, (start, stop) in enumerate(intervals):
+        below = []  # below_threshold rows, only written if the candidate is kept
+        # Only kept intervals starting in (start - max_span, stop) can overlap this one
+        lo = bisect_right(kept_starts, start - max_span)
+        hi = bisect_left(kept_starts, stop)
+        for k in range(lo, hi):
+            kept_start = kept_starts[k]
+            kept_stop = kept_stops[k]
+            if start >= kept_stop or stop <= kept_start:  # No overlap
+                continue
+            overlap = min(kept_stop, stop) - max(kept_start, start) + 1  # +1 to include both ends
+            if start >= kept_start and stop <= kept_stop:  # Fully nested
+                if relations is not None:
+                    relations.append((idx, kept_ids[k], overlap, 'nested'))
+                break
+            if overlap >= overlap_nt:
+                if relations is not None:
+                    relations.append((idx, kept_ids[k], overlap, 'threshold'))
                 break
-    return final
+            if relations is not None:
+                below.append((idx, kept_ids[k], overlap, 'below_threshold'))
+        else:
+            kept.append(idx)
+            if below:
+                relations.extend(below)
+            insert_at = bisect_right(kept_starts, start)
+            kept_starts.insert(insert_at, start)
+            kept_stops.insert(insert_at, stop)
+            kept_ids.insert(insert_at, idx)
+            max_span = max(max_span, stop - start)
+    return kept
+
+
+def _overlap_relations(intervals, idx, removed, overlap_nt, starts, by_start, kept_stops, relations):
+    # Relations rows of one candidate: walks the kept intervals it overlaps in start order
+    start, stop = intervals[idx]
+    below = []
+    end = bisect_left(starts, stop)  # Kept intervals starting before stop ...
+    pos = kept_stops.first_above(0, end, start)  # ... and ending after start
+    while pos != -1:
+        kept_idx = by_start[pos]
+        kept_start, kept_stop = intervals[kept_idx]
+        overlap = min(kept_stop, stop) - max(kept_start, start) + 1  # +1 to include both ends
+        if start >= kept_start and stop <= kept_stop:  # Fully nested
+            relations.append((idx, kept_idx, overlap, 'nested'))
+            return
+        if overlap >= overlap_nt:
+            relations.append((idx, kept_idx, overlap, 'threshold'))
+            return
+        below.append((idx, kept_idx, overlap, 'below_threshold'))
+        pos = kept_stops.first_above(pos + 1, end, start)
+    if not removed:  # below_threshold rows are only written for kept candidates
+        relations.extend(below)
@@ -7,8 +7,14 @@ Created on Sat Mar 22 17:37:55 2025
 
 import pandas as pd
 import re
+from bisect import bisect_left, bisect_right
 from typing import List, Tuple, Dict
 
+try:
+    from storf_columns import StORFColumns  # Code/Using now on the path, as for StORF-Finder
+except ImportError:  # FASTA input only
+    StORFColumns = None
+
 def parse_fasta_positions(fasta_file: str) -> Dict[str, Tuple[int, int]]:
     """Extract coordinates from FASTA headers into a dict of ID: (start, end)."""
     coords = {}
@@ -22,6 +28,20 @@ def parse_fasta_positions(fasta_file: str) -> Dict[str, Tuple[int, int]]:
                     coords[id_full] = (start, end)
     return coords
 
+def load_positions(storf_file: str) -> Dict[str, Tuple[int, int]]:
+    """parse_fasta_positions for a StORF-Finder FASTA or its -columnar table (.npz) - the table needs no parsing."""
+    if not storf_file.endswith('.npz'):
+        return parse_fasta_positions(storf_file)
+    if StORFColumns is None:
+        raise ImportError('Loading ' + storf_file + ' needs storf_columns (Code/Using now) on the Python path')
+    columns = StORFColumns(storf_file)
+    coords = {}
+    for storf_id, storf_type, start, stop in zip(columns.storf_ids(), columns.storf_type.tolist(),
+                                                 columns.start.tolist(), columns.stop.tolist()):
+        if storf_type in ('StORF', 'Con-StORF'):
+            coords[storf_id] = (min(start, stop), max(start, stop))
+    return coords
+
 def check_overlap(range1: Tuple[int, int], range2: Tuple[int, int]) -> bool:
     return max(range1[0], range2[0]) <= min(range1[1], range2[1])
 
@@ -29,10 +49,76 @@ def calculate_overlap_length(range1: Tuple[int, int], range2: Tuple[int, int]) -
     """Calculate the length of the overlapping region between two ranges."""
     return max(0, min(range1[1], range2[1]) - max(range1[0], range2[0]) + 1)
 
+def first_overlapping(query_ranges: List[Tuple[int, int]], ranges: List[Tuple[int, int]]) -> List[int]:
+    """Index of the first range (in list order) overlapping each query range, -1 if none.
+
+    Sorted interval join: queries are taken by end, ranges are added by start
+    once they start before it, into a Fenwick tree of the smallest range index
+    per end - one query is a minimum over the ends that reach the query start.
+    O((Q + R) log R) instead of comparing every query with every range.
+    """
+    unique_ends = sorted({end for _, end in ranges})
+    size = len(unique_ends)
+    none = len(ranges)
+    tree = [none] * (size + 1)  # Larger ends at lower positions, so ends >= x are a prefix
+    by_start = sorted(range(len(ranges)), key=lambda i: ranges[i][0])
+    added = 0
+    first = [-1] * len(query_ranges)
+    for query in sorted(range(len(query_ranges)), key=lambda q: query_ranges[q][1]):
+        q_start, q_end = query_ranges[query]
+        while added < len(by_start) and ranges[by_start[added]][0] <= q_end:
+            index = by_start[added]
+            position = size - bisect_left(unique_ends, ranges[index][1])
+            while position <= size:
+                if index < tree[position]:
+                    tree[position] = index
+                position += position & -position
+            added += 1
+        best = none
+        position = size - bisect_left(unique_ends, q_start)
+        while position > 0:
+            if tree[position] < best:
+                best = tree[position]
+            position -= position & -position
+        if best != none:
+            first[query] = best
+    return first
+
+def resolve_ids(query_ids: List[str], coords: Dict[str, Tuple[int, int]]) -> List[str]:
+    """ID in coords for each query ID - exact match, else the first key containing it, None if no key does.
+
+    Exact matches are a dict lookup. For the rest all keys are joined into one
+    newline separated string, so the first key containing an ID is one str.find
+    plus a bisect on the key offsets.
+    """
+    keys = list(coords)
+    joined = None
+    resolved = []
+    for query_id in query_ids:
+        if query_id in coords:
+            resolved.append(query_id)
+            continue
+        if joined is None:  # IDs have no newlines, so a match never spans two keys
+            joined = '\n'.join(keys)
+            key_offsets = []
+            offset = 0
+            for key in keys:
+                key_offsets.append(offset)
+                offset += len(key) + 1
+        position = joined.find(query_id) if keys else -1
+        resolved.append(keys[bisect_right(key_offsets, position) - 1] if position != -1 else None)
+    return resolved
+
 def analyse_top_overlap(blast_file: str, storf_file: str, constorf_file: str, output_file: str, top_n: int = 100):
+    """Pair each top-N BLAST Con-StORF hit with the first StORF overlapping it and pick one of the two by rank.
+
+    Batch form of the per-hit loop: ranks are a dict, the first BLAST row of
+    every query is one table, Con-StORF IDs are resolved through a hash index
+    and the overlaps come from one sorted interval join (first_overlapping).
+    """
     # Load coordinates
-    storf_coords = parse_fasta_positions(storf_file)
-    constorf_coords = parse_fasta_positions(constorf_file)
+    storf_coords = load_positions(storf_file)
+    constorf_coords = load_positions(constorf_file)
 
     # Load blast result (format 6 assumed)
     cols = ["Query_ID", "Subject_ID", "%_Identity", "Alignment_Length", "Mismatch", "Gap_Openings",
@@ -42,66 +128,55 @@ def analyse_top_overlap(blast_file: str, storf_file: str, constorf_file: str, ou
     # Clean and simplify Query_IDs
     blast_df['Clean_Query_ID'] = blast_df['Query_ID'].str.strip().str.split(';').str[0]
 
-    # Get top N unique query IDs
-    top_queries_df = blast_df.drop_duplicates(subset='Clean_Query_ID').head(top_n)
-    top_queries = top_queries_df['Clean_Query_ID'].tolist()
+    # First row of every query - the top N unique query IDs are its first N rows
+    first_rows = blast_df.drop_duplicates(subset='Clean_Query_ID')
+    top_queries = first_rows['Clean_Query_ID'].head(top_n).tolist()
+    query_rank = {query_id: rank for rank, query_id in enumerate(top_queries)}
+    first_row = {query_id: row for row, query_id in enumerate(first_rows['Clean_Query_ID'].tolist())}
 
     print("Parsed Con-StORF IDs:", list(constorf_coords.keys())[:5])
     print("Top BLAST Query IDs:", top_queries[:5])
 
     con_storf_hits = [qid for qid in top_queries if 'Con-StORF' in qid]
-    results = []
-    overlap_count = 0
+    resolved = resolve_ids([con_id.strip() for con_id in con_storf_hits], constorf_coords)
+    hits = [(con_id, con_id_clean) for con_id, con_id_clean in zip(con_storf_hits, resolved) if con_id_clean is not None]
+
+    # First StORF (in file order) overlapping each Con-StORF
+    storf_ids = list(storf_coords)
+    storf_ranges = list(storf_coords.values())
+    con_ranges = [constorf_coords[con_id_clean] for _, con_id_clean in hits]
+    first_storf = first_overlapping(con_ranges, storf_ranges)
+
+    results = {column: [] for column in ['Con-StORF', 'StORF', 'Con_StORF_Rank', 'StORF_Rank', 'StORF_Higher',
+                                         'Preferred_Pick', 'StORF_Length', 'Con_StORF_Length', 'Overlap_Length']}
+    blast_rows = []
     storf_selected = 0
-
-    for con_id in con_storf_hits:
-        con_id_clean = con_id.strip()
-        con_range = constorf_coords.get(con_id_clean)
-
-        # If direct match doesn't work, try partial match
-        if not con_range:
-            for key in constorf_coords:
-                if con_id_clean in key:
-                    con_range = constorf_coords[key]
-                    con_id_clean = key
-                    break
-
-        if not con_range:
+    for (con_id, con_id_clean), con_range, storf_index in zip(hits, con_ranges, first_storf):
+        if storf_index == -1:
             continue
-
-        # Search for overlapping StORFs
-        for storf_id, storf_range in storf_coords.items():
-            if check_overlap(con_range, storf_range):
-                overlap_count += 1
-                storf_rank = top_queries.index(storf_id) if storf_id in top_queries else -1
-                con_rank = top_queries.index(con_id)
-                blast_row = blast_df[blast_df['Clean_Query_ID'] == con_id_clean].iloc[0]
-
-                pick = "Con-StORF"
-                if storf_rank != -1 and (con_rank - storf_rank) >= 20:
-                    pick = "StORF"
-                    storf_selected += 1
-
-                overlap_len = calculate_overlap_length(con_range, storf_range)
-                storf_len = storf_range[1] - storf_range[0] + 1
-                constorf_len = con_range[1] - con_range[0] + 1
-
-                results.append({
-                    'Con-StORF': con_id_clean,
-                    'StORF': storf_id,
-                    'Con_StORF_Rank': con_rank,
-                    'StORF_Rank': storf_rank,
-                    'StORF_Higher': storf_rank != -1 and storf_rank < con_rank,
-                    'Preferred_Pick': pick,
-                    'StORF_Length': storf_len,
-                    'Con_StORF_Length': constorf_len,
-                    'Overlap_Length': overlap_len,
-                    '%_Identity': blast_row['%_Identity'],
-                    'Bit_Score': blast_row['Bit_Score'],
-                    'E_Value': blast_row['E_Value'],
-                    'Alignment_Length': blast_row['Alignment_Length']
-                })
-                break
+        storf_id = storf_ids[storf_index]
+        storf_range = storf_ranges[storf_index]
+        storf_rank = query_rank.get(storf_id, -1)
+        con_rank = query_rank[con_id]
+        if con_id_clean not in first_row:
+            raise IndexError('No BLAST row for ' + con_id_clean)
+        blast_rows.append(first_row[con_id_clean])
+
+        pick = "Con-StORF"
+        if storf_rank != -1 and (con_rank - storf_rank) >= 20:
+            pick = "StORF"
+            storf_selected += 1
+
+        results['Con-StORF'].append(con_id_clean)
+        results['StORF'].append(storf_id)
+        results['Con_StORF_Rank'].append(con_rank)
+        results['StORF_Rank'].append(storf_rank)
+        results['StORF_Higher'].append(storf_rank != -1 and storf_rank < con_rank)
+        results['Preferred_Pick'].append(pick)
+        results['StORF_Length'].append(storf_range[1] - storf_range[0] + 1)
+        results['Con_StORF_Length'].append(con_range[1] - con_range[0] + 1)
+        results['Overlap_Length'].append(calculate_overlap_length(con_range, storf_range))
+    overlap_count = len(blast_rows)
 
     # Save overlap summary to a text file
     with open("ecoli_overlap_summary.txt", "w") as f:
@@ -111,7 +186,13 @@ def analyse_top_overlap(blast_file: str, storf_file: str, constorf_file: str, ou
 
     print(f"Summary written to ecoli_overlap_summary.txt")
 
-    results_df = pd.DataFrame(results)
+    if blast_rows:
+        blast_values = first_rows.iloc[blast_rows]
+        for column in ['%_Identity', 'Bit_Score', 'E_Value', 'Alignment_Length']:
+            results[column] = blast_values[column].tolist()
+        results_df = pd.DataFrame(results)
+    else:
+        results_df = pd.DataFrame([])
     results_df.to_csv(output_file, index=False)
     print(f"Results written to {output_file}")
     return results_df
@@ -0,0 +1,84 @@
+import os
+import random
+import tempfile
+import unittest
+
+from filter01 import analyse_top_overlap, check_overlap, first_overlapping, resolve_ids
+
+
+def loop_first_overlapping(query_ranges, ranges):
+    # The nested loop analyse_top_overlap used - first range in list order overlapping each query
+    return [next((index for index, found in enumerate(ranges) if check_overlap(query, found)), -1) for query in query_ranges]
+
+
+def loop_resolve_ids(query_ids, coords):
+    # The exact-then-partial ID match analyse_top_overlap used
+    return [query_id if query_id in coords else next((key for key in coords if query_id in key), None) for query_id in query_ids]
+
+
+class TestFirstOverlapping(unittest.TestCase):
+
+    def test_matches_nested_loop(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            span = rng.choice([20, 200, 2000])
+            ranges = []
+            for _ in range(rng.randint(0, 40)):
+                start = rng.randint(0, span)
+                ranges.append((start, start + rng.choice([0, 1, rng.randint(0, 60)])))  # Points, equal starts and ends
+            queries = [(start, start + rng.randint(0, 60)) for start in (rng.randint(0, span) for _ in range(rng.randint(0, 30)))]
+            queries += [(end, end + 5) for _, end in ranges[:5]]  # Touching the end of a range
+            self.assertEqual(first_overlapping(queries, ranges), loop_first_overlapping(queries, ranges))
+
+    def test_ties_take_the_first_range(self):
+        ranges = [(50, 60), (10, 100), (10, 100), (0, 9)]
+        self.assertEqual(first_overlapping([(55, 55), (100, 120), (9, 10), (101, 200)], ranges), [0, 1, 1, -1])
+
+
+class TestResolveIds(unittest.TestCase):
+
+    def test_matches_loop(self):
+        coords = {'NC_1_Con-StORF_' + str(i) + ':' + str(10 * i) + '-' + str(10 * i + 90): (10 * i, 10 * i + 90) for i in range(30)}
+        queries = ['NC_1_Con-StORF_3:30-120', 'NC_1_Con-StORF_1', 'Con-StORF_2', '-120', 'NC_2_Con-StORF_1', '', '0-9']
+        self.assertEqual(resolve_ids(queries, coords), loop_resolve_ids(queries, coords))
+        self.assertEqual(resolve_ids(queries, {}), [None] * len(queries))
+
+
+class TestAnalyseTopOverlap(unittest.TestCase):
+
+    def test_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cwd = os.getcwd()
+            os.chdir(tmp_dir)  # The summary is written to the working directory
+            try:
+                with open('storfs.fasta', 'w') as storf_out:
+                    for header in ('NC_1_StORF_0:100-200', 'NC_1_StORF_1:150-300', 'NC_1_StORF_2:400-500'):
+                        storf_out.write('>' + header + ';Length=1\nACGT\n')
+                with open('con_storfs.fasta', 'w') as con_out:
+                    for header in ('NC_1_Con-StORF_0:200-260', 'NC_1_Con-StORF_1:310-390', 'NC_1_Con-StORF_2:500-600'):
+                        con_out.write('>' + header + ';Length=1\nACGT\n')
+                with open('blast.tsv', 'w') as blast_out:
+                    for rank, query_id in enumerate(['NC_1_Con-StORF_2:500-600;UR=x', 'NC_1_StORF_0:100-200',
+                                                     'NC_1_Con-StORF_0:200-2',  # Partial - resolves to Con-StORF_0
+                                                     'NC_9_Con-StORF_7:1-2',  # No such Con-StORF
+                                                     'NC_1_Con-StORF_1:310-390',  # Overlaps no StORF
+                                                     'NC_1_Con-StORF_0:200-260']):
+                        blast_out.write('\t'.join([query_id, 'subject', str(90 + rank), str(100 + rank), '0', '0',
+                                                   '1', '2', '3', '4', '1e-' + str(rank + 1), str(50 + rank)]) + '\n')
+                results_df = analyse_top_overlap('blast.tsv', 'storfs.fasta', 'con_storfs.fasta', 'out.csv')
+                with open('ecoli_overlap_summary.txt') as summary_in:
+                    summary = summary_in.read()
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(results_df['Con-StORF'].tolist(), ['NC_1_Con-StORF_2:500-600', 'NC_1_Con-StORF_0:200-260',
+                                                           'NC_1_Con-StORF_0:200-260'])
+        self.assertEqual(results_df['StORF'].tolist(), ['NC_1_StORF_2:400-500', 'NC_1_StORF_0:100-200', 'NC_1_StORF_0:100-200'])
+        self.assertEqual(results_df['Con_StORF_Rank'].tolist(), [0, 2, 5])
+        self.assertEqual(results_df['StORF_Rank'].tolist(), [-1, 1, 1])
+        self.assertEqual(results_df['Overlap_Length'].tolist(), [1, 1, 1])
+        self.assertEqual(results_df['Alignment_Length'].tolist(), [100, 105, 105])  # First BLAST row of the resolved ID
+        self.assertEqual(summary.splitlines()[0], 'Total overlaps detected: 3')
+
+
+if __name__ == '__main__':
+    unittest.main()